@@ -0,0 +1,111 @@
+# bench/bench_proxy_check.py
+# Пропускная способность проверки прокси на локальных «прокси»-заглушках.
+#
+#   python bench/bench_proxy_check.py
+#
+# Поднимает заглушку HTTP CONNECT и заглушку SOCKS5 на 127.0.0.1 (с задержкой
+# ответа, как у настоящего прокси) и проверяет BENCH_PROXIES адресов: разные
+# логины на этих двух портах плюс доля «мёртвых» — на закрытом порту и на
+# заглушке, которая не отвечает. БД не нужна.
+import asyncio
+import os
+import socket
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bot.utils.proxy_check import check_many  # noqa: E402
+
+PROXIES = int(os.getenv("BENCH_PROXIES", "5000"))
+CONCURRENCY = int(os.getenv("BENCH_CONCURRENCY", "200"))
+DELAY = float(os.getenv("BENCH_PROXY_DELAY", "0.05"))
+TIMEOUT = 1.0
+DEAD_SHARE = 10  # каждый N-й — мёртвый
+
+
+async def _http_proxy(reader, writer):
+    try:
+        while (await reader.readline()) not in (b"\r\n", b""):
+            pass
+        await asyncio.sleep(DELAY)
+        writer.write(b"HTTP/1.1 200 Connection established\r\n\r\n")
+        await writer.drain()
+    finally:
+        writer.close()
+
+
+async def _socks5_proxy(reader, writer):
+    try:
+        _, n = await reader.readexactly(2)
+        methods = await reader.readexactly(n)
+        if 2 in methods:
+            writer.write(b"\x05\x02")
+            _, ulen = await reader.readexactly(2)
+            await reader.readexactly(ulen)
+            plen = (await reader.readexactly(1))[0]
+            await reader.readexactly(plen)
+            writer.write(b"\x01\x00")
+        else:
+            writer.write(b"\x05\x00")
+        header = await reader.readexactly(5)
+        await reader.readexactly(header[4] + 2)
+        await asyncio.sleep(DELAY)
+        writer.write(b"\x05\x00\x00\x01" + bytes(6))
+        await writer.drain()
+    except asyncio.IncompleteReadError:
+        pass
+    finally:
+        writer.close()
+
+
+async def _silent(reader, writer):
+    # принимает соединение и молчит, пока клиент не бросит его по таймауту
+    await reader.read()
+    writer.close()
+
+
+def _closed_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def main() -> None:
+    servers = [
+        await asyncio.start_server(handler, "127.0.0.1", 0, backlog=4096)
+        for handler in (_http_proxy, _socks5_proxy, _silent)
+    ]
+    http_port, socks_port, silent_port = (s.sockets[0].getsockname()[1] for s in servers)
+    closed_port = _closed_port()
+
+    proxies, expected_dead = [], 0
+    for i in range(PROXIES):
+        if i % DEAD_SHARE == 0:
+            port = closed_port if i % (DEAD_SHARE * 2) == 0 else silent_port
+            proxies.append(f"127.0.0.1:{port}:u{i}:p")
+            expected_dead += 1
+        elif i % 2:
+            proxies.append(f"socks5://u{i}:p@127.0.0.1:{socks_port}")
+        else:
+            proxies.append(f"http://u{i}:p@127.0.0.1:{http_port}")
+
+    started = time.perf_counter()
+    results = await check_many(proxies, concurrency=CONCURRENCY, timeout=TIMEOUT)
+    elapsed = time.perf_counter() - started
+
+    for s in servers:
+        s.close()
+
+    dead = sum(1 for r in results if not r.ok)
+    latencies = sorted(r.latency_ms for r in results if r.ok)
+    print(f"checked {len(results)} proxies in {elapsed:.2f}s "
+          f"({len(results) / elapsed * 60:,.0f}/min, concurrency {CONCURRENCY})")
+    print(f"dead {dead} (expected {expected_dead}), "
+          f"p50 latency {latencies[len(latencies) // 2]} ms")
+    if dead != expected_dead:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,87 @@
+# bench/bench_render.py
+# Нарезка длинного ответа на сообщения: прежний способ против chunk_lines.
+#
+#   python bench/bench_render.py
+#
+# Рендерит список из BENCH_RESOURCES ресурсов (как в «Мои ресурсы») и режет его
+# на сообщения: прежним циклом, который на каждом куске заново копирует
+# остаток текста, и однопроходным chunk_lines. БД не нужна.
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bot.utils.render import MAX_MESSAGE_LEN, chunk_lines, esc  # noqa: E402
+
+RESOURCES = int(os.getenv("BENCH_RESOURCES", "10000"))
+ROUNDS = int(os.getenv("BENCH_ROUNDS", "5"))
+
+
+def _old_chunks(text: str, max_len: int = 3500) -> list[str]:
+    # копия прежнего manager_menu._send_long_text без отправки
+    chunks = []
+    rest = text
+    while rest:
+        chunk = rest[:max_len]
+        if len(rest) > max_len:
+            last_n = chunk.rfind("\n")
+            if last_n > 0:
+                chunk = rest[:last_n]
+                rest = rest[last_n + 1:]
+            else:
+                rest = rest[max_len:]
+        else:
+            rest = ""
+        chunks.append(chunk)
+    return chunks
+
+
+def _rows():
+    return [
+        {
+            "type": "mamba [dolphin]" if i % 3 else "tinder <ru>",
+            "login": f"user{i}@mail.example",
+            "password": f"p&ss{i:06d}",
+            "lifetime_minutes": i % 240 or None,
+        }
+        for i in range(RESOURCES)
+    ]
+
+
+def _lines(rows):
+    yield "📋 Отработавшие ресурсы:"
+    yield ""
+    for r in rows:
+        line = f"• <b>{esc(r['type'])}</b> — <code>{esc(r['login'])}</code>"
+        if r["lifetime_minutes"] is not None:
+            line += f" | ⏱ {r['lifetime_minutes']} мин"
+        yield line
+
+
+def _best(fn) -> tuple[float, list[str]]:
+    best, result = float("inf"), []
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main() -> None:
+    rows = _rows()
+
+    old_time, old = _best(lambda: _old_chunks("\n".join(_lines(rows))))
+    new_time, new = _best(lambda: list(chunk_lines(_lines(rows))))
+
+    assert all(len(c) <= MAX_MESSAGE_LEN for c in new), "кусок длиннее лимита"
+    assert "\n".join(new) == "\n".join(_lines(rows)), "строки потерялись при нарезке"
+
+    size = sum(len(c) for c in new)
+    print(f"ресурсов: {RESOURCES}, текст: {size} символов")
+    print(f"прежний:     {old_time * 1000:8.2f} мс, сообщений: {len(old)}")
+    print(f"chunk_lines: {new_time * 1000:8.2f} мс, сообщений: {len(new)}")
+
+
+if __name__ == "__main__":
+    main()
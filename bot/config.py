@@ -1,5 +1,20 @@
 import os
 
+
+def _type_map(value: str | None) -> dict[str, str]:
+    """
+    Разбирает настройки по типам вида "mamba=freshest, tabor=round_robin".
+    """
+    result: dict[str, str] = {}
+    for item in (value or "").split(","):
+        if "=" not in item:
+            continue
+        key, val = item.split("=", 1)
+        if key.strip() and val.strip():
+            result[key.strip()] = val.strip()
+    return result
+
+
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 
 DB_HOST = os.getenv("DB_HOST")
@@ -7,3 +22,70 @@ DB_PORT = int(os.getenv("DB_PORT", "5432"))
 DB_NAME = os.getenv("DB_NAME")
 DB_USER = os.getenv("DB_USER")
 DB_PASS = os.getenv("DB_PASS")
+
+# Прогноз остатка ресурсов
+STOCK_ALERT_HOURS = float(os.getenv("STOCK_ALERT_HOURS", "6"))
+STOCK_HALF_LIFE_HOURS = float(os.getenv("STOCK_HALF_LIFE_HOURS", "6"))
+STOCK_WINDOW_HOURS = int(os.getenv("STOCK_WINDOW_HOURS", "72"))
+STOCK_ALERT_COOLDOWN_HOURS = float(os.getenv("STOCK_ALERT_COOLDOWN_HOURS", "3"))
+
+# Стратегия выдачи: fifo / freshest / best_supplier / round_robin
+ALLOC_STRATEGY = os.getenv("ALLOC_STRATEGY", "fifo")
+ALLOC_STRATEGY_BY_TYPE = _type_map(os.getenv("ALLOC_STRATEGY_BY_TYPE"))
+
+# Замена нерабочего при получении: on — вместе с отметкой «🔴 Нерабочий»
+# менеджер сразу получает другой ресурс того же типа, off — нет
+AUTO_REPLACE_BAD = os.getenv("AUTO_REPLACE_BAD", "off")
+AUTO_REPLACE_BAD_BY_TYPE = _type_map(os.getenv("AUTO_REPLACE_BAD_BY_TYPE"))
+
+# Возврат в свободные выданных, но так и не отмеченных ресурсов.
+# Возраст в минутах; 0 — не возвращать.
+RECLAIM_AFTER_MINUTES = int(os.getenv("RECLAIM_AFTER_MINUTES", "1440"))
+RECLAIM_AFTER_MINUTES_BY_TYPE = {
+    k: int(v) for k, v in _type_map(os.getenv("RECLAIM_AFTER_MINUTES_BY_TYPE")).items()
+}
+RECLAIM_BATCH = int(os.getenv("RECLAIM_BATCH", "200"))
+
+# За сколько секунд после старта контейнера бот должен быть готов отвечать
+STARTUP_BUDGET_SEC = float(os.getenv("STARTUP_BUDGET_SEC", "10"))
+
+# Сколько секунд всего занимает остановка (SIGTERM): незавершённые обработчики,
+# фоновые задачи и закрытие пула БД делят этот срок, а не получают каждый
+# свой; должно быть меньше таймаута платформы до SIGKILL
+SHUTDOWN_DEADLINE_SEC = float(os.getenv("SHUTDOWN_DEADLINE_SEC", "8"))
+
+# Проверка прокси свободных ресурсов.
+# PROXY_POLICY: off — не учитывать, prefer — сначала ресурсы с живыми
+# (или непроверенными) прокси, skip — с упавшими прокси не выдавать.
+PROXY_POLICY = os.getenv("PROXY_POLICY", "prefer")
+PROXY_CHECK_CONCURRENCY = int(os.getenv("PROXY_CHECK_CONCURRENCY", "200"))
+PROXY_CHECK_TIMEOUT_SEC = float(os.getenv("PROXY_CHECK_TIMEOUT_SEC", "5"))
+PROXY_RECHECK_MINUTES = int(os.getenv("PROXY_RECHECK_MINUTES", "30"))
+PROXY_CHECK_BATCH = int(os.getenv("PROXY_CHECK_BATCH", "5000"))
+# Куда просим прокси открыть туннель (host:port)
+PROXY_CHECK_TARGET = os.getenv("PROXY_CHECK_TARGET", "api.telegram.org:443")
+# Схема для прокси, записанных без неё (host:port[:user:pass])
+PROXY_DEFAULT_SCHEME = os.getenv("PROXY_DEFAULT_SCHEME", "http")
+
+# Двухфазная выдача: ресурсы сначала бронируются на столько минут и
+# закрепляются за менеджером только после подтверждения. 0 — выдавать сразу.
+RESERVE_TTL_MINUTES = int(os.getenv("RESERVE_TTL_MINUTES", "15"))
+RESERVE_RELEASE_BATCH = int(os.getenv("RESERVE_RELEASE_BATCH", "500"))
+
+# Журнал медленных запросов (/slowlog): порог в мс (0 — выключен), сколько
+# записей держать, как часто снимать план одного и того же запроса и
+# сколько EXPLAIN ANALYZE может выполняться
+SLOWLOG_THRESHOLD_MS = float(os.getenv("SLOWLOG_THRESHOLD_MS", "500"))
+SLOWLOG_SIZE = int(os.getenv("SLOWLOG_SIZE", "100"))
+SLOWLOG_EXPLAIN_EVERY_SEC = float(os.getenv("SLOWLOG_EXPLAIN_EVERY_SEC", "300"))
+SLOWLOG_EXPLAIN_TIMEOUT_SEC = float(os.getenv("SLOWLOG_EXPLAIN_TIMEOUT_SEC", "10"))
+
+# FSM-хранилище в памяти: сколько минут без действий живёт незаконченный
+# сценарий (выдача, загрузка, отметка статуса…) и сколько МБ занимают все
+# вместе — сверх предела вытесняются самые давние
+FSM_TTL_MINUTES = float(os.getenv("FSM_TTL_MINUTES", "120"))
+FSM_MAX_MB = float(os.getenv("FSM_MAX_MB", "32"))
+
+# Очередь ожидания: сколько часов заявка на отсутствующий тип ждёт загрузки,
+# потом снимается (чтобы не выдать ресурсы, которые уже не нужны)
+BACKORDER_TTL_HOURS = int(os.getenv("BACKORDER_TTL_HOURS", "24"))
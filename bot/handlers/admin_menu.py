@@ -20,6 +20,9 @@ def admin_menu_kb() -> ReplyKeyboardMarkup:
                 KeyboardButton(text="📦 Загрузить ресурсы"),
                 KeyboardButton(text="📊 Отчёты"),
             ],
+            [
+                KeyboardButton(text="🚦 Квоты"),
+            ],
             [
                 KeyboardButton(text=EXIT_ADMIN_BUTTON_TEXT),
             ],
@@ -5,6 +5,7 @@ from aiogram.fsm.state import StatesGroup, State
 
 from db.database import get_pool
 from bot.utils.queries import DBQueries
+from bot.utils.ingest import insert_resources
 from bot.handlers.admin_menu import admin_menu_kb
 from bot.handlers.manager_menu import BACK_BUTTON_TEXT
 
@@ -183,29 +184,20 @@ async def save_uploaded_resources(message: Message, state: FSMContext):
         return
 
     pool = await get_pool()
-    inserted = 0
-
     async with pool.acquire() as conn:
-        async with conn.transaction():
-            for login, password, proxy in rows:
-                await conn.execute(
-                    DBQueries.INSERT_RESOURCE_BULK,
-                    res_type,
-                    login,
-                    password,
-                    proxy,
-                    0,
-                )
-                inserted += 1
+        result = await insert_resources(conn, res_type, rows)
 
     await state.clear()
 
     text = (
         "✅ Загрузка завершена.\n\n"
         f"Тип ресурса: <b>{res_type}</b>\n"
-        f"Добавлено в базу: <b>{inserted}</b>\n"
+        f"Добавлено в базу: <b>{result.added}</b>\n"
     )
     if skipped:
-        text += f"Пропущено строк (не распознаны): <b>{skipped}</b>"
+        text += f"Пропущено строк (не распознаны): <b>{skipped}</b>\n"
+    skipped_lines = result.skipped_lines()
+    if skipped_lines:
+        text += "\n".join(skipped_lines)
 
     await message.answer(text, reply_markup=admin_menu_kb())
@@ -0,0 +1,99 @@
+# bot/handlers/backorders.py
+from aiogram import F, Router
+from aiogram.types import CallbackQuery
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+
+from db.database import get_pool
+from bot.config import BACKORDER_TTL_HOURS
+from bot.handlers.resource_issue import (
+    BACKORDER_CALLBACK,
+    BACKORDER_CANCEL_CALLBACK,
+    RESOURCE_TYPES,
+)
+from bot.utils import backorders, quotas
+from bot.utils.queries import DBQueries
+from bot.utils.render import esc
+
+router = Router()
+
+
+def cancel_kb(type_idx: int):
+    kb = InlineKeyboardBuilder()
+    kb.button(text="✖️ Не ждать", callback_data=f"{BACKORDER_CANCEL_CALLBACK}:{type_idx}")
+    return kb.as_markup()
+
+
+def _parse(data: str) -> tuple[int, str, int] | None:
+    # <префикс>:<индекс типа>[:<сколько>]
+    parts = data.split(":")
+    if len(parts) not in (2, 3) or not all(p.isdigit() for p in parts[1:]):
+        return None
+    type_idx = int(parts[1])
+    if type_idx >= len(RESOURCE_TYPES):
+        return None
+    count = int(parts[2]) if len(parts) == 3 else 0
+    return type_idx, RESOURCE_TYPES[type_idx], count
+
+
+@router.callback_query(F.data.startswith(f"{BACKORDER_CALLBACK}:"))
+async def join_backorder(callback: CallbackQuery, role: str | None = None):
+    """
+    Встать в очередь на тип: ресурсы придут сами после загрузки.
+    """
+    parsed = _parse(callback.data)
+    if parsed is None or not 1 <= parsed[2] <= 10:
+        await callback.answer()
+        return
+    type_idx, r_type, count = parsed
+    user_id = callback.from_user.id
+
+    # квота списывается сразу — ожидание идёт в счёт лимита, как обычная выдача
+    limited = role not in ("admin", "owner")
+    if limited:
+        denied = await quotas.acquire(user_id, r_type, count)
+        if denied:
+            await callback.answer(denied, show_alert=True)
+            return
+
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        row = await conn.fetchrow(DBQueries.BACKORDER_ADD, user_id, r_type, count)
+    position = row["position"]
+
+    # прежняя заявка на этот тип заменена новой — её списание возвращаем
+    if limited:
+        quotas.refund(user_id, r_type, row["replaced"])
+
+    await callback.message.edit_text(
+        f"🔔 Ты в очереди на <b>{esc(r_type)}</b>: {count} шт., {position}-й по счёту.\n"
+        f"Пришлю, как только загрузят (ждём до {BACKORDER_TTL_HOURS} ч).",
+        reply_markup=cancel_kb(type_idx),
+    )
+    await callback.answer()
+
+    # свободные могли появиться, пока менеджер думал
+    await backorders.fill(callback.bot, r_type)
+
+
+@router.callback_query(F.data.startswith(f"{BACKORDER_CANCEL_CALLBACK}:"))
+async def cancel_backorder(callback: CallbackQuery, role: str | None = None):
+    parsed = _parse(callback.data)
+    if parsed is None:
+        await callback.answer()
+        return
+    _, r_type, _ = parsed
+    user_id = callback.from_user.id
+
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        waiting = await conn.fetchval(DBQueries.BACKORDER_CANCEL, user_id, r_type)
+
+    if waiting is None:
+        text = "Заявки уже нет: ресурсы выданы или срок ожидания вышел."
+    else:
+        text = f"✖️ Больше не ждём <b>{esc(r_type)}</b>."
+        if role not in ("admin", "owner"):
+            quotas.refund(user_id, r_type, waiting)
+
+    await callback.message.edit_text(text, reply_markup=None)
+    await callback.answer()
@@ -0,0 +1,64 @@
+# bot/handlers/export.py
+import os
+from datetime import datetime
+
+from aiogram import Router
+from aiogram.filters import Command, CommandObject
+from aiogram.types import Message, FSInputFile
+
+from bot.utils.export import parse_export_args, export_to_file
+from bot.utils.render import esc
+
+router = Router()
+
+# Лимит Telegram на отправку документа ботом
+MAX_DOCUMENT_BYTES = 50 * 1024 * 1024
+
+EXPORT_HELP = (
+    "📤 Выгрузка данных:\n"
+    "<code>/export resources</code> или <code>/export history</code>\n"
+    "Формат: <code>csv</code> (по умолчанию) или <code>jsonl</code>\n"
+    "Фильтры: <code>from:2024-01-01</code> <code>to:2024-01-31</code> "
+    "<code>type:mamba</code> <code>manager:123456</code> <code>action:issued</code>\n\n"
+    "Пример: <code>/export history jsonl from:2024-01-01 action:issued</code>"
+)
+
+
+@router.message(Command("export"))
+async def cmd_export(message: Message, command: CommandObject, role: str | None = None):
+    """
+    Выгрузка ресурсов или истории сжатым файлом.
+    """
+    if role not in ("admin", "owner"):
+        await message.answer("❌ У тебя нет доступа к этой команде.")
+        return
+
+    args = (command.args or "").strip()
+    if not args:
+        await message.answer(EXPORT_HELP)
+        return
+
+    try:
+        req = parse_export_args(args)
+    except ValueError as e:
+        await message.answer(f"❗ {esc(str(e))}")
+        return
+
+    await message.answer("⏳ Готовлю выгрузку…")
+
+    path, rows = await export_to_file(req)
+    try:
+        if os.path.getsize(path) > MAX_DOCUMENT_BYTES:
+            await message.answer(
+                f"❗ Выгрузка ({rows} строк) больше 50 МБ и не пролезет в Telegram. "
+                f"Сузь период или добавь фильтры."
+            )
+            return
+
+        stamp = datetime.now().strftime("%Y%m%d_%H%M")
+        await message.answer_document(
+            FSInputFile(path, filename=f"{req.kind}_{stamp}.{req.fmt}.gz"),
+            caption=f"📤 {req.kind}: {rows} строк",
+        )
+    finally:
+        os.unlink(path)
@@ -1,7 +1,12 @@
+from decimal import Decimal, InvalidOperation
+
 from aiogram import Router, types
 from aiogram.filters import Command
 
+from bot.utils import backorders
+from bot.utils.ingest import BAD_PRICE_TEXT, insert_resources, price_ok
 from bot.utils.queries import DBQueries
+from bot.utils.render import esc
 
 router = Router()
 
@@ -12,12 +17,12 @@ async def import_resources(message: types.Message, role: str | None = None):
     Импорт пачки ресурсов текстом.
     Формат сообщения:
 
-    /import_resources mamba 58
+    /import_resources mamba 58 [поставщик]
     login1;pass1;proxy1
     login2;pass2;
     login3;pass3;proxy3
 
-    - первая строка: команда, тип, цена за единицу
+    - первая строка: команда, тип, цена за единицу, поставщик (опционально)
     - дальше: по одной строке на ресурс: login;password;proxy(опционально)
     """
 
@@ -47,18 +52,20 @@ async def import_resources(message: types.Message, role: str | None = None):
         return
 
     _, res_type, price_str = header_parts[:3]
+    supplier_name = " ".join(header_parts[3:]) or None
 
     # Парсим цену
     try:
-        price = float(price_str.replace(",", "."))
-    except ValueError:
-        await message.answer("❗ Цена должна быть числом, пример: 58 или 58.5")
+        price = Decimal(price_str.replace(",", "."))
+    except InvalidOperation:
+        price = None
+    if price is None or not price_ok(price):
+        await message.answer(BAD_PRICE_TEXT)
         return
 
     pool = message.bot.db
 
     total = 0
-    success = 0
     failed = 0
 
     resources_to_add = []
@@ -87,30 +94,28 @@ async def import_resources(message: types.Message, role: str | None = None):
         return
 
     async with pool.acquire() as conn:
-        for login, password, proxy in resources_to_add:
-            try:
-                await conn.execute(
-                    DBQueries.ADD_RESOURCE,
-                    res_type,
-                    login,
-                    password,
-                    proxy,
-                    None,   # supplier_id
-                    price,
-                )
-                success += 1
-            except Exception:
-                failed += 1
+        supplier_id = None
+        if supplier_name:
+            supplier_id = await conn.fetchval(DBQueries.GET_OR_CREATE_SUPPLIER, supplier_name)
+        result = await insert_resources(conn, res_type, resources_to_add, price, supplier_id)
+
+    success = result.added
 
     text = [
         "✅ Импорт завершён.",
-        f"Тип: <b>{res_type}</b>",
+        f"Тип: <b>{esc(res_type)}</b>",
         f"Цена за единицу: <b>{price}</b>",
+        f"Поставщик: <b>{esc(supplier_name) or '—'}</b>",
         "",
         f"Всего строк: {total}",
         f"Успешно добавлено: <b>{success}</b>",
     ]
     if failed:
         text.append(f"С ошибками: <b>{failed}</b>")
+    text.extend(result.skipped_lines())
 
     await message.answer("\n".join(text))
+
+    # новые ресурсы закоммичены — раздаём тем, кто их ждёт в очереди
+    if success:
+        await backorders.fill(message.bot, res_type)
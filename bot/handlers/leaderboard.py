@@ -0,0 +1,83 @@
+# bot/handlers/leaderboard.py
+from aiogram import Router, F
+from aiogram.filters import Command, CommandObject
+from aiogram.types import Message, CallbackQuery
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+
+from db.database import pool_for
+from bot.utils.leaderboard import PAGE_SIZE, SORTS, Window, parse_top_args, leaderboard_page
+from bot.utils.queries import DBQueries
+from bot.utils.render import esc
+
+router = Router()
+
+TOP_HELP = (
+    "Сортировка: <code>issued</code> (выдано), <code>bad</code> (нерабочих), "
+    "<code>life</code> (средний срок жизни).\n"
+    "Период: число дней или <code>from:2024-01-01 to:2024-01-31</code>.\n"
+    "Пример: <code>/top 30 bad</code>"
+)
+
+
+def _page_kb(window: Window, page: int, total: int):
+    pages = (total + PAGE_SIZE - 1) // PAGE_SIZE
+    if pages <= 1:
+        return None
+    kb = InlineKeyboardBuilder()
+    if page > 0:
+        kb.button(text="◀ Назад", callback_data=window.pack(page - 1))
+    if page + 1 < pages:
+        kb.button(text="Дальше ▶", callback_data=window.pack(page + 1))
+    kb.adjust(2)
+    return kb.as_markup()
+
+
+async def _render(window: Window, page: int):
+    pool = await pool_for(DBQueries.LEADERBOARD)
+    async with pool.acquire() as conn:
+        lines, total = await leaderboard_page(conn, window, page)
+
+    if not lines:
+        return "🏆 За этот период активности нет.", None
+
+    header = (
+        f"🏆 Рейтинг менеджеров ({SORTS[window.sort][1]}), "
+        f"{window.date_from:%d.%m.%Y} — {window.date_to:%d.%m.%Y}:\n"
+    )
+    return "\n".join([header, *lines]), _page_kb(window, page, total)
+
+
+@router.message(Command("top"))
+async def cmd_top(message: Message, command: CommandObject, role: str | None = None):
+    """
+    Рейтинг менеджеров: выдачи, отметки рабочих/нерабочих, средний срок жизни.
+    """
+    if role not in ("admin", "owner"):
+        await message.answer("❌ У тебя нет доступа к этой команде.")
+        return
+
+    try:
+        window = parse_top_args(command.args or "")
+    except ValueError as e:
+        await message.answer(f"❗ {esc(str(e))}\n\n{TOP_HELP}")
+        return
+
+    text, kb = await _render(window, 0)
+    await message.answer(text, reply_markup=kb)
+
+
+@router.callback_query(F.data.startswith("top:"))
+async def top_page(callback: CallbackQuery, role: str | None = None):
+    if role not in ("admin", "owner"):
+        await callback.answer("Нет доступа", show_alert=True)
+        return
+
+    try:
+        window, page = Window.unpack(callback.data)
+    except ValueError:
+        await callback.answer("Некорректная кнопка", show_alert=True)
+        return
+
+    text, kb = await _render(window, page)
+    await callback.message.edit_text(text, reply_markup=kb)
+    await callback.answer()
@@ -1,113 +1,137 @@
 from aiogram import Router, F
-from aiogram.types import Message, ReplyKeyboardRemove
-from aiogram.fsm.context import FSMContext
-from aiogram.fsm.state import StatesGroup, State
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import Message, CallbackQuery
 
 from db.database import get_pool
+from bot.keyboards.lifetime_kb import lifetime_kb
+from bot.utils import survival
 from bot.utils.queries import DBQueries
+from bot.utils.render import esc
 
 router = Router()
 
 
-class LifetimeStates(StatesGroup):
-    choosing_resource = State()
-    entering_lifetime = State()
+def _card_text(r) -> str:
+    text = f"<b>{esc(r['type'])}</b> — <code>{esc(r['login'])}</code>"
+    if r["password"]:
+        text += f" | <code>{esc(r['password'])}</code>"
+    if r["proxy"]:
+        text += f" | proxy: <code>{esc(r['proxy'])}</code>"
+    return text
 
 
-@router.message(F.text == "⏱ Отметить срок жизни")
-async def start_lifetime(message: Message, state: FSMContext):
-    pool = await get_pool()
-    async with pool.acquire() as conn:
-        rows = await conn.fetch(DBQueries.GET_ISSUED_RESOURCES, message.from_user.id)
+def _page(rows, after_id: int = 0):
+    """
+    Карточка ещё не отмеченного ресурса: первая после after_id (по кругу).
+    Возвращает (текст, клавиатура) или None, если отмечать больше нечего.
+    """
+    active = sorted((r for r in rows if r["receipt_state"] != "used"), key=lambda r: r["id"])
+    if not active:
+        return None
+    pos = next((i for i, r in enumerate(active) if r["id"] > after_id), 0)
+    return _card(active[pos], pos + 1, len(active))
 
-    if not rows:
-        await message.answer("У тебя сейчас нет активных ресурсов для отметки времени.")
-        return
 
-    resources = []
-    text_lines = ["Выбери ресурс, для которого хочешь отметить срок жизни.\n"]
-    for idx, r in enumerate(rows, start=1):
-        resources.append(
-            {
-                "id": r["id"],
-                "login": r["login"],
-                "type": r["type"],
-            }
-        )
-        text_lines.append(f"{idx}) <b>{r['type']}</b> — <code>{r['login']}</code>")
+def _card(r, pos: int, total: int):
+    text = _card_text(r)
+    if total > 1:
+        text += f"\n\n{pos} из {total}"
+    return text, lifetime_kb(r["id"], with_next=total > 1)
 
-    await state.update_data(resources=resources)
-    await state.set_state(LifetimeStates.choosing_resource)
 
-    text_lines.append("\nНапиши номер ресурса (например: 1).")
-    await message.answer("\n".join(text_lines), reply_markup=ReplyKeyboardRemove())
+async def _issued(manager_id: int):
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        return await conn.fetch(DBQueries.GET_ISSUED_RESOURCES, manager_id)
 
 
-@router.message(LifetimeStates.choosing_resource)
-async def pick_lifetime_resource(message: Message, state: FSMContext):
-    data = await state.get_data()
-    resources = data.get("resources", [])
+async def send_lifetime_cards(message: Message, rows) -> None:
+    """
+    Одна карточка с кнопками срока жизни вместо сообщения на каждый ресурс:
+    нажатие записывает срок и тут же показывает на месте следующий
+    неотмеченный, «Дальше» — пропустить.
+    """
+    page = _page(rows)
+    if page is not None:
+        text, kb = page
+        await message.answer(text, reply_markup=kb)
 
-    text = message.text.strip()
-    if not text.isdigit():
-        await message.answer("Нужно число (номер ресурса). Попробуй ещё раз.")
-        return
 
-    idx = int(text)
-    if idx < 1 or idx > len(resources):
-        await message.answer("Неверный номер. Попробуй ещё раз.")
-        return
+@router.message(F.text == "⏱ Отметить срок жизни")
+async def start_lifetime(message: Message):
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        rows = await conn.fetch(DBQueries.GET_ISSUED_RESOURCES, message.from_user.id)
 
-    chosen = resources[idx - 1]
-    await state.update_data(chosen_resource=chosen)
-    await state.set_state(LifetimeStates.entering_lifetime)
+    if not any(r["receipt_state"] != "used" for r in rows):
+        await message.answer("У тебя сейчас нет активных ресурсов для отметки времени.")
+        return
 
-    await message.answer(
-        "Введи срок жизни в минутах (например: 60, 120):",
-        reply_markup=ReplyKeyboardRemove(),
-    )
+    await send_lifetime_cards(message, rows)
 
 
-@router.message(LifetimeStates.entering_lifetime)
-async def apply_lifetime(message: Message, state: FSMContext):
-    text = message.text.strip()
-    if not text.isdigit():
-        await message.answer("Нужно число минут. Попробуй ещё раз.")
+@router.callback_query(F.data.startswith("lt_next:"))
+async def next_lifetime_card(callback: CallbackQuery):
+    after = callback.data[len("lt_next:"):]
+    if not after.isdigit():
+        await callback.answer()
         return
 
-    minutes = int(text)
-    data = await state.get_data()
-    chosen = data.get("chosen_resource")
-
-    if not chosen:
-        await message.answer("Ошибка состояния, начни заново: ⏱ Отметить срок жизни")
-        await state.clear()
+    page = _page(await _issued(callback.from_user.id), int(after))
+    if page is None:
+        await callback.message.edit_text("Все ресурсы отмечены.", reply_markup=None)
+    else:
+        text, kb = page
+        try:
+            await callback.message.edit_text(text, reply_markup=kb)
+        except TelegramBadRequest:
+            # неотмеченный остался один — карточка та же
+            pass
+    await callback.answer()
+
+
+@router.callback_query(F.data.startswith("lt_"))
+async def mark_lifetime(callback: CallbackQuery):
+    """
+    lt_{id}:{minutes} — одна кнопка: отметка одним запросом в БД, и на месте
+    карточки — следующий неотмеченный ресурс.
+    """
+    try:
+        resource_part, minutes_part = callback.data[len("lt_"):].split(":", 1)
+        resource_id = int(resource_part)
+        minutes = int(minutes_part)
+    except ValueError:
+        await callback.answer("Некорректная кнопка", show_alert=True)
         return
 
-    resource_id = chosen["id"]
-    res_type = chosen["type"]
-    manager_id = message.from_user.id
-
     pool = await get_pool()
     async with pool.acquire() as conn:
-        async with conn.transaction():
-            await conn.execute(
-                DBQueries.SET_LIFETIME,
-                minutes,
-                resource_id,
-                manager_id,
-            )
-
-            await conn.execute(
-                DBQueries.HISTORY_LIFETIME,
-                resource_id,
-                manager_id,
-                res_type,
-                minutes,
-            )
-
-    await state.clear()
-    await message.answer(
-        f"Срок жизни ресурса <code>{chosen['login']}</code> установлен: <b>{minutes}</b> минут.",
-        reply_markup=ReplyKeyboardRemove(),
-    )
+        row = await conn.fetchrow(
+            DBQueries.MARK_LIFETIME,
+            resource_id,
+            callback.from_user.id,
+            minutes,
+        )
+
+    if row["marked_id"] is None:
+        await callback.answer("Срок жизни уже отмечен или ресурс не твой.", show_alert=True)
+        done = None
+    else:
+        # новая отметка меняет кривые выживаемости
+        survival.invalidate()
+        lifetime = row["lifetime_minutes"] if row["lifetime_minutes"] is not None else "—"
+        done = f"✅ <code>{esc(row['marked_login'])}</code>: срок жизни <b>{lifetime}</b> мин"
+        await callback.answer("Записано")
+
+    # на месте отмеченной — следующая неотмеченная карточка (из той же строки)
+    if row["id"] is None:
+        text, kb = "Все ресурсы отмечены.", None
+    else:
+        text, kb = _card(row, row["pos"], row["total"])
+    if done:
+        text = f"{done}\n\n{text}"
+    try:
+        await callback.message.edit_text(text, reply_markup=kb)
+    except TelegramBadRequest:
+        # ничего не отмечено, а карточка та же
+        pass
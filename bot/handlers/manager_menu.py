@@ -4,6 +4,8 @@ from aiogram.types import Message, ReplyKeyboardMarkup, KeyboardButton
 
 from db.database import get_pool
 from bot.utils.queries import DBQueries
+from bot.utils.render import esc, send_lines
+from bot.handlers.lifetime import send_lifetime_cards
 
 router = Router()
 
@@ -33,40 +35,6 @@ def manager_menu_kb() -> ReplyKeyboardMarkup:
     )
 
 
-async def _send_long_text(
-    message: Message,
-    text: str,
-    reply_markup: ReplyKeyboardMarkup | None = None,
-) -> None:
-    """
-    Отправка длинного текста частями, чтобы не ловить
-    TelegramBadRequest: message is too long.
-    """
-    MAX_LEN = 3500  # запас до лимита 4096
-
-    first = True
-    rest = text
-
-    while rest:
-        chunk = rest[:MAX_LEN]
-        if len(rest) > MAX_LEN:
-            # стараемся резать по строкам
-            last_n = chunk.rfind("\n")
-            if last_n > 0:
-                chunk = rest[:last_n]
-                rest = rest[last_n + 1 :]
-            else:
-                rest = rest[MAX_LEN:]
-        else:
-            rest = ""
-
-        await message.answer(
-            chunk,
-            reply_markup=reply_markup if first else None,
-        )
-        first = False
-
-
 @router.message(CommandStart())
 async def cmd_start(message: Message):
     await message.answer(
@@ -87,11 +55,18 @@ async def cmd_myid(message: Message):
     await message.answer(f"Твой Telegram ID: <code>{message.from_user.id}</code>")
 
 
+def _used_line(r) -> str:
+    line = f"• <b>{esc(r['type'])}</b> — <code>{esc(r['login'])}</code>"
+    if r["lifetime_minutes"] is not None:
+        line += f" | ⏱ {r['lifetime_minutes']} мин"
+    return line
+
+
 @router.message(F.text == "📋 Мои ресурсы")
 async def my_resources(message: Message):
     """
     Показать выданные ресурсы текущего менеджера.
-    Если ресурсов много — разбиваем ответ на несколько сообщений.
+    Активные — карточкой с кнопками срока жизни, по одному ресурсу.
     """
     pool = await get_pool()
     async with pool.acquire() as conn:
@@ -101,17 +76,11 @@ async def my_resources(message: Message):
         await message.answer("У тебя сейчас нет активных ресурсов.")
         return
 
-    lines: list[str] = ["📋 Твои активные ресурсы:\n"]
-    for r in rows:
-        login = r["login"]
-        password = r["password"]
-        proxy = r["proxy"]
-        r_type = r["type"]
-
-        line = f"• <b>{r_type}</b> — <code>{login}</code> | <code>{password}</code>"
-        if proxy:
-            line += f" | proxy: <code>{proxy}</code>"
-        lines.append(line)
+    # Уже отработавшие — одним списком, остальные — карточкой с кнопками срока жизни
+    used = [r for r in rows if r["receipt_state"] == "used"]
+    if used:
+        await send_lines(message, ["📋 Отработавшие ресурсы:", "", *(_used_line(r) for r in used)])
 
-    full_text = "\n".join(lines)
-    await _send_long_text(message, full_text)
+    if len(used) < len(rows):
+        await message.answer("📋 Твои активные ресурсы (нажми срок жизни, когда ресурс отработал):")
+        await send_lifetime_cards(message, rows)
@@ -0,0 +1,121 @@
+# bot/handlers/profiling.py
+from datetime import datetime
+
+from aiogram import Router
+from aiogram.filters import Command, CommandObject
+from aiogram.types import BufferedInputFile, Message
+
+from bot.utils import profiling
+from bot.utils.fsm_storage import TTLMemoryStorage
+from bot.utils.render import esc, send_lines
+
+router = Router()
+
+DEFAULT_PROFILE_SEC = 10
+
+MEMSNAP_HELP = (
+    "🧠 Снимки памяти (tracemalloc):\n"
+    "<code>/memsnap start</code> — включить и снять базу\n"
+    "<code>/memsnap</code> — что выросло с прошлого снимка\n"
+    "<code>/memsnap stop</code> — выключить\n"
+    f"Пока включено, бот работает медленнее; само выключится через "
+    f"{profiling.MEMSNAP_MAX_MINUTES} мин."
+)
+
+OWNER_ONLY = "⛔ Эта команда доступна только владельцу (owner)."
+
+
+@router.message(Command("profile"))
+async def cmd_profile(message: Message, command: CommandObject, role: str | None = None):
+    """
+    /profile [секунд] — сэмплирующий профиль живого бота и шаги loop,
+    которые его блокируют. Отчёт — текстом, стеки — файлом для flamegraph.
+    """
+    if role != "owner":
+        await message.answer(OWNER_ONLY)
+        return
+
+    arg = (command.args or "").strip()
+    if arg and not arg.isdigit():
+        await message.answer(
+            f"Укажи длительность в секундах: <code>/profile 10</code> "
+            f"(до {profiling.MAX_PROFILE_SEC})."
+        )
+        return
+    seconds = min(int(arg or DEFAULT_PROFILE_SEC), profiling.MAX_PROFILE_SEC)
+
+    if profiling.is_profiling():
+        await message.answer("⏳ Профиль уже снимается, дождись результата.")
+        return
+
+    await message.answer(f"⏱ Снимаю профиль {seconds} с…")
+    prof = await profiling.profile(seconds)
+
+    await send_lines(message, profiling.profile_report(prof))
+    if prof.stacks:
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        await message.answer_document(
+            BufferedInputFile(
+                profiling.collapsed_stacks(prof).encode(), filename=f"profile_{stamp}.folded"
+            ),
+            caption="Стеки для flamegraph.pl / speedscope",
+        )
+
+
+@router.message(Command("memsnap"))
+async def cmd_memsnap(message: Message, command: CommandObject, role: str | None = None):
+    if role != "owner":
+        await message.answer(OWNER_ONLY)
+        return
+
+    arg = (command.args or "").strip().lower()
+
+    if arg == "start":
+        if profiling.memsnap_start():
+            await message.answer("🧠 tracemalloc включён, база снята. Повтори /memsnap позже.")
+        else:
+            await message.answer("tracemalloc уже включён.")
+        return
+
+    if arg == "stop":
+        if profiling.memsnap_stop():
+            await message.answer("🧠 tracemalloc выключен.")
+        else:
+            await message.answer("tracemalloc и так выключен.")
+        return
+
+    if arg:
+        await message.answer(MEMSNAP_HELP)
+        return
+
+    lines = profiling.memsnap_diff()
+    if lines is None:
+        await message.answer(MEMSNAP_HELP)
+        return
+    await send_lines(message, lines)
+
+
+@router.message(Command("fsm"))
+async def cmd_fsm(message: Message, fsm_storage=None, role: str | None = None):
+    """
+    /fsm — сколько незаконченных сценариев держит FSM-хранилище и сколько они весят.
+    """
+    if role != "owner":
+        await message.answer(OWNER_ONLY)
+        return
+
+    if not isinstance(fsm_storage, TTLMemoryStorage):
+        await message.answer("Статистика есть только у TTLMemoryStorage.")
+        return
+
+    stats = fsm_storage.stats()
+    lines = [
+        f"🗂 FSM: {stats.keys} записей, {stats.bytes / 2**10:.0f} КБ "
+        f"из {stats.max_bytes / 2**20:.0f} МБ",
+        f"Истекло по TTL: {stats.expired}, вытеснено по памяти: {stats.evicted}",
+    ]
+    if stats.by_state:
+        lines.append("")
+    for state, (count, size) in stats.by_state.items():
+        lines.append(f"{count:>5}  {size / 2**10:7.1f} КБ  {esc(state) or '<i>только данные</i>'}")
+    await send_lines(message, lines)
@@ -0,0 +1,108 @@
+# bot/handlers/quotas.py
+from aiogram import Router, F
+from aiogram.filters import Command, CommandObject
+from aiogram.types import Message
+
+from db.database import get_pool
+from bot.utils import quotas
+from bot.utils.queries import DBQueries
+from bot.utils.render import esc, send_long_text
+
+router = Router()
+
+QUOTAS_BUTTON_TEXT = "🚦 Квоты"
+
+HELP = (
+    "Изменить: <code>/quota &lt;tg_id|*&gt; &lt;тип|*&gt; &lt;в час&gt; &lt;в сутки&gt; &lt;пачка&gt;</code>\n"
+    "«-» — без ограничения, * — все менеджеры / любой тип.\n"
+    "Например: <code>/quota * mamba 20 100 5</code>\n"
+    "Удалить: <code>/quota del &lt;tg_id|*&gt; &lt;тип|*&gt;</code>"
+)
+
+
+def _parse_manager(value: str) -> int:
+    return quotas.ALL if value == "*" else int(value)
+
+
+def _parse_limit(value: str) -> int | None:
+    if value == "-":
+        return None
+    limit = int(value)
+    if limit <= 0:
+        raise ValueError(value)
+    return limit
+
+
+async def _show_quotas(message: Message) -> None:
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        rows = await conn.fetch(DBQueries.QUOTAS_LIST)
+
+    lines = ["🚦 Квоты выдачи:"]
+    if rows:
+        lines.extend(
+            quotas.format_quota(
+                r["manager_tg_id"],
+                r["type"],
+                quotas.Quota(r["per_hour"], r["per_day"], r["burst"]),
+            )
+            for r in rows
+        )
+    else:
+        lines.append("пока не заданы — выдача без ограничений.")
+    lines.extend(["", HELP])
+
+    await send_long_text(message, "\n".join(lines))
+
+
+@router.message(F.text == QUOTAS_BUTTON_TEXT)
+async def btn_quotas(message: Message, role: str | None = None):
+    if role not in ("admin", "owner"):
+        await message.answer("❌ У тебя нет доступа к этой команде.")
+        return
+    await _show_quotas(message)
+
+
+@router.message(Command("quota"))
+async def cmd_quota(message: Message, command: CommandObject, role: str | None = None):
+    """
+    /quota — список, /quota <кто> <тип> <в час> <в сутки> <пачка> — задать,
+    /quota del <кто> <тип> — удалить.
+    """
+    if role not in ("admin", "owner"):
+        await message.answer("❌ У тебя нет доступа к этой команде.")
+        return
+
+    parts = (command.args or "").split()
+    if not parts:
+        await _show_quotas(message)
+        return
+
+    pool = await get_pool()
+    try:
+        if parts[0] == "del":
+            if len(parts) < 3:
+                raise ValueError("del")
+            manager_id = _parse_manager(parts[1])
+            r_type = " ".join(parts[2:])
+            async with pool.acquire() as conn:
+                await conn.execute(DBQueries.QUOTA_DELETE, manager_id, r_type)
+            text = f"🗑 Квота удалена: {esc(parts[1])} / {esc(r_type)}"
+        else:
+            if len(parts) < 5:
+                raise ValueError("set")
+            manager_id = _parse_manager(parts[0])
+            # тип может быть с пробелами, например «mamba [dolphin]»
+            r_type = " ".join(parts[1:-3])
+            per_hour, per_day, burst = (_parse_limit(v) for v in parts[-3:])
+            quota = quotas.Quota(per_hour, per_day, burst)
+            async with pool.acquire() as conn:
+                await conn.execute(DBQueries.QUOTA_SET, manager_id, r_type, per_hour, per_day, burst)
+            text = "✅ Квота сохранена:\n" + quotas.format_quota(manager_id, r_type, quota)
+    except ValueError:
+        await message.answer("Не понял параметры.\n\n" + HELP)
+        return
+
+    # на этой реплике — сразу, на остальных — в пределах минуты
+    quotas.invalidate()
+    await message.answer(text)
@@ -3,7 +3,7 @@ from aiogram.types import Message, ReplyKeyboardMarkup, KeyboardButton
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import StatesGroup, State
 
-from db.database import get_pool
+from db.database import pool_for
 from bot.handlers.admin_menu import admin_menu_kb
 from bot.handlers.manager_menu import BACK_BUTTON_TEXT
 from bot.utils.queries import DBQueries
@@ -56,7 +56,8 @@ async def choose_period(message: Message, role: str | None = None, state: FSMCon
         await state.clear()
         return
 
-    pool = await get_pool()
+    # отчёты читают с реплики, если она настроена и не отстаёт
+    pool = await pool_for(DBQueries.REPORT_RESOURCES)
     async with pool.acquire() as conn:
         if text == "📊 За сегодня":
             # Итого по ресурсам за сегодня (готовый SQL из DBQueries)
@@ -88,18 +89,7 @@ async def choose_period(message: Message, role: str | None = None, state: FSMCon
 
         elif text == "📊 За 7 дней":
             # Более "сырой" отчёт по истории за неделю
-            row = await conn.fetchrow(
-                """
-                SELECT
-                    COALESCE(SUM(CASE WHEN action = 'purchase' THEN price ELSE 0 END), 0) AS purchases_sum,
-                    COALESCE(COUNT(*) FILTER (WHERE action = 'purchase'), 0) AS purchases_count,
-                    COALESCE(COUNT(*) FILTER (WHERE action = 'issued'), 0) AS issued_count,
-                    COALESCE(COUNT(*) FILTER (WHERE action = 'status_good'), 0) AS good_count,
-                    COALESCE(COUNT(*) FILTER (WHERE action = 'status_bad'), 0) AS bad_count
-                FROM history
-                WHERE datetime >= NOW() - INTERVAL '7 days';
-                """
-            )
+            row = await conn.fetchrow(DBQueries.REPORT_WEEK)
 
             text_report = (
                 "📊 Отчёт за <b>последние 7 дней</b>:\n\n"
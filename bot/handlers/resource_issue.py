@@ -1,186 +1,224 @@
 from aiogram import Router, F
-from aiogram.types import Message, ReplyKeyboardMarkup, KeyboardButton
-from aiogram.fsm.context import FSMContext
-from aiogram.fsm.state import StatesGroup, State
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import Message, CallbackQuery
+from aiogram.utils.keyboard import InlineKeyboardBuilder
 
 from db.database import get_pool
-from bot.handlers.manager_menu import manager_menu_kb
-from bot.utils.admin_stats import send_free_resources_stats
+from bot.config import RESERVE_TTL_MINUTES
+from bot.utils import inventory, quotas
+from bot.utils.idempotency import already_requested, issue_once
+from bot.utils.queries import DBQueries
+from bot.utils.render import chunk_lines, esc, resource_lines
 
 router = Router()
 
 # Добавили новый тип mamba [dolphin]
 RESOURCE_TYPES = ["mamba", "tabor", "beboo", "rambler", "mamba [dolphin]"]
 
-BACK_BUTTON = "⬅️ Назад"
+CONFIRM_CALLBACK = "rsv_ok"
 
+# Сетка выдачи: ig:<индекс типа>:<сколько>, ig:r — обновить остатки
+GRID_CALLBACK = "ig"
+GRID_REFRESH = "r"
+GRID_COUNTS = (1, 2, 3, 5, 10)
+GRID_TEXT = "Выбери тип и сколько нужно:"
 
-def type_choice_kb() -> ReplyKeyboardMarkup:
-    rows: list[list[KeyboardButton]] = []
-    row: list[KeyboardButton] = []
+# bo:<индекс типа>:<сколько> — встать в очередь, bo_x:<индекс типа> — выйти из неё
+BACKORDER_CALLBACK = "bo"
+BACKORDER_CANCEL_CALLBACK = "bo_x"
 
-    for idx, t in enumerate(RESOURCE_TYPES, start=1):
-        row.append(KeyboardButton(text=t))
-        if idx % 3 == 0:
-            rows.append(row)
-            row = []
-    if row:
-        rows.append(row)
 
-    rows.append([KeyboardButton(text=BACK_BUTTON)])
+def confirm_kb():
+    kb = InlineKeyboardBuilder()
+    kb.button(text="✅ Беру", callback_data=CONFIRM_CALLBACK)
+    return kb.as_markup()
 
-    return ReplyKeyboardMarkup(keyboard=rows, resize_keyboard=True)
 
-
-def count_kb() -> ReplyKeyboardMarkup:
-    rows = [
-        [
-            KeyboardButton(text="1"),
-            KeyboardButton(text="2"),
-            KeyboardButton(text="3"),
-            KeyboardButton(text="4"),
-            KeyboardButton(text="5"),
-        ],
-        [
-            KeyboardButton(text="6"),
-            KeyboardButton(text="7"),
-            KeyboardButton(text="8"),
-            KeyboardButton(text="9"),
-            KeyboardButton(text="10"),
-        ],
-        [KeyboardButton(text=BACK_BUTTON)],
-    ]
-    return ReplyKeyboardMarkup(keyboard=rows, resize_keyboard=True)
-
-
-class IssueStates(StatesGroup):
-    waiting_type = State()
-    waiting_count = State()
+def backorder_kb(r_type: str, count: int):
+    kb = InlineKeyboardBuilder()
+    kb.button(
+        text=f"🔔 Встать в очередь на {count} шт.",
+        callback_data=f"{BACKORDER_CALLBACK}:{RESOURCE_TYPES.index(r_type)}:{count}",
+    )
+    return kb.as_markup()
 
 
-@router.message(F.text == "📦 Получить ресурсы")
-async def start_issue(message: Message, state: FSMContext):
-    await state.set_state(IssueStates.waiting_type)
+async def offer_backorder(message: Message, r_type: str, missing: int) -> None:
+    """
+    Не хватило свободных — предложить дождаться их в очереди.
+    """
     await message.answer(
-        "Выбери тип ресурса, который тебе нужен:",
-        reply_markup=type_choice_kb(),
+        f"Не хватило {missing} шт. Встань в очередь — пришлю сам, "
+        f"как только администратор загрузит <b>{esc(r_type)}</b>.",
+        reply_markup=backorder_kb(r_type, missing),
     )
 
 
-@router.message(IssueStates.waiting_type, F.text == BACK_BUTTON)
-@router.message(IssueStates.waiting_count, F.text == BACK_BUTTON)
-async def cancel_issue(message: Message, state: FSMContext):
-    await state.clear()
-    await message.answer("Главное меню:", reply_markup=manager_menu_kb())
-
+def _grid_label(r_type: str, free: int) -> str:
+    return f"{r_type} — свободно {free}" if free else f"{r_type} — нет"
 
-@router.message(IssueStates.waiting_type)
-async def choose_type(message: Message, state: FSMContext):
-    r_type = (message.text or "").strip()
 
-    if r_type not in RESOURCE_TYPES:
-        await message.answer(
-            "Пожалуйста, выбери тип кнопкой ниже:",
-            reply_markup=type_choice_kb(),
+async def issue_grid_kb():
+    """
+    Сетка тип × количество: строка с типом и остатком (из кэша), под ней
+    кнопки количества. Нажатие на тип — обновить остатки.
+    """
+    free = await inventory.free_by_type()
+    kb = InlineKeyboardBuilder()
+    for idx, r_type in enumerate(RESOURCE_TYPES):
+        kb.button(
+            text=_grid_label(r_type, free.get(r_type, 0)),
+            callback_data=f"{GRID_CALLBACK}:{GRID_REFRESH}",
         )
-        return
-
-    await state.update_data(type=r_type)
-    await state.set_state(IssueStates.waiting_count)
+        for count in GRID_COUNTS:
+            kb.button(text=str(count), callback_data=f"{GRID_CALLBACK}:{idx}:{count}")
+    kb.adjust(1, len(GRID_COUNTS), repeat=True)
+    return kb.as_markup()
 
-    await message.answer(
-        "Сколько ресурсов тебе нужно (от 1 до 10)?",
-        reply_markup=count_kb(),
-    )
-
-
-@router.message(IssueStates.waiting_count)
-async def choose_count(message: Message, state: FSMContext, role: str | None = None):
-    text = (message.text or "").strip()
 
-    if text == BACK_BUTTON:
-        await state.set_state(IssueStates.waiting_type)
-        await message.answer(
-            "Выбери тип ресурса, который тебе нужен:",
-            reply_markup=type_choice_kb(),
-        )
+@router.message(F.text == "📦 Получить ресурсы")
+async def start_issue(message: Message):
+    await message.answer(GRID_TEXT, reply_markup=await issue_grid_kb())
+
+
+def _parse_grid(data: str) -> tuple[str, int] | None:
+    parts = data.split(":")
+    if len(parts) != 3 or not parts[1].isdigit() or not parts[2].isdigit():
+        return None
+    type_idx, count = int(parts[1]), int(parts[2])
+    if type_idx >= len(RESOURCE_TYPES) or not 1 <= count <= max(GRID_COUNTS):
+        return None
+    return RESOURCE_TYPES[type_idx], count
+
+
+@router.callback_query(F.data.startswith(f"{GRID_CALLBACK}:"))
+async def issue_from_grid(callback: CallbackQuery, role: str | None = None):
+    """
+    Одно нажатие в сетке — выдача. Сообщение с сеткой превращается
+    в результат, ниже — новая сетка для следующей выдачи.
+    """
+    message = callback.message
+
+    if callback.data == f"{GRID_CALLBACK}:{GRID_REFRESH}":
+        try:
+            await message.edit_reply_markup(reply_markup=await issue_grid_kb())
+        except TelegramBadRequest:
+            # остатки не изменились — телеграм не даёт «изменить» на то же самое
+            pass
+        await callback.answer()
         return
 
-    if not text.isdigit():
-        await message.answer(
-            "Введи число от 1 до 10 или нажми кнопку.",
-            reply_markup=count_kb(),
-        )
+    parsed = _parse_grid(callback.data)
+    if parsed is None:
+        await callback.answer()
         return
-
-    count = int(text)
-    if not (1 <= count <= 10):
-        await message.answer("Нужно число от 1 до 10.", reply_markup=count_kb())
+    r_type, count = parsed
+    user_id = callback.from_user.id
+
+    # Одна сетка — одна выдача: повтор нажатия (двойной тап, переотправка
+    # апдейта) по тому же сообщению получает прежний результат. Известный
+    # повтор отсекаем до квоты — он ничего не выдаёт и списывать нечего.
+    request_key = f"{GRID_CALLBACK}:{message.message_id}"
+    if already_requested(message.chat.id, request_key):
+        await callback.answer("Уже выдано")
         return
 
-    data = await state.get_data()
-    r_type = data.get("type")
-
-    pool = await get_pool()
-    async with pool.acquire() as conn:
-        rows = await conn.fetch(
-            """
-            SELECT id, login, password, proxy
-            FROM resources
-            WHERE status = 'free'
-              AND manager_tg_id IS NULL
-              AND type = $1
-            ORDER BY id
-            LIMIT $2
-            """,
-            r_type,
-            count,
-        )
-
-        if not rows:
-            await state.clear()
-            await message.answer(
-                f"Свободных ресурсов типа <b>{r_type}</b> сейчас нет. "
-                f"Попроси администратора загрузить новые.",
-                reply_markup=manager_menu_kb(),
-            )
+    # квоты — только для менеджеров; админы выдают себе без ограничений
+    limited = role not in ("admin", "owner")
+    if limited:
+        denied = await quotas.acquire(user_id, r_type, count)
+        if denied:
+            await callback.answer(denied, show_alert=True)
             return
 
-        ids = [r["id"] for r in rows]
-
-        # Статус не трогаем, только помечаем, что ресурс выдан менеджеру
-        await conn.execute(
-            """
-            UPDATE resources
-            SET manager_tg_id = $1
-            WHERE id = ANY($2::int[])
-            """,
-            message.from_user.id,
-            ids,
-        )
-
-    issued_count = len(rows)
-    lines = [f"📦 Выдано ресурсов: {issued_count} (тип: {r_type})", ""]
+    # Статус не трогаем, только помечаем, что ресурс выдан менеджеру;
+    # какие именно ресурсы — решает стратегия выдачи для типа.
+    # При RESERVE_TTL_MINUTES > 0 ресурсы пока только забронированы.
+    rows, replayed = await issue_once(
+        message.chat.id,
+        request_key,
+        user_id,
+        r_type,
+        count,
+        reserve_minutes=RESERVE_TTL_MINUTES,
+    )
+    if limited:
+        # повтор с другой реплики или после рестарта ничего не выдал заново,
+        # а свободных могло не хватить
+        quotas.refund(user_id, r_type, count if replayed else count - len(rows))
+
+    if replayed:
+        # сообщение уже заменено результатом первого нажатия
+        await callback.answer("Уже выдано")
+        return
 
-    for idx, row in enumerate(rows, start=1):
-        login = row["login"]
-        password = row["password"] or ""
-        proxy = row.get("proxy")
+    inventory.taken(r_type, len(rows))
+    await callback.answer()
 
-        if password:
-            line = f"{idx}) {login} | {password}"
+    if not rows:
+        await message.edit_text(
+            f"Свободных ресурсов типа <b>{esc(r_type)}</b> сейчас нет. "
+            f"Встань в очередь — пришлю сам, как только администратор их загрузит.",
+            reply_markup=backorder_kb(r_type, count),
+        )
+    else:
+        issued_count = len(rows)
+        if RESERVE_TTL_MINUTES > 0:
+            # пароли и прокси — только после подтверждения, чтобы брошенная
+            # бронь не вернулась в пул уже использованной
+            lines = [
+                f"🕒 Забронировано ресурсов: {issued_count} (тип: {esc(r_type)}) "
+                f"на {RESERVE_TTL_MINUTES} мин.",
+                "Нажми «Беру», чтобы получить данные, иначе они вернутся в общий пул.",
+                "",
+                *resource_lines(rows, with_secrets=False),
+            ]
+            markup = confirm_kb()
         else:
-            # Для mamba [dolphin] пароль пустой – показываем просто имя профиля
-            line = f"{idx}) {login}"
-
-        if proxy:
-            line += f" | proxy: {proxy}"
-
-        lines.append(line)
+            lines = [
+                f"📦 Выдано ресурсов: {issued_count} (тип: {esc(r_type)})",
+                "",
+                *resource_lines(rows),
+            ]
+            markup = None
+
+        # первый кусок заменяет сетку, остальные — следом
+        chunks = chunk_lines(lines)
+        await message.edit_text(next(chunks), reply_markup=markup)
+        for chunk in chunks:
+            await message.answer(chunk)
+
+        if issued_count < count:
+            await offer_backorder(message, r_type, count - issued_count)
+
+    await message.answer(GRID_TEXT, reply_markup=await issue_grid_kb())
+
+
+@router.callback_query(F.data == CONFIRM_CALLBACK)
+async def confirm_reservation(callback: CallbackQuery):
+    """
+    Одно нажатие — подтвердить все живые брони менеджера и показать данные.
+    """
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        rows = await conn.fetch(DBQueries.CONFIRM_RESERVATIONS, callback.from_user.id)
 
-    await message.answer("\n".join(lines), reply_markup=manager_menu_kb())
-    await state.clear()
+    if not rows:
+        await callback.message.edit_text(
+            f"{callback.message.html_text}\n\n⌛ Бронь истекла или уже подтверждена.",
+            reply_markup=None,
+        )
+        await callback.answer()
+        return
 
-    # После выдачи — статистика свободных ресурсов только админу
-    if role == "admin":
-        await send_free_resources_stats(message)
+    lines = [f"📦 Выдано ресурсов: {len(rows)}"]
+    for r_type in dict.fromkeys(r["type"] for r in rows):
+        lines.extend(["", f"<b>{esc(r_type)}</b>:"])
+        lines.extend(resource_lines([r for r in rows if r["type"] == r_type]))
+
+    # первый кусок заменяет сообщение с бронью, остальные — следом
+    chunks = chunk_lines(lines)
+    await callback.message.edit_text(next(chunks), reply_markup=None)
+    for chunk in chunks:
+        await callback.message.answer(chunk)
+    await callback.answer("Ресурсы твои")
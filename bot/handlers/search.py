@@ -0,0 +1,126 @@
+# bot/handlers/search.py
+import html
+
+from aiogram import Router, F
+from aiogram.filters import Command, CommandObject
+from aiogram.fsm.context import FSMContext
+from aiogram.types import Message, CallbackQuery
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+
+from db.database import get_pool
+from bot.utils.queries import DBQueries
+from bot.utils.search import parse_find_args, find_resources
+
+router = Router()
+
+PAGE_SIZE = 20
+
+FIND_HELP = (
+    "🔎 Поиск ресурсов:\n"
+    "<code>/find abc</code> — логин содержит abc\n"
+    "<code>/find abc*</code> — логин начинается с abc\n"
+    "<code>/find 123</code> — ресурс по id\n\n"
+    "Фильтры (можно без текста):\n"
+    "<code>type:mamba</code>, <code>manager:123456</code>, "
+    "<code>state:bad</code> (new / good / bad / used / free / issued)"
+)
+
+
+def _resource_line(r) -> str:
+    owner = f"у {r['manager_tg_id']}" if r["manager_tg_id"] else "свободен"
+    state = r["receipt_state"] or r["status"] or "—"
+    return (
+        f"#{r['id']} <b>{html.escape(r['type'])}</b> "
+        f"<code>{html.escape(r['login'])}</code> — {owner}, {state}"
+    )
+
+
+def _page_kb(next_after: int | None, first_page: bool):
+    if first_page and next_after is None:
+        return None
+    kb = InlineKeyboardBuilder()
+    if not first_page:
+        kb.button(text="⏮ В начало", callback_data="find:0")
+    if next_after is not None:
+        kb.button(text="Дальше ▶", callback_data=f"find:{next_after}")
+    kb.adjust(2)
+    return kb.as_markup()
+
+
+async def _render_page(filters: dict, after_id: int):
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        rows = await find_resources(conn, filters, after_id, PAGE_SIZE + 1)
+
+    has_more = len(rows) > PAGE_SIZE
+    rows = rows[:PAGE_SIZE]
+
+    if not rows:
+        return "Ничего не найдено.", None
+
+    lines = ["🔎 Найдено:\n", *(_resource_line(r) for r in rows)]
+    next_after = rows[-1]["id"] if has_more else None
+    return "\n".join(lines), _page_kb(next_after, first_page=after_id == 0)
+
+
+@router.message(Command("find"))
+async def cmd_find(message: Message, command: CommandObject, state: FSMContext, role: str | None = None):
+    """
+    Поиск ресурсов по логину, типу, менеджеру и состоянию.
+    """
+    if role not in ("admin", "owner"):
+        await message.answer("❌ У тебя нет доступа к этой команде.")
+        return
+
+    args = (command.args or "").strip()
+    if not args:
+        await message.answer(FIND_HELP)
+        return
+
+    # /find 123 или /find #123 — конкретный ресурс
+    if args.lstrip("#").isdigit():
+        pool = await get_pool()
+        async with pool.acquire() as conn:
+            r = await conn.fetchrow(DBQueries.GET_RESOURCE_BY_ID, int(args.lstrip("#")))
+        if not r:
+            await message.answer("Ресурс не найден.")
+            return
+        text = (
+            f"{_resource_line(r)}\n\n"
+            f"Пароль: <code>{html.escape(r['password'] or '')}</code>\n"
+            f"Прокси: <code>{html.escape(r['proxy'] or '—')}</code>\n"
+            f"Поставщик: {r['supplier_id'] or '—'}, цена: {r['buy_price']}\n"
+            f"Выдан: {r['issue_datetime'] or '—'}\n"
+            f"Срок жизни: {r['lifetime_minutes'] or '—'} мин"
+        )
+        await message.answer(text)
+        return
+
+    try:
+        filters = parse_find_args(args)
+    except ValueError as e:
+        await message.answer(f"❗ {e}")
+        return
+
+    # фильтры нужны для следующих страниц — кнопка несёт только курсор
+    await state.update_data(find=filters)
+
+    text, kb = await _render_page(filters, 0)
+    await message.answer(text, reply_markup=kb)
+
+
+@router.callback_query(F.data.startswith("find:"))
+async def find_page(callback: CallbackQuery, state: FSMContext, role: str | None = None):
+    if role not in ("admin", "owner"):
+        await callback.answer("Нет доступа", show_alert=True)
+        return
+
+    filters = (await state.get_data()).get("find")
+    if not filters:
+        await callback.answer("Поиск устарел, повтори /find", show_alert=True)
+        return
+
+    after_id = int(callback.data.split(":", 1)[1])
+    text, kb = await _render_page(filters, after_id)
+    await callback.message.edit_text(text, reply_markup=kb)
+    await callback.answer()
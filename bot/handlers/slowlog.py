@@ -0,0 +1,86 @@
+# bot/handlers/slowlog.py
+from aiogram import Router
+from aiogram.filters import Command, CommandObject
+from aiogram.types import Message
+
+from bot.config import SLOWLOG_THRESHOLD_MS
+from bot.utils import slowlog
+from bot.utils.render import MAX_MESSAGE_LEN, chunk_lines, esc, send_lines
+
+router = Router()
+
+# Сколько записей показывать в списке
+LIST_LIMIT = 20
+SQL_PREVIEW_LEN = 150
+
+
+def _title(entry: slowlog.SlowQuery) -> str:
+    name = f"<b>{esc(entry.name)}</b>" if entry.name else "<i>без имени</i>"
+    failed = " ❌" if entry.failed else ""
+    plan = " 📋" if entry.plan else ""
+    return (
+        f"#{entry.id} {entry.at:%d.%m %H:%M:%S} — {entry.elapsed_ms:.0f} мс{failed}{plan} {name}"
+    )
+
+
+def _list_lines(entries: list[slowlog.SlowQuery]):
+    yield f"🐢 Медленные запросы (порог {SLOWLOG_THRESHOLD_MS:.0f} мс), новые первыми:"
+    for entry in entries[:LIST_LIMIT]:
+        sql = entry.sql if len(entry.sql) <= SQL_PREVIEW_LEN else entry.sql[:SQL_PREVIEW_LEN] + "…"
+        yield ""
+        yield _title(entry)
+        yield f"<code>{esc(sql)}</code>"
+    if len(entries) > LIST_LIMIT:
+        yield ""
+        yield f"…и ещё {len(entries) - LIST_LIMIT}."
+    yield ""
+    yield "Подробно, с планом: <code>/slowlog &lt;номер&gt;</code>"
+
+
+def _entry_lines(entry: slowlog.SlowQuery):
+    yield _title(entry)
+    yield f"Параметры: {esc(', '.join(entry.param_types)) or '—'}"
+    yield ""
+    yield f"<code>{esc(entry.sql)}</code>"
+    if entry.plan is None:
+        yield ""
+        yield "План не снимался (этот запрос недавно уже разбирали или EXPLAIN ещё идёт)."
+
+
+async def _send_plan(message: Message, plan: str) -> None:
+    # план режем по строкам, каждый кусок — в своём <pre>
+    lines = (esc(line) for line in plan.split("\n"))
+    for chunk in chunk_lines(lines, MAX_MESSAGE_LEN - len("<pre></pre>")):
+        await message.answer(f"<pre>{chunk}</pre>")
+
+
+@router.message(Command("slowlog"))
+async def cmd_slowlog(message: Message, command: CommandObject, role: str | None = None):
+    """
+    /slowlog — последние медленные запросы, /slowlog 12 — запись с планом.
+    """
+    if role not in ("admin", "owner"):
+        await message.answer("❌ У тебя нет доступа к этой команде.")
+        return
+
+    if SLOWLOG_THRESHOLD_MS <= 0:
+        await message.answer("Журнал медленных запросов выключен (SLOWLOG_THRESHOLD_MS=0).")
+        return
+
+    arg = (command.args or "").strip().lstrip("#")
+    if arg:
+        entry = slowlog.get(int(arg)) if arg.isdigit() else None
+        if entry is None:
+            await message.answer("Такой записи нет (журнал хранит последние записи в памяти).")
+            return
+        await send_lines(message, _entry_lines(entry))
+        if entry.plan is not None:
+            await _send_plan(message, entry.plan)
+        return
+
+    entries = slowlog.entries()
+    if not entries:
+        await message.answer("🐢 Медленных запросов с момента запуска не было.")
+        return
+
+    await send_lines(message, _list_lines(entries))
@@ -8,7 +8,10 @@ from aiogram.types import (
 from aiogram.filters import Command
 
 from db.database import get_pool
+from bot.config import AUTO_REPLACE_BAD, AUTO_REPLACE_BAD_BY_TYPE
+from bot.utils import allocator
 from bot.utils.queries import DBQueries
+from bot.utils.render import esc, resource_lines, send_lines
 
 router = Router()
 
@@ -46,35 +49,6 @@ class StatusFSM:
     waiting_status_choice = "waiting_status_choice"
 
 
-# ================================
-# ВСПОМОГАТЕЛЬНАЯ ФУНКЦИЯ
-# ================================
-
-async def send_long_text(message: Message, text: str, reply_markup=None):
-    """
-    Безопасная отправка длинных сообщений без ошибки:
-    TelegramBadRequest: message is too long
-    """
-    MAX = 3500
-    rest = text
-    first = True
-
-    while rest:
-        chunk = rest[:MAX]
-        if len(rest) > MAX:
-            last_n = chunk.rfind("\n")
-            if last_n > 0:
-                chunk = rest[:last_n]
-                rest = rest[last_n + 1:]
-            else:
-                rest = rest[MAX:]
-        else:
-            rest = ""
-
-        await message.answer(chunk, reply_markup=reply_markup if first else None)
-        first = False
-
-
 # ================================
 # СТАРТ СТАТУСА
 # ================================
@@ -105,14 +79,15 @@ async def send_next_resource(message: Message, state: FSMContext):
         return
 
     r = rows[index]
-    text = (
-        f"<b>Ресурс {index+1} из {len(rows)}</b>\n\n"
-        f"Тип: <b>{r['type']}</b>\n"
-        f"Логин: <code>{r['login']}</code>\n"
-        f"Пароль: <code>{r['password']}</code>\n"
-    )
-
-    await send_long_text(message, text, reply_markup=status_choice_kb())
+    lines = [
+        f"<b>Ресурс {index+1} из {len(rows)}</b>",
+        "",
+        f"Тип: <b>{esc(r['type'])}</b>",
+        f"Логин: <code>{esc(r['login'])}</code>",
+        f"Пароль: <code>{esc(r['password'])}</code>",
+    ]
+
+    await send_lines(message, lines, reply_markup=status_choice_kb())
     await state.set_state(StatusFSM.waiting_status_choice)
 
 
@@ -123,8 +98,8 @@ async def send_next_resource(message: Message, state: FSMContext):
 @router.message(F.text.in_({"🟢 Рабочий", "🔴 Нерабочий"}))
 async def apply_status(message: Message, state: FSMContext):
     data = await state.get_data()
-    rows = data["rows"]
-    index = data["index"]
+    rows = data.get("rows", [])
+    index = data.get("index", 0)
 
     if index >= len(rows):
         await message.answer("Ошибка: нет ресурса.", reply_markup=back_only_kb())
@@ -132,21 +107,46 @@ async def apply_status(message: Message, state: FSMContext):
 
     r = rows[index]
 
-    new_status = "working" if message.text == "🟢 Рабочий" else "broken"
-
-    pool = await get_pool()
-    async with pool.acquire() as conn:
-        await conn.execute(
-            DBQueries.SET_RESOURCE_STATUS,
-            new_status,
-            r["id"],
-        )
+    receipt_state = "good" if message.text == "🟢 Рабочий" else "bad"
+
+    if receipt_state == "bad" and _auto_replace(r["type"]):
+        # отметка, замена и история — один вызов replace_bad
+        pool = await get_pool()
+        async with pool.acquire() as conn:
+            replacement = await allocator.replace_bad(
+                conn, message.from_user.id, r["id"], r["type"]
+            )
+
+        if replacement is not None and replacement["id"] is not None:
+            await message.answer(
+                "\n".join(
+                    [
+                        f"🔁 Замена (тип: {esc(r['type'])}):",
+                        *resource_lines([replacement]),
+                    ]
+                )
+            )
+            # замену тоже нужно отметить — она в конце текущего обхода
+            rows = [*rows, dict(replacement)]
+            await state.update_data(rows=rows)
+        elif replacement is not None:
+            await message.answer(f"Свободных <b>{esc(r['type'])}</b> для замены сейчас нет.")
+    else:
+        # отметка и событие в историю (по нему считается качество поставщиков) —
+        # один вызов mark_status
+        pool = await get_pool()
+        async with pool.acquire() as conn:
+            await conn.fetch(DBQueries.MARK_STATUS, [r["id"]], message.from_user.id, receipt_state)
 
     # После обновления — сразу следующий ресурс
     await state.update_data(index=index + 1)
     await send_next_resource(message, state)
 
 
+def _auto_replace(r_type: str) -> bool:
+    return AUTO_REPLACE_BAD_BY_TYPE.get(r_type, AUTO_REPLACE_BAD) == "on"
+
+
 # ================================
 # НАЗАД
 # ================================
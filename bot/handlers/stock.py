@@ -0,0 +1,38 @@
+# bot/handlers/stock.py
+from aiogram import Router
+from aiogram.filters import Command
+from aiogram.types import Message
+
+from db.database import pool_for
+from bot.config import STOCK_ALERT_HOURS
+from bot.utils.queries import DBQueries
+from bot.utils.stock_forecast import compute_runway, runway_lines, format_hours
+
+router = Router()
+
+
+@router.message(Command("stock"))
+async def cmd_stock(message: Message, role: str | None = None):
+    """
+    Запас по типам: свободный остаток, скорость расхода и на сколько хватит.
+    """
+    if role not in ("admin", "owner"):
+        await message.answer("❌ У тебя нет доступа к этой команде.")
+        return
+
+    pool = await pool_for(DBQueries.STOCK_ISSUE_ROLLUPS)
+    async with pool.acquire() as conn:
+        runways = await compute_runway(conn)
+
+    if not runways:
+        await message.answer("📉 Данных по ресурсам пока нет.")
+        return
+
+    runways.sort(key=lambda rw: rw.hours_left)
+    lines = [
+        "📉 Запас ресурсов по типам:\n",
+        *runway_lines(runways),
+        "",
+        f"Порог предупреждения: {format_hours(STOCK_ALERT_HOURS)}",
+    ]
+    await message.answer("\n".join(lines))
@@ -0,0 +1,34 @@
+# bot/handlers/suppliers.py
+from aiogram import Router
+from aiogram.filters import Command, CommandObject
+from aiogram.types import Message
+
+from db.database import pool_for
+from bot.utils.queries import DBQueries
+from bot.utils.supplier_scores import supplier_report_lines
+from bot.utils.render import send_long_text
+
+router = Router()
+
+
+@router.message(Command("suppliers"))
+async def cmd_suppliers(message: Message, command: CommandObject, role: str | None = None):
+    """
+    Оценка поставщиков по типам.
+    /suppliers — все типы, /suppliers mamba — только один тип.
+    """
+    if role not in ("admin", "owner"):
+        await message.answer("❌ У тебя нет доступа к этой команде.")
+        return
+
+    r_type = (command.args or "").strip() or None
+
+    pool = await pool_for(DBQueries.REPORT_SUPPLIERS)
+    async with pool.acquire() as conn:
+        lines = await supplier_report_lines(conn, r_type)
+
+    if not lines:
+        await message.answer("🏷 Данных по поставщикам пока нет.")
+        return
+
+    await send_long_text(message, "\n".join(["🏷 Оценка поставщиков:", *lines]))
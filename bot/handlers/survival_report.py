@@ -0,0 +1,43 @@
+# bot/handlers/survival_report.py
+from aiogram import Router
+from aiogram.filters import Command, CommandObject
+from aiogram.types import Message
+
+from db.database import pool_for
+from bot.utils import survival
+from bot.utils.queries import DBQueries
+from bot.utils.render import send_long_text
+
+router = Router()
+
+
+@router.message(Command("survival"))
+async def cmd_survival(message: Message, command: CommandObject, role: str | None = None):
+    """
+    Выживаемость ресурсов: медиана срока жизни и доля живых через 1/6/24 ч
+    по типам, поставщикам и неделям закупки.
+    /survival — все типы, /survival mamba — один тип.
+    """
+    if role not in ("admin", "owner"):
+        await message.answer("❌ У тебя нет доступа к этой команде.")
+        return
+
+    r_type = (command.args or "").strip() or None
+
+    pool = await pool_for(DBQueries.SURVIVAL_EXTRACT)
+    async with pool.acquire() as conn:
+        report = await survival.get_report(conn)
+
+    if r_type:
+        report = {r_type: report[r_type]} if r_type in report else {}
+
+    if not report:
+        await message.answer("📈 Данных по срокам жизни пока нет.")
+        return
+
+    lines = [f"📈 Выживаемость ресурсов (последние {survival.WINDOW_DAYS} дней):"]
+    for type_lines in report.values():
+        lines.append("")
+        lines.extend(type_lines)
+
+    await send_long_text(message, "\n".join(lines))
@@ -5,13 +5,18 @@ from aiogram.fsm.state import StatesGroup, State
 
 from db.database import get_pool
 from bot.handlers.manager_menu import manager_menu_kb
+from bot.utils import backorders
 from bot.utils.admin_stats import send_free_resources_stats
+from bot.utils.ingest import BAD_PRICE_TEXT, insert_resources, price_ok
+from bot.utils.queries import DBQueries
 
 import re
+from decimal import Decimal, InvalidOperation
 
 router = Router()
 
 BACK_BUTTON = "⬅️ Назад"
+NO_SUPPLIER_BUTTON = "Без поставщика"
 
 # Список типов, которые можно загружать
 RESOURCE_TYPES = [
@@ -40,6 +45,13 @@ def resource_types_kb() -> ReplyKeyboardMarkup:
     return ReplyKeyboardMarkup(keyboard=rows, resize_keyboard=True)
 
 
+def suppliers_kb(names: list[str]) -> ReplyKeyboardMarkup:
+    rows = [[KeyboardButton(text=name)] for name in names[:12]]
+    rows.append([KeyboardButton(text=NO_SUPPLIER_BUTTON)])
+    rows.append([KeyboardButton(text=BACK_BUTTON)])
+    return ReplyKeyboardMarkup(keyboard=rows, resize_keyboard=True)
+
+
 def back_only_kb() -> ReplyKeyboardMarkup:
     return ReplyKeyboardMarkup(
         keyboard=[[KeyboardButton(text=BACK_BUTTON)]],
@@ -49,6 +61,7 @@ def back_only_kb() -> ReplyKeyboardMarkup:
 
 class UploadStates(StatesGroup):
     waiting_type = State()
+    waiting_supplier = State()
     waiting_text = State()
 
 
@@ -81,6 +94,67 @@ async def choose_type(message: Message, state: FSMContext):
         return
 
     await state.update_data(type=r_type)
+    await state.set_state(UploadStates.waiting_supplier)
+
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        suppliers = await conn.fetch(DBQueries.LIST_SUPPLIERS)
+
+    await message.answer(
+        "От какого поставщика эта пачка?\n"
+        "Выбери кнопкой или напиши имя нового поставщика.\n"
+        "Можно сразу указать цену за штуку: <code>имя 58</code>",
+        reply_markup=suppliers_kb([s["name"] for s in suppliers if s["name"]]),
+    )
+
+
+# ==========================
+# Выбор поставщика и цены
+# ==========================
+
+def parse_supplier_price(text: str) -> tuple[str | None, Decimal | None]:
+    """
+    "shop 58" -> ("shop", 58), "shop" -> ("shop", 0), "58" -> (None, 58).
+    Цена, которую не записать в buy_price ("shop NaN", "shop 1e9"), — None.
+    """
+    parts = text.split()
+    price = Decimal(0)
+    if parts:
+        try:
+            price = Decimal(parts[-1].replace(",", "."))
+            parts = parts[:-1]
+        except InvalidOperation:
+            pass
+
+    name = " ".join(parts).strip()
+    return (name or None), (price if price_ok(price) else None)
+
+
+@router.message(UploadStates.waiting_supplier)
+async def choose_supplier(message: Message, state: FSMContext):
+    text = (message.text or "").strip()
+
+    supplier_id = None
+    price = Decimal(0)
+    if text != NO_SUPPLIER_BUTTON:
+        pool = await get_pool()
+        async with pool.acquire() as conn:
+            known = {
+                s["name"].lower(): s["id"]
+                for s in await conn.fetch(DBQueries.LIST_SUPPLIERS)
+                if s["name"]
+            }
+            # кнопка с именем существующего поставщика (даже если имя кончается цифрами)
+            supplier_id = known.get(text.lower())
+            if supplier_id is None:
+                name, price = parse_supplier_price(text)
+                if price is None:
+                    await message.answer(BAD_PRICE_TEXT)
+                    return
+                if name:
+                    supplier_id = await conn.fetchval(DBQueries.GET_OR_CREATE_SUPPLIER, name)
+
+    await state.update_data(supplier_id=supplier_id, price=str(price))
     await state.set_state(UploadStates.waiting_text)
 
     await message.answer(
@@ -166,6 +240,8 @@ async def process_upload_text(message: Message, state: FSMContext, role: str | N
 
     data = await state.get_data()
     r_type: str = data.get("type")  # тип, выбранный админом
+    supplier_id = data.get("supplier_id")
+    price = Decimal(data.get("price") or 0)
 
     lines = message.text.splitlines()
     parsed: list[tuple[str, str]] = []
@@ -192,7 +268,6 @@ async def process_upload_text(message: Message, state: FSMContext, role: str | N
                 parsed.append((login, password))
 
     total = len(parsed)
-    added = 0
 
     if total == 0:
         await message.answer(
@@ -204,32 +279,31 @@ async def process_upload_text(message: Message, state: FSMContext, role: str | N
 
     pool = await get_pool()
     async with pool.acquire() as conn:
-        for login, password in parsed:
-            try:
-                await conn.execute(
-                    """
-                    INSERT INTO resources (type, login, password, buy_price, status)
-                    VALUES ($1, $2, $3, 0, 'free')
-                    """,
-                    r_type,
-                    login,
-                    password,
-                )
-                added += 1
-            except Exception:
-                # дубликат или другая ошибка — пропускаем
-                pass
-
-    text = (
-        f"✅ Загрузка завершена.\n"
-        f"Распознано строк: {total}\n"
-        f"Успешно добавлено в БД: {added}\n\n"
-        f"Тип: {r_type}"
-    )
+        result = await insert_resources(
+            conn,
+            r_type,
+            [(login, password, None) for login, password in parsed],
+            price,
+            supplier_id,
+        )
+
+    lines = [
+        "✅ Загрузка завершена.",
+        f"Распознано строк: {total}",
+        f"Успешно добавлено в БД: {result.added}",
+        *result.skipped_lines(),
+        "",
+        f"Тип: {r_type}",
+    ]
+    text = "\n".join(lines)
 
     await message.answer(text, reply_markup=manager_menu_kb())
     await state.clear()
 
+    # новые ресурсы закоммичены — сначала тем, кто их ждёт в очереди
+    if result.added:
+        await backorders.fill(message.bot, r_type)
+
     # После каждой загрузки — статистика свободных ресурсов (только админу)
     if role == "admin":
         await send_free_resources_stats(message)
@@ -1,6 +1,6 @@
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
-def lifetime_kb(resource_id: int):
+def lifetime_kb(resource_id: int, with_next: bool = False):
     kb = InlineKeyboardBuilder()
     options = [
         ("10 минут", 10),
@@ -15,5 +15,7 @@ def lifetime_kb(resource_id: int):
     ]
     for text, val in options:
         kb.button(text=text, callback_data=f"lt_{resource_id}:{val}")
-    kb.adjust(1)
+    if with_next:
+        kb.button(text="Дальше ▶", callback_data=f"lt_next:{resource_id}")
+    kb.adjust(3)
     return kb.as_markup()
@@ -2,12 +2,22 @@
 import asyncio
 import logging
 import os
+import time
+
+# отсчёт холодного старта — до тяжёлых импортов
+STARTED_AT = time.monotonic()
 
 from aiogram import Bot, Dispatcher
 from aiogram.enums import ParseMode
 
-from db.database import get_pool
+from bot.config import FSM_MAX_MB, FSM_TTL_MINUTES, SHUTDOWN_DEADLINE_SEC
+from db.database import close_pool
+from bot.utils import startup
+from bot.utils.fsm_storage import TTLMemoryStorage
+from bot.utils.scheduler import setup_scheduler
+from bot.utils.slowlog import setup_slowlog
 from bot.middlewares.role import RoleMiddleware
+from bot.middlewares.shutdown import ShutdownCoordinator
 from bot.handlers import (
     manager_menu,
     admin_menu,
@@ -15,6 +25,18 @@ from bot.handlers import (
     status_mark,
     reports,
     upload_resources,   # 🔹 наш новый модуль
+    import_resources,
+    stock,
+    suppliers,
+    search,
+    export,
+    lifetime,
+    survival_report,
+    quotas,
+    leaderboard,
+    slowlog,
+    profiling,
+    backorders,
 )
 
 logging.basicConfig(level=logging.INFO)
@@ -29,10 +51,21 @@ async def main():
         raise RuntimeError("BOT_TOKEN не задан в переменных окружения")
 
     bot = Bot(token=BOT_TOKEN, parse_mode=ParseMode.HTML)
-    dp = Dispatcher()
+    # состояния FSM с TTL и пределом по памяти — брошенные сценарии не копятся
+    dp = Dispatcher(
+        storage=TTLMemoryStorage(ttl=FSM_TTL_MINUTES * 60, max_bytes=int(FSM_MAX_MB * 2**20))
+    )
+
+    # журнал медленных запросов — логгер вешается на соединения при создании пула
+    setup_slowlog()
+
+    # общий пул БД, схема и прогрев — до начала поллинга
+    bot.db = await startup.start(STARTED_AT)
 
-    # общий пул БД
-    bot.db = await get_pool()
+    # учёт обработчиков в работе — чтобы при SIGTERM дать им доработать;
+    # он же ведёт общий срок остановки для всех её шагов
+    shutdown = ShutdownCoordinator(SHUTDOWN_DEADLINE_SEC)
+    shutdown.setup(dp)
 
     # мидлварь ролей
     dp.message.middleware(RoleMiddleware())
@@ -45,9 +78,31 @@ async def main():
     dp.include_router(status_mark.router)
     dp.include_router(reports.router)
     dp.include_router(upload_resources.router)  # 🔹 подключаем загрузку
+    dp.include_router(import_resources.router)
+    dp.include_router(stock.router)
+    dp.include_router(suppliers.router)
+    dp.include_router(search.router)
+    dp.include_router(export.router)
+    dp.include_router(lifetime.router)
+    dp.include_router(survival_report.router)
+    dp.include_router(quotas.router)
+    dp.include_router(leaderboard.router)
+    dp.include_router(slowlog.router)
+    dp.include_router(profiling.router)
+    dp.include_router(backorders.router)
+
+    # фоновые задачи (прогноз остатка и т.п.)
+    setup_scheduler(dp, shutdown)
 
     logger.info("Bot started")
-    await dp.start_polling(bot)
+    try:
+        # aiogram сам ловит SIGTERM/SIGINT: перестаёт забирать апдейты,
+        # вызывает dp.shutdown (drain обработчиков, остановка фоновых задач)
+        # и только потом закрывает сессию бота
+        await dp.start_polling(bot)
+    finally:
+        await close_pool(shutdown.remaining())
+        logger.info("Pool closed")
 
 
 if __name__ == "__main__":
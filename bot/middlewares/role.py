@@ -1,9 +1,29 @@
 # bot/middlewares/role.py
+import time
 from typing import Callable, Awaitable, Any
 
 from aiogram import BaseMiddleware
 from aiogram.types import Message, CallbackQuery
 
+from bot.utils.queries import DBQueries
+
+# Роль меняется руками в БД редко — минуты задержки достаточно
+ROLE_CACHE_TTL = 60
+
+# tg_id -> (role или None, когда протухает по time.monotonic)
+_roles: dict[int, tuple[str | None, float]] = {}
+
+
+async def prewarm_roles(conn) -> int:
+    """
+    Загружает роли всех менеджеров в кэш (на старте бота).
+    """
+    rows = await conn.fetch("SELECT tg_id, role FROM managers")
+    expires = time.monotonic() + ROLE_CACHE_TTL
+    for r in rows:
+        _roles[r["tg_id"]] = (r["role"], expires)
+    return len(rows)
+
 
 class RoleMiddleware(BaseMiddleware):
     async def __call__(
@@ -20,14 +40,15 @@ class RoleMiddleware(BaseMiddleware):
         pool = getattr(bot, "db", None) if bot else None
 
         role = None
-        if pool is not None:
+        cached = _roles.get(from_user.id)
+        if cached and cached[1] > time.monotonic():
+            role = cached[0]
+        elif pool is not None:
             async with pool.acquire() as conn:
-                row = await conn.fetchrow(
-                    "SELECT role FROM managers WHERE tg_id = $1",
-                    from_user.id,
-                )
+                row = await conn.fetchrow(DBQueries.CHECK_MANAGER_ROLE, from_user.id)
                 if row:
                     role = row["role"]
+            _roles[from_user.id] = (role, time.monotonic() + ROLE_CACHE_TTL)
 
         data["role"] = role
         return await handler(event, data)
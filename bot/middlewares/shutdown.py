@@ -0,0 +1,85 @@
+# bot/middlewares/shutdown.py
+import asyncio
+import logging
+import time
+from typing import Callable, Awaitable, Any
+
+from aiogram import BaseMiddleware
+
+logger = logging.getLogger(__name__)
+
+
+class ShutdownCoordinator(BaseMiddleware):
+    """
+    Внешняя мидлварь на dp.update: помнит задачи, которые сейчас
+    обрабатывают апдейты, чтобы при остановке дать им доработать.
+
+    aiogram сам ловит SIGTERM/SIGINT и перестаёт забирать апдейты,
+    а drain() вызывается из dp.shutdown — до закрытия сессии бота,
+    так что ответы из дорабатывающих обработчиков ещё уходят.
+
+    deadline — на всю остановку, а не на каждый шаг: первый вызов
+    remaining() засекает срок, следующие шаги (фоновые задачи, пул БД)
+    получают только то, что от него осталось.
+    """
+
+    def __init__(self, deadline: float):
+        self.deadline = deadline
+        self._deadline_at: float | None = None
+        self._inflight: set[asyncio.Task] = set()
+
+    async def __call__(
+        self,
+        handler: Callable[[Any, dict], Awaitable[Any]],
+        event: Any,
+        data: dict,
+    ) -> Any:
+        task = asyncio.current_task()
+        self._inflight.add(task)
+        try:
+            return await handler(event, data)
+        finally:
+            self._inflight.discard(task)
+
+    @property
+    def inflight(self) -> int:
+        return len(self._inflight)
+
+    def remaining(self) -> float:
+        """
+        Сколько секунд осталось до общего срока остановки.
+        """
+        now = time.monotonic()
+        if self._deadline_at is None:
+            self._deadline_at = now + self.deadline
+        return max(0.0, self._deadline_at - now)
+
+    async def drain(self) -> tuple[int, int]:
+        """
+        Ждёт обработчики до срока остановки, остальные отменяет.
+        Возвращает (сколько доработало, сколько брошено).
+        """
+        started = time.monotonic()
+        timeout = self.remaining()
+        pending = set(self._inflight)
+        if not pending:
+            return 0, 0
+
+        logger.info("Shutdown: ждём %d обработчиков (до %.0f с)", len(pending), timeout)
+        done, abandoned = await asyncio.wait(pending, timeout=timeout)
+        for task in abandoned:
+            task.cancel()
+        if abandoned:
+            await asyncio.gather(*abandoned, return_exceptions=True)
+
+        logger.info(
+            "Shutdown: drain за %.1f с — доработало %d, брошено %d",
+            time.monotonic() - started,
+            len(done),
+            len(abandoned),
+        )
+        return len(done), len(abandoned)
+
+    def setup(self, dp) -> None:
+        dp.update.outer_middleware(self)
+        dp.shutdown.register(self.drain)
@@ -2,7 +2,8 @@
 
 from aiogram.types import Message
 
-from db.database import get_pool
+from db.database import pool_for
+from bot.utils.queries import DBQueries
 
 
 async def send_free_resources_stats(message: Message) -> None:
@@ -11,18 +12,9 @@ async def send_free_resources_stats(message: Message) -> None:
     сколько свободных ресурсов каждого типа сейчас есть в БД.
     Вызываем ТОЛЬКО для админов.
     """
-    pool = await get_pool()
+    pool = await pool_for(DBQueries.STOCK_FREE_BY_TYPE)
     async with pool.acquire() as conn:
-        rows = await conn.fetch(
-            """
-            SELECT type, COUNT(*) AS cnt
-            FROM resources
-            WHERE status = 'free'
-              AND manager_tg_id IS NULL
-            GROUP BY type
-            ORDER BY type
-            """
-        )
+        rows = sorted(await conn.fetch(DBQueries.STOCK_FREE_BY_TYPE), key=lambda r: r["type"])
 
     if not rows:
         text = "📊 Сейчас нет свободных ресурсов."
@@ -30,7 +22,7 @@ async def send_free_resources_stats(message: Message) -> None:
         lines = ["📊 Свободные ресурсы сейчас:\n"]
         for r in rows:
             r_type = r["type"]
-            cnt = r["cnt"]
+            cnt = r["free"]
             lines.append(f"• {r_type} — {cnt} шт.")
         text = "\n".join(lines)
 
@@ -0,0 +1,184 @@
+# bot/utils/allocator.py
+# Выдача ресурсов менеджеру с выбираемой стратегией:
+#   fifo          — самые старые первыми (как было раньше)
+#   freshest      — самые свежие первыми
+#   best_supplier — поставщики в случайном порядке с весом по качеству
+#   round_robin   — поровну между поставщиками, по кругу от выдачи к выдаче
+# Каждая стратегия упирается в частичный индекс по свободным ресурсам,
+# поэтому выбор стоит O(count) и под параллельными выдачами (SKIP LOCKED).
+# Порядок поставщиков считается здесь (оценки в кэше), а сама выдача —
+# один вызов функции issue_resources в БД.
+#
+# Поверх стратегии — PROXY_POLICY: ресурсы, чей прокси не прошёл проверку
+# (proxy_health), либо не выдаются (skip), либо идут последними (prefer).
+import math
+import random
+import time
+
+from bot.config import ALLOC_STRATEGY, ALLOC_STRATEGY_BY_TYPE, PROXY_POLICY
+from bot.utils.queries import DBQueries
+
+STRATEGIES = ("fifo", "freshest", "best_supplier", "round_robin")
+
+# Сколько секунд держим в памяти список поставщиков и их оценки
+SUPPLIERS_CACHE_TTL = 60
+
+# type -> (время загрузки, [(supplier_id, good, bad)])
+_suppliers_cache: dict[str, tuple[float, list[tuple[int, int, int]]]] = {}
+
+# type -> с какого поставщика начинать следующий круг round_robin
+_rr_cursor: dict[str, int] = {}
+
+
+def strategy_for(r_type: str) -> str:
+    strategy = ALLOC_STRATEGY_BY_TYPE.get(r_type, ALLOC_STRATEGY)
+    return strategy if strategy in STRATEGIES else "fifo"
+
+
+async def _suppliers(conn, r_type: str) -> list[tuple[int, int, int]]:
+    cached = _suppliers_cache.get(r_type)
+    now = time.monotonic()
+    if cached and now - cached[0] < SUPPLIERS_CACHE_TTL:
+        return cached[1]
+
+    rows = await conn.fetch(DBQueries.ALLOC_SUPPLIERS, r_type)
+    suppliers = sorted((r["supplier_id"], r["good"], r["bad"]) for r in rows)
+    _suppliers_cache[r_type] = (now, suppliers)
+    return suppliers
+
+
+async def prewarm(conn, types) -> None:
+    """
+    Заранее загружает поставщиков и оценки по типам (на старте бота).
+    """
+    for r_type in types:
+        _suppliers_cache.pop(r_type, None)
+        await _suppliers(conn, r_type)
+
+
+def _weighted_order(suppliers: list[tuple[int, int, int]]) -> list[int]:
+    """
+    Случайный порядок поставщиков, где лучший чаще оказывается первым.
+    Вес — сглаженная доля рабочих (good + 1) / (good + bad + 2),
+    ключ сортировки u ** (1 / w) (взвешенная выборка без возвращения).
+    """
+    keyed = []
+    for supplier_id, good, bad in suppliers:
+        weight = (good + 1) / (good + bad + 2)
+        keyed.append((random.random() ** (1 / weight), supplier_id))
+    keyed.sort(reverse=True)
+    return [supplier_id for _, supplier_id in keyed]
+
+
+def _rotated(r_type: str, suppliers: list[tuple[int, int, int]]) -> list[int]:
+    ids = [s[0] for s in suppliers]
+    if not ids:
+        return ids
+    start = _rr_cursor.get(r_type, 0) % len(ids)
+    _rr_cursor[r_type] = start + 1
+    return ids[start:] + ids[:start]
+
+
+def _plan(
+    r_type: str, count: int, strategy: str, suppliers
+) -> tuple[str, list[int] | None, int | None]:
+    """
+    (порядок, порядок поставщиков, сколько с поставщика на первом проходе)
+    для issue_resources.
+    """
+    if strategy == "best_supplier":
+        return "fifo", _weighted_order(suppliers), count
+
+    if strategy == "round_robin":
+        order = _rotated(r_type, suppliers)
+        return "fifo", order, max(1, math.ceil(count / max(1, len(order))))
+
+    return strategy, None, None
+
+
+async def claim(
+    conn,
+    manager_id: int,
+    r_type: str,
+    count: int,
+    strategy: str | None = None,
+    reserve_minutes: int = 0,
+    chat_id: int | None = None,
+    request_key: str | None = None,
+):
+    """
+    Забирает до count свободных ресурсов типа r_type на менеджера —
+    одним вызовом issue_resources в БД.
+    Возвращает записи (id, login, password, proxy, supplier_id, replayed) —
+    может быть меньше count, если свободных не хватило.
+    reserve_minutes > 0 — ресурсы только бронируются до подтверждения.
+    С request_key повтор того же (chat_id, request_key) отдаёт прежний
+    результат (replayed = TRUE), а не новую пачку.
+    """
+    strategy = strategy or strategy_for(r_type)
+    suppliers = (
+        await _suppliers(conn, r_type) if strategy in ("best_supplier", "round_robin") else None
+    )
+    order, supplier_order, per_supplier = _plan(r_type, count, strategy, suppliers)
+
+    return await conn.fetch(
+        DBQueries.ISSUE_RESOURCES,
+        manager_id,
+        r_type,
+        count,
+        order,
+        supplier_order,
+        per_supplier,
+        PROXY_POLICY,
+        reserve_minutes,
+        chat_id,
+        request_key,
+    )
+
+
+async def fill_backorders(conn, r_type: str, ttl_hours: int):
+    """
+    Раздаёт свободные ресурсы типа r_type очереди ожидания (backorders) —
+    одним вызовом fill_backorders в БД, каждому по стратегии типа.
+    Возвращает записи (manager_tg_id, id, login, password, proxy, waiting).
+    """
+    strategy = strategy_for(r_type)
+    suppliers = (
+        await _suppliers(conn, r_type) if strategy in ("best_supplier", "round_robin") else None
+    )
+    # per_supplier для round_robin зависит от заявки — его считает сама функция
+    order, supplier_order, _ = _plan(r_type, 1, strategy, suppliers)
+
+    return await conn.fetch(
+        DBQueries.FILL_BACKORDERS,
+        r_type,
+        order,
+        supplier_order,
+        strategy == "round_robin",
+        PROXY_POLICY,
+        ttl_hours,
+    )
+
+
+async def replace_bad(conn, manager_id: int, resource_id: int, r_type: str):
+    """
+    Отмечает ресурс нерабочим и выдаёт замену того же типа по стратегии
+    типа — одним вызовом replace_bad в БД.
+    None — не отмечен (чужой, бронь, уже нерабочий); иначе запись
+    (id, type, login, password, proxy, supplier_id), id = None — замены нет.
+    """
+    strategy = strategy_for(r_type)
+    suppliers = (
+        await _suppliers(conn, r_type) if strategy in ("best_supplier", "round_robin") else None
+    )
+    order, supplier_order, per_supplier = _plan(r_type, 1, strategy, suppliers)
+
+    return await conn.fetchrow(
+        DBQueries.REPLACE_BAD,
+        resource_id,
+        manager_id,
+        order,
+        supplier_order,
+        per_supplier,
+        PROXY_POLICY,
+    )
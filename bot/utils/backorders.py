@@ -0,0 +1,72 @@
+# bot/utils/backorders.py
+# Очередь ожидания: менеджер, которому не хватило ресурсов, встаёт в очередь
+# на тип, и при следующей загрузке этого типа свободные раздаются по очереди
+# (та же выдача issue_resources, что и по кнопке) — без повторных запросов
+# менеджера. Каждому — одно сообщение со всем, что ему досталось.
+import logging
+
+from bot.config import BACKORDER_TTL_HOURS
+from bot.utils import allocator, quotas
+from bot.utils.queries import DBQueries
+from bot.utils.render import chunk_lines, esc, resource_lines
+from db.database import get_pool
+
+logger = logging.getLogger(__name__)
+
+
+async def fill(bot, r_type: str) -> int:
+    """
+    Раздаёт свободные ресурсы типа r_type ожидающим и уведомляет их.
+    Вызывать после того, как новые ресурсы закоммичены. Возвращает, сколько выдано.
+    """
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        rows = await allocator.fill_backorders(conn, r_type, BACKORDER_TTL_HOURS)
+    if not rows:
+        return 0
+
+    per_manager: dict[int, list] = {}
+    for r in rows:
+        per_manager.setdefault(r["manager_tg_id"], []).append(r)
+    logger.info("Backorders %s: issued %s to %s managers", r_type, len(rows), len(per_manager))
+
+    for manager_id, issued in per_manager.items():
+        lines = [
+            f"🔔 Пришли ресурсы, которых ты ждал: {len(issued)} (тип: {esc(r_type)})",
+            "",
+            *resource_lines(issued),
+        ]
+        if issued[0]["waiting"]:
+            lines.extend(["", f"Ещё ждём: {issued[0]['waiting']} — пришлю, как появятся."])
+        try:
+            for chunk in chunk_lines(lines):
+                await bot.send_message(manager_id, chunk)
+        except Exception:
+            logger.warning("Не удалось уведомить менеджера %s о выдаче из очереди", manager_id)
+
+    return len(rows)
+
+
+async def expire_backorders(bot) -> None:
+    """
+    Фоновая задача: снимает заявки старше BACKORDER_TTL_HOURS, возвращает
+    их в квоту и сообщает менеджерам, что ждать больше нечего.
+    """
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        rows = await conn.fetch(DBQueries.BACKORDERS_EXPIRE, BACKORDER_TTL_HOURS)
+    if not rows:
+        return
+
+    logger.info("Backorders expired: %s", len(rows))
+    for r in rows:
+        # у админов ведра нет — refund тогда ничего не делает
+        quotas.refund(r["manager_tg_id"], r["type"], r["count"])
+        try:
+            await bot.send_message(
+                r["manager_tg_id"],
+                f"⌛ Не дождались <b>{esc(r['type'])}</b> за {BACKORDER_TTL_HOURS} ч — "
+                f"заявка на {r['count']} шт. снята, квота возвращена.",
+            )
+        except Exception:
+            logger.warning("Не удалось уведомить менеджера %s о снятии заявки", r["manager_tg_id"])
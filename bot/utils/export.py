@@ -0,0 +1,170 @@
+# bot/utils/export.py
+# Выгрузка ресурсов и истории через COPY ... TO STDOUT прямо в gzip-файл.
+# Память не растёт с размером выгрузки: в буфере не больше FLUSH_BYTES,
+# сжатие и запись на диск идут в отдельном потоке, чтобы не держать event loop.
+import asyncio
+import gzip
+import os
+import tempfile
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+from bot.utils.queries import DBQueries, is_replica, replica
+from db.database import pool_for
+
+FLUSH_BYTES = 1024 * 1024
+
+KINDS = ("resources", "history")
+FORMATS = ("csv", "jsonl")
+
+# JSONL через COPY CSV: разделитель и кавычка — управляющие символы,
+# которых в выводе row_to_json не бывает, поэтому строки выходят как есть
+_JSONL_DELIMITER = "\x02"
+_JSONL_QUOTE = "\x01"
+
+
+@dataclass
+class ExportRequest:
+    kind: str = "resources"
+    fmt: str = "csv"
+    date_from: date | None = None
+    date_to: date | None = None
+    type: str | None = None
+    manager: int | None = None
+    action: str | None = None
+
+
+def parse_export_args(args: str) -> ExportRequest:
+    """
+    /export [resources|history] [csv|jsonl] [from:2024-01-01] [to:2024-01-31]
+            [type:mamba] [manager:123] [action:issued]
+    """
+    req = ExportRequest()
+    for token in args.split():
+        key, sep, value = token.partition(":")
+        key = key.lower()
+        if not sep:
+            if key in KINDS:
+                req.kind = key
+            elif key in FORMATS:
+                req.fmt = key
+            else:
+                raise ValueError(f"Непонятный аргумент: {token}")
+            continue
+
+        if key in ("from", "to"):
+            try:
+                day = date.fromisoformat(value)
+            except ValueError:
+                raise ValueError(f"Дата в формате ГГГГ-ММ-ДД: {token}")
+            if key == "from":
+                req.date_from = day
+            else:
+                req.date_to = day
+        elif key == "type":
+            req.type = value
+        elif key == "manager":
+            if not value.lstrip("-").isdigit():
+                raise ValueError("manager: — это Telegram ID (число)")
+            req.manager = int(value)
+        elif key == "action":
+            req.action = value
+        else:
+            raise ValueError(f"Непонятный фильтр: {token}")
+
+    if req.action and req.kind != "history":
+        raise ValueError("Фильтр action: есть только у history")
+    return req
+
+
+def build_query(req: ExportRequest) -> tuple[str, list]:
+    if req.kind == "history":
+        base, date_col = DBQueries.EXPORT_HISTORY, "datetime"
+    else:
+        base, date_col = DBQueries.EXPORT_RESOURCES, "issue_datetime"
+
+    where = ["TRUE"]
+    args: list = []
+
+    def arg(value) -> str:
+        args.append(value)
+        return f"${len(args)}"
+
+    if req.date_from:
+        where.append(f"{date_col} >= {arg(req.date_from)}")
+    if req.date_to:
+        # to: включительно
+        where.append(f"{date_col} < {arg(req.date_to + timedelta(days=1))}")
+    if req.type:
+        where.append(f"type = {arg(req.type)}")
+    if req.manager is not None:
+        where.append(f"manager_tg_id = {arg(req.manager)}")
+    if req.action:
+        where.append(f"action = {arg(req.action)}")
+
+    query = base.format(where="\n      AND ".join(where))
+    if req.fmt == "jsonl":
+        query = f"SELECT row_to_json(t)::text FROM ({query}) t"
+    # сохраняем пометку маршрута (replica) исходного запроса
+    return (replica(query) if is_replica(base) else query), args
+
+
+class _GzipSink:
+    """
+    Приёмник для copy_from_query: копит куски и сбрасывает их
+    в gzip-файл в потоке исполнителя.
+    """
+
+    def __init__(self, path: str):
+        self._gz = gzip.open(path, "wb")
+        self._buf = bytearray()
+
+    async def write(self, chunk: bytes) -> None:
+        self._buf += chunk
+        if len(self._buf) >= FLUSH_BYTES:
+            await self.flush()
+
+    async def flush(self) -> None:
+        if not self._buf:
+            return
+        data = bytes(self._buf)
+        self._buf.clear()
+        await asyncio.to_thread(self._gz.write, data)
+
+    async def close(self) -> None:
+        await self.flush()
+        await asyncio.to_thread(self._gz.close)
+
+
+async def export_to_file(req: ExportRequest) -> tuple[str, int]:
+    """
+    Выгружает данные во временный .gz файл (с реплики, если она настроена).
+    Соединение из пула держим только на время самого COPY.
+    Возвращает (путь к файлу, число строк); файл удаляет вызывающий.
+    """
+    query, args = build_query(req)
+    pool = await pool_for(query)
+
+    fd, path = tempfile.mkstemp(prefix=f"export_{req.kind}_", suffix=f".{req.fmt}.gz")
+    os.close(fd)
+
+    sink = _GzipSink(path)
+    try:
+        copy_kwargs = {"format": "csv"}
+        if req.fmt == "jsonl":
+            copy_kwargs.update(delimiter=_JSONL_DELIMITER, quote=_JSONL_QUOTE)
+        else:
+            copy_kwargs.update(header=True)
+
+        async with pool.acquire() as conn:
+            status = await conn.copy_from_query(query, *args, output=sink.write, **copy_kwargs)
+    except BaseException:
+        await sink.close()
+        os.unlink(path)
+        raise
+
+    await sink.close()
+
+    # status вида "COPY 123"
+    rows = int(status.split()[-1]) if status else 0
+    return path, rows
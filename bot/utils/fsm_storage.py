@@ -0,0 +1,155 @@
+# bot/utils/fsm_storage.py
+# FSM-хранилище в памяти с TTL и общим пределом по размеру.
+#
+# MemoryStorage из aiogram ничего не удаляет и вдобавок заводит запись на
+# каждый get_state — даже для тех, кто ни в какой сценарий не входил.
+# Здесь:
+#   * пустая запись (без состояния и данных) не хранится вовсе;
+#   * каждое обращение продлевает запись на ttl и переносит её в конец
+#     OrderedDict — порядок записей совпадает с порядком истечения, поэтому
+#     просроченные снимаются с головы за O(1) на запись, без фоновой задачи;
+#   * размер данных оценивается при записи, и если сумма превысила предел,
+#     вытесняются самые давно тронутые (LRU).
+import sys
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from typing import Any
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+
+@dataclass
+class _Record:
+    state: str | None = None
+    data: dict[str, Any] = field(default_factory=dict)
+    size: int = 0
+    expires_at: float = 0.0
+
+
+@dataclass
+class StorageStats:
+    keys: int
+    bytes: int
+    max_bytes: int
+    # состояние -> (сколько записей, байт)
+    by_state: dict[str | None, tuple[int, int]]
+    expired: int
+    evicted: int
+
+
+def _sizeof(obj: Any, seen: set[int] | None = None) -> int:
+    """
+    Примерный размер объекта вместе с содержимым: словари, списки,
+    asyncpg Record (у него есть items()) — рекурсивно.
+    """
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, int, float, bool)) or obj is None:
+        return size
+    if isinstance(obj, dict) or hasattr(obj, "items"):
+        for k, v in obj.items():
+            size += _sizeof(k, seen) + _sizeof(v, seen)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        for item in obj:
+            size += _sizeof(item, seen)
+    return size
+
+
+class TTLMemoryStorage(BaseStorage):
+    """
+    FSM-хранилище: запись живёт ttl секунд с последнего обращения,
+    все записи вместе — не больше max_bytes (оценка), лишнее вытесняется LRU.
+    """
+
+    def __init__(self, ttl: float, max_bytes: int) -> None:
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._records: OrderedDict[StorageKey, _Record] = OrderedDict()
+        self._bytes = 0
+        self._expired = 0
+        self._evicted = 0
+
+    # ---------- служебное ----------
+
+    def _expire(self, now: float) -> None:
+        while self._records:
+            key, record = next(iter(self._records.items()))
+            if record.expires_at > now:
+                break
+            self._drop(key)
+            self._expired += 1
+
+    def _drop(self, key: StorageKey) -> None:
+        record = self._records.pop(key)
+        self._bytes -= record.size
+
+    def _get(self, key: StorageKey) -> _Record | None:
+        now = time.monotonic()
+        self._expire(now)
+        record = self._records.get(key)
+        if record is not None:
+            record.expires_at = now + self.ttl
+            self._records.move_to_end(key)
+        return record
+
+    def _put(self, key: StorageKey, state: str | None, data: dict[str, Any]) -> None:
+        if key in self._records:
+            self._drop(key)
+        if state is None and not data:
+            return
+
+        size = _sizeof(state) + _sizeof(data)
+        self._records[key] = _Record(state, data, size, time.monotonic() + self.ttl)
+        self._bytes += size
+
+        # вытесняем самые давние, но только что записанную не трогаем
+        while self._bytes > self.max_bytes and len(self._records) > 1:
+            self._drop(next(iter(self._records)))
+            self._evicted += 1
+
+    # ---------- BaseStorage ----------
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        record = self._get(key)
+        state = state.state if isinstance(state, State) else state
+        self._put(key, state, record.data if record else {})
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        record = self._get(key)
+        return record.state if record else None
+
+    async def set_data(self, key: StorageKey, data: dict[str, Any]) -> None:
+        record = self._get(key)
+        self._put(key, record.state if record else None, data.copy())
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        record = self._get(key)
+        return record.data.copy() if record else {}
+
+    async def close(self) -> None:
+        self._records.clear()
+        self._bytes = 0
+
+    # ---------- статистика ----------
+
+    def stats(self) -> StorageStats:
+        self._expire(time.monotonic())
+        counts: Counter = Counter()
+        sizes: Counter = Counter()
+        for record in self._records.values():
+            counts[record.state] += 1
+            sizes[record.state] += record.size
+        return StorageStats(
+            keys=len(self._records),
+            bytes=self._bytes,
+            max_bytes=self.max_bytes,
+            by_state={state: (n, sizes[state]) for state, n in counts.most_common()},
+            expired=self._expired,
+            evicted=self._evicted,
+        )
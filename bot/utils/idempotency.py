@@ -0,0 +1,98 @@
+# bot/utils/idempotency.py
+# Идемпотентная выдача: повтор одного и того же запроса (переотправка апдейта
+# телеграмом, двойное нажатие кнопки) отдаёт прежний список ресурсов,
+# а не выдаёт новую пачку.
+#
+# Два уровня: словарь в памяти (повтор в этом же процессе — без похода в БД)
+# и таблица issue_requests (повтор после рестарта или на другой реплике;
+# параллельная попытка ждёт на уникальном ключе, пока первая не закоммитит).
+# В БД это часть той же функции issue_resources, что и выдача.
+import asyncio
+import time
+
+from bot.utils import allocator
+from bot.utils.queries import DBQueries
+from db.database import get_pool
+
+# Сколько минут помним результат запроса
+TTL_MINUTES = 10
+
+# (chat_id, ключ) -> (когда протухает по time.monotonic, строки результата)
+_results: dict[tuple[int, str], tuple[float, list]] = {}
+_locks: dict[tuple[int, str], asyncio.Lock] = {}
+
+
+def _cached(key: tuple[int, str]) -> list | None:
+    hit = _results.get(key)
+    if hit and hit[0] > time.monotonic():
+        return hit[1]
+    return None
+
+
+def already_requested(chat_id: int, request_key: str) -> bool:
+    """
+    Запрос уже выполнен или выполняется прямо сейчас в этом процессе —
+    чтобы не списывать квоту под повтор. Повтор после рестарта или с другой
+    реплики отсюда не виден: его распознает issue_once (replayed=True).
+    """
+    key = (chat_id, request_key)
+    lock = _locks.get(key)
+    return _cached(key) is not None or (lock is not None and lock.locked())
+
+
+async def issue_once(
+    chat_id: int,
+    request_key: str,
+    manager_id: int,
+    r_type: str,
+    count: int,
+    reserve_minutes: int = 0,
+) -> tuple[list, bool]:
+    """
+    Выдаёт ресурсы один раз на (chat_id, request_key).
+    Возвращает (строки, replayed) — replayed=True, если это повтор.
+    """
+    key = (chat_id, request_key)
+    rows = _cached(key)
+    if rows is not None:
+        return rows, True
+
+    lock = _locks.setdefault(key, asyncio.Lock())
+    async with lock:
+        # пока ждали — первая попытка могла закончиться
+        rows = _cached(key)
+        if rows is not None:
+            return rows, True
+
+        # ключ, выдача и сохранение результата — один вызов issue_resources
+        pool = await get_pool()
+        async with pool.acquire() as conn:
+            rows = await allocator.claim(
+                conn,
+                manager_id,
+                r_type,
+                count,
+                reserve_minutes=reserve_minutes,
+                chat_id=chat_id,
+                request_key=request_key,
+            )
+
+        _results[key] = (time.monotonic() + TTL_MINUTES * 60, rows)
+
+    if not lock.locked():
+        _locks.pop(key, None)
+    # пустой повтор от пустой выдачи не отличить — но для вызывающих это одно и то же
+    return rows, bool(rows) and rows[0]["replayed"]
+
+
+async def purge_issue_requests(bot) -> None:
+    """
+    Фоновая задача: забывает запросы старше TTL_MINUTES.
+    """
+    now = time.monotonic()
+    for key in [k for k, (expires, _) in _results.items() if expires <= now]:
+        _results.pop(key, None)
+
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        await conn.execute(DBQueries.ISSUE_REQUESTS_PURGE, TTL_MINUTES)
@@ -0,0 +1,97 @@
+# bot/utils/ingest.py
+import html
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+from bot.utils.queries import DBQueries
+
+# buy_price — NUMERIC(10,2): по модулю строго меньше 10^8
+MAX_PRICE = Decimal(10) ** 8
+BAD_PRICE_TEXT = "❗ Цена должна быть числом, пример: 58 или 58.5"
+
+
+def price_ok(price: Decimal) -> bool:
+    """
+    Цену можно записать в buy_price: не NaN, не бесконечность и влезает в NUMERIC(10,2).
+    """
+    return price.is_finite() and abs(price) < MAX_PRICE
+
+
+@dataclass
+class IngestResult:
+    """
+    Итог загрузки одной пачки ресурсов.
+    """
+    added: int = 0
+    # логины, которые уже были в БД (конфликт по (type, lower(login)))
+    known: list[str] = field(default_factory=list)
+    # логины, повторявшиеся внутри самой пачки
+    repeated: list[str] = field(default_factory=list)
+
+    def skipped_lines(self, limit: int = 20) -> list[str]:
+        """
+        Строки отчёта о пропущенных дубликатах (пусто, если их нет).
+        """
+        lines: list[str] = []
+        if self.repeated:
+            lines.append(f"Повторы внутри пачки: {len(self.repeated)}")
+        if self.known:
+            lines.append(f"Уже были в базе: {len(self.known)}")
+            lines.extend(f"  - {html.escape(login)}" for login in self.known[:limit])
+            if len(self.known) > limit:
+                lines.append("  …")
+        return lines
+
+
+def dedup_rows(rows):
+    """
+    Убирает дубликаты внутри пачки ещё до похода в БД.
+    rows — кортежи (login, password, proxy).
+    Логин сравниваем без учёта регистра — так же, как уникальный индекс.
+    Возвращает (уникальные строки, повторы).
+    """
+    seen: set[str] = set()
+    unique = []
+    repeated: list[str] = []
+
+    for row in rows:
+        key = row[0].lower()
+        if key in seen:
+            repeated.append(row[0])
+            continue
+        seen.add(key)
+        unique.append(row)
+
+    return unique, repeated
+
+
+async def insert_resources(conn, r_type: str, rows, price=0, supplier_id=None) -> IngestResult:
+    """
+    Загружает пачку ресурсов одним запросом.
+    Дубликаты внутри пачки отбрасываются заранее, а уже известные
+    логины отсекает ON CONFLICT DO NOTHING — по RETURNING видно,
+    какие строки реально добавлены.
+    """
+    unique, repeated = dedup_rows(rows)
+    result = IngestResult(repeated=repeated)
+    if not unique:
+        return result
+
+    logins = [r[0] for r in unique]
+    passwords = [r[1] for r in unique]
+    proxies = [r[2] for r in unique]
+
+    inserted = await conn.fetch(
+        DBQueries.INSERT_RESOURCES_DEDUP,
+        r_type,
+        logins,
+        passwords,
+        proxies,
+        price,
+        supplier_id,
+    )
+
+    added = {r["login"].lower() for r in inserted}
+    result.added = len(added)
+    result.known = [login for login in logins if login.lower() not in added]
+    return result
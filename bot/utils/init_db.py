@@ -1,44 +1,890 @@
-DDL_STATEMENTS = [
-    """CREATE TABLE IF NOT EXISTS managers (
-        tg_id BIGINT PRIMARY KEY,
-        name TEXT,
-        role TEXT CHECK (role IN ('manager','admin','owner')) NOT NULL
-    );""",
-    """CREATE TABLE IF NOT EXISTS suppliers (
-        id SERIAL PRIMARY KEY,
-        name TEXT,
-        contact TEXT,
-        notes TEXT
-    );""",
-    """CREATE TABLE IF NOT EXISTS resources (
-        id SERIAL PRIMARY KEY,
-        type TEXT NOT NULL,
-        login TEXT NOT NULL,
-        password TEXT NOT NULL,
-        proxy TEXT,
-        supplier_id INT REFERENCES suppliers(id),
-        buy_price NUMERIC(10,2) NOT NULL,
-        status TEXT CHECK (status IN ('free','issued','blocked_at_receipt','error_on_login','dead','disabled')) DEFAULT 'free',
-        manager_tg_id BIGINT REFERENCES managers(tg_id),
-        issue_datetime TIMESTAMP,
-        receipt_state TEXT,
-        lifetime_minutes INT,
-        end_datetime TIMESTAMP
-    );""",
-    """CREATE TABLE IF NOT EXISTS history (
-        id SERIAL PRIMARY KEY,
-        datetime TIMESTAMP DEFAULT NOW(),
-        resource_id INT REFERENCES resources(id),
-        manager_tg_id BIGINT REFERENCES managers(tg_id),
-        type TEXT,
-        supplier_id INT,
-        price NUMERIC(10,2),
-        action TEXT,
-        receipt_state TEXT,
-        lifetime_minutes INT
-    );""",
+import asyncpg
+
+
+# Версионированные миграции схемы.
+# Каждая версия применяется один раз, номер последней хранится в schema_version.
+# Менять уже выпущенную версию нельзя — только добавлять новую в конец.
+MIGRATIONS = [
+    # 1 — исходные таблицы
+    (1, [
+        """CREATE TABLE IF NOT EXISTS managers (
+            tg_id BIGINT PRIMARY KEY,
+            name TEXT,
+            role TEXT CHECK (role IN ('manager','admin','owner')) NOT NULL
+        );""",
+        """CREATE TABLE IF NOT EXISTS suppliers (
+            id SERIAL PRIMARY KEY,
+            name TEXT,
+            contact TEXT,
+            notes TEXT
+        );""",
+        """CREATE TABLE IF NOT EXISTS resources (
+            id SERIAL PRIMARY KEY,
+            type TEXT NOT NULL,
+            login TEXT NOT NULL,
+            password TEXT NOT NULL,
+            proxy TEXT,
+            supplier_id INT REFERENCES suppliers(id),
+            buy_price NUMERIC(10,2) NOT NULL,
+            status TEXT CHECK (status IN ('free','issued','blocked_at_receipt','error_on_login','dead','disabled')) DEFAULT 'free',
+            manager_tg_id BIGINT REFERENCES managers(tg_id),
+            issue_datetime TIMESTAMP,
+            receipt_state TEXT,
+            lifetime_minutes INT,
+            end_datetime TIMESTAMP
+        );""",
+        """CREATE TABLE IF NOT EXISTS history (
+            id SERIAL PRIMARY KEY,
+            datetime TIMESTAMP DEFAULT NOW(),
+            resource_id INT REFERENCES resources(id),
+            manager_tg_id BIGINT REFERENCES managers(tg_id),
+            type TEXT,
+            supplier_id INT,
+            price NUMERIC(10,2),
+            action TEXT,
+            receipt_state TEXT,
+            lifetime_minutes INT
+        );""",
+    ]),
+    # 2 — индексы и колонки для выдачи, поиска, выгрузок и аналитики
+    (2, [
+        # Дата появления ресурса в базе (неделя закупки для аналитики).
+        # Старым строкам проставится время миграции.
+        """ALTER TABLE resources ADD COLUMN IF NOT EXISTS created_at TIMESTAMP DEFAULT NOW();""",
+        # Один логин одного типа — один ресурс (без учёта регистра).
+        # Дубли из старой базы схлопываются: остаётся выданная строка (если есть),
+        # среди равных — самая старая; история дублей переносится на неё.
+        """WITH ranked AS (
+            SELECT id, FIRST_VALUE(id) OVER (
+                PARTITION BY type, lower(login)
+                ORDER BY (manager_tg_id IS NULL), id
+            ) AS keep_id
+            FROM resources
+        ),
+        dup AS (
+            SELECT id, keep_id FROM ranked WHERE id <> keep_id
+        ),
+        moved AS (
+            UPDATE history h
+            SET resource_id = d.keep_id
+            FROM dup d
+            WHERE h.resource_id = d.id
+        )
+        DELETE FROM resources r
+        USING dup d
+        WHERE r.id = d.id;""",
+        """CREATE UNIQUE INDEX IF NOT EXISTS resources_type_login_uniq
+            ON resources (type, lower(login));""",
+        # Свободный остаток по типу: подсчёт и выдача по id (fifo / freshest)
+        """DROP INDEX IF EXISTS resources_free_type_idx;""",
+        """CREATE INDEX IF NOT EXISTS resources_free_type_id_idx
+            ON resources (type, id)
+            WHERE status = 'free' AND manager_tg_id IS NULL;""",
+        # Выдача по поставщикам (best_supplier / round_robin)
+        """CREATE INDEX IF NOT EXISTS resources_free_supplier_idx
+            ON resources (type, (COALESCE(supplier_id, 0)), id)
+            WHERE status = 'free' AND manager_tg_id IS NULL;""",
+        # Поиск выданных, но так и не отмеченных ресурсов (возврат в свободные)
+        """CREATE INDEX IF NOT EXISTS resources_issued_pending_idx
+            ON resources (issue_datetime)
+            WHERE manager_tg_id IS NOT NULL
+              AND (receipt_state IS NULL OR receipt_state = 'new');""",
+        """CREATE INDEX IF NOT EXISTS history_resource_idx
+            ON history (resource_id);""",
+        # Выданные без даты выдачи (старые записи) возврат не видит —
+        # берём дату последней выдачи из истории, а нет её — отсчёт с миграции.
+        """UPDATE resources r
+        SET issue_datetime = COALESCE(
+            (SELECT MAX(h.datetime) FROM history h
+             WHERE h.resource_id = r.id AND h.action = 'issued'),
+            NOW()
+        )
+        WHERE r.manager_tg_id IS NOT NULL
+          AND r.issue_datetime IS NULL;""",
+        # Поиск по логину (подстрока и префикс) для /find
+        """CREATE EXTENSION IF NOT EXISTS pg_trgm;""",
+        """CREATE INDEX IF NOT EXISTS resources_login_trgm_idx
+            ON resources USING gin (lower(login) gin_trgm_ops);""",
+        """CREATE INDEX IF NOT EXISTS resources_manager_idx
+            ON resources (manager_tg_id, id);""",
+        # Аналитика и выгрузки по дате выдачи
+        """CREATE INDEX IF NOT EXISTS resources_issue_datetime_idx
+            ON resources (issue_datetime);""",
+        # Выгрузка истории за период
+        """CREATE INDEX IF NOT EXISTS history_datetime_idx
+            ON history (datetime);""",
+    ]),
+    # 3 — агрегаты по событиям истории (прогноз остатка, оценка поставщиков)
+    (3, [
+        # Почасовые выдачи по типам — основа прогноза остатка
+        """CREATE TABLE IF NOT EXISTS issue_rollups (
+            type TEXT NOT NULL,
+            hour TIMESTAMP NOT NULL,
+            issued INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (type, hour)
+        );""",
+        """CREATE INDEX IF NOT EXISTS issue_rollups_hour_idx
+            ON issue_rollups (hour);""",
+        # Поставщик ищется по имени без учёта регистра
+        """CREATE UNIQUE INDEX IF NOT EXISTS suppliers_name_uniq
+            ON suppliers (lower(name));""",
+        # Оценка поставщиков по типам; supplier_id = 0 — «без поставщика».
+        # received — выдано, good/bad — отметки при получении,
+        # lifetime_* — только ресурсы с отмеченным сроком жизни.
+        """CREATE TABLE IF NOT EXISTS supplier_scores (
+            supplier_id INT NOT NULL,
+            type TEXT NOT NULL,
+            received INT NOT NULL DEFAULT 0,
+            good INT NOT NULL DEFAULT 0,
+            bad INT NOT NULL DEFAULT 0,
+            lifetime_count INT NOT NULL DEFAULT 0,
+            lifetime_sum BIGINT NOT NULL DEFAULT 0,
+            lifetime_cost NUMERIC(12,2) NOT NULL DEFAULT 0,
+            PRIMARY KEY (supplier_id, type)
+        );""",
+        # Распределение сроков жизни — для медианы и p90
+        """CREATE TABLE IF NOT EXISTS supplier_lifetimes (
+            supplier_id INT NOT NULL,
+            type TEXT NOT NULL,
+            lifetime_minutes INT NOT NULL,
+            cnt INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (supplier_id, type, lifetime_minutes)
+        );""",
+        # Агрегаты обновляются по мере записи событий в history,
+        # а не пересчётом всей истории.
+        """CREATE OR REPLACE FUNCTION history_rollup() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO issue_rollups (type, hour, issued)
+            SELECT type, date_trunc('hour', datetime), COUNT(*)
+            FROM new_rows
+            WHERE action = 'issued' AND type IS NOT NULL
+            GROUP BY 1, 2
+            ON CONFLICT (type, hour)
+            DO UPDATE SET issued = issue_rollups.issued + EXCLUDED.issued;
+
+            INSERT INTO supplier_scores (
+                supplier_id, type, received, good, bad,
+                lifetime_count, lifetime_sum, lifetime_cost
+            )
+            SELECT
+                COALESCE(n.supplier_id, r.supplier_id, 0),
+                COALESCE(n.type, r.type),
+                COUNT(*) FILTER (WHERE n.action = 'issued'),
+                COUNT(*) FILTER (WHERE n.action = 'status_good'),
+                COUNT(*) FILTER (WHERE n.action = 'status_bad'),
+                COUNT(*) FILTER (WHERE n.action = 'lifetime_set' AND n.lifetime_minutes > 0),
+                COALESCE(SUM(n.lifetime_minutes)
+                    FILTER (WHERE n.action = 'lifetime_set' AND n.lifetime_minutes > 0), 0),
+                COALESCE(SUM(COALESCE(n.price, r.buy_price))
+                    FILTER (WHERE n.action = 'lifetime_set' AND n.lifetime_minutes > 0), 0)
+            FROM new_rows n
+            LEFT JOIN resources r ON r.id = n.resource_id
+            WHERE n.action IN ('issued', 'status_good', 'status_bad', 'lifetime_set')
+              AND COALESCE(n.type, r.type) IS NOT NULL
+            GROUP BY 1, 2
+            ON CONFLICT (supplier_id, type) DO UPDATE SET
+                received = supplier_scores.received + EXCLUDED.received,
+                good = supplier_scores.good + EXCLUDED.good,
+                bad = supplier_scores.bad + EXCLUDED.bad,
+                lifetime_count = supplier_scores.lifetime_count + EXCLUDED.lifetime_count,
+                lifetime_sum = supplier_scores.lifetime_sum + EXCLUDED.lifetime_sum,
+                lifetime_cost = supplier_scores.lifetime_cost + EXCLUDED.lifetime_cost;
+
+            INSERT INTO supplier_lifetimes (supplier_id, type, lifetime_minutes, cnt)
+            SELECT
+                COALESCE(n.supplier_id, r.supplier_id, 0),
+                COALESCE(n.type, r.type),
+                n.lifetime_minutes,
+                COUNT(*)
+            FROM new_rows n
+            LEFT JOIN resources r ON r.id = n.resource_id
+            WHERE n.action = 'lifetime_set'
+              AND n.lifetime_minutes > 0
+              AND COALESCE(n.type, r.type) IS NOT NULL
+            GROUP BY 1, 2, 3
+            ON CONFLICT (supplier_id, type, lifetime_minutes)
+            DO UPDATE SET cnt = supplier_lifetimes.cnt + EXCLUDED.cnt;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;""",
+        """DROP TRIGGER IF EXISTS history_rollup ON history;""",
+        """CREATE TRIGGER history_rollup
+            AFTER INSERT ON history
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION history_rollup();""",
+    ]),
+    (4, [
+        # Идемпотентность выдачи: повтор того же запроса отдаёт прежний результат.
+        # resource_ids пуст, пока первая попытка ещё в транзакции.
+        """CREATE TABLE IF NOT EXISTS issue_requests (
+            chat_id BIGINT NOT NULL,
+            request_key TEXT NOT NULL,
+            resource_ids INT[] NOT NULL DEFAULT '{}',
+            created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+            PRIMARY KEY (chat_id, request_key)
+        );""",
+        """CREATE INDEX IF NOT EXISTS issue_requests_created_idx
+            ON issue_requests (created_at);""",
+    ]),
+    (5, [
+        # Квоты выдачи. manager_tg_id = 0 — для всех менеджеров,
+        # type = '*' — для любого типа; NULL в лимите — без ограничения.
+        """CREATE TABLE IF NOT EXISTS manager_quotas (
+            manager_tg_id BIGINT NOT NULL,
+            type TEXT NOT NULL,
+            per_hour INT,
+            per_day INT,
+            burst INT,
+            PRIMARY KEY (manager_tg_id, type)
+        );""",
+        # Сколько выдано менеджеру по часам — для квот и рейтингов
+        """CREATE TABLE IF NOT EXISTS manager_issue_hourly (
+            manager_tg_id BIGINT NOT NULL,
+            type TEXT NOT NULL,
+            hour TIMESTAMP NOT NULL,
+            issued INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (manager_tg_id, type, hour)
+        );""",
+        """CREATE OR REPLACE FUNCTION manager_issue_counts() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO manager_issue_hourly (manager_tg_id, type, hour, issued)
+            SELECT manager_tg_id, type, date_trunc('hour', datetime), COUNT(*)
+            FROM new_rows
+            WHERE action = 'issued' AND manager_tg_id IS NOT NULL AND type IS NOT NULL
+            GROUP BY 1, 2, 3
+            ON CONFLICT (manager_tg_id, type, hour)
+            DO UPDATE SET issued = manager_issue_hourly.issued + EXCLUDED.issued;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;""",
+        """DROP TRIGGER IF EXISTS manager_issue_counts ON history;""",
+        """CREATE TRIGGER manager_issue_counts
+            AFTER INSERT ON history
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION manager_issue_counts();""",
+    ]),
+    (6, [
+        # Активность менеджеров по дням — для рейтинга /top без сканирования history.
+        # Ведётся тем же триггером, что и почасовые счётчики выдач.
+        """CREATE TABLE IF NOT EXISTS manager_daily (
+            manager_tg_id BIGINT NOT NULL,
+            day DATE NOT NULL,
+            issued INT NOT NULL DEFAULT 0,
+            good INT NOT NULL DEFAULT 0,
+            bad INT NOT NULL DEFAULT 0,
+            lifetime_count INT NOT NULL DEFAULT 0,
+            lifetime_sum BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (manager_tg_id, day)
+        );""",
+        """CREATE INDEX IF NOT EXISTS manager_daily_day_idx ON manager_daily (day);""",
+        # всё, что было до миграции, — одним проходом по истории
+        """INSERT INTO manager_daily (
+            manager_tg_id, day, issued, good, bad, lifetime_count, lifetime_sum
+        )
+        SELECT
+            manager_tg_id,
+            datetime::date,
+            COUNT(*) FILTER (WHERE action = 'issued'),
+            COUNT(*) FILTER (WHERE action = 'status_good'),
+            COUNT(*) FILTER (WHERE action = 'status_bad'),
+            COUNT(*) FILTER (WHERE action = 'lifetime_set' AND lifetime_minutes > 0),
+            COALESCE(SUM(lifetime_minutes)
+                FILTER (WHERE action = 'lifetime_set' AND lifetime_minutes > 0), 0)
+        FROM history
+        WHERE manager_tg_id IS NOT NULL
+          AND action IN ('issued', 'status_good', 'status_bad', 'lifetime_set')
+        GROUP BY 1, 2
+        ON CONFLICT DO NOTHING;""",
+        """CREATE OR REPLACE FUNCTION manager_issue_counts() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO manager_issue_hourly (manager_tg_id, type, hour, issued)
+            SELECT manager_tg_id, type, date_trunc('hour', datetime), COUNT(*)
+            FROM new_rows
+            WHERE action = 'issued' AND manager_tg_id IS NOT NULL AND type IS NOT NULL
+            GROUP BY 1, 2, 3
+            ON CONFLICT (manager_tg_id, type, hour)
+            DO UPDATE SET issued = manager_issue_hourly.issued + EXCLUDED.issued;
+
+            INSERT INTO manager_daily (
+                manager_tg_id, day, issued, good, bad, lifetime_count, lifetime_sum
+            )
+            SELECT
+                manager_tg_id,
+                datetime::date,
+                COUNT(*) FILTER (WHERE action = 'issued'),
+                COUNT(*) FILTER (WHERE action = 'status_good'),
+                COUNT(*) FILTER (WHERE action = 'status_bad'),
+                COUNT(*) FILTER (WHERE action = 'lifetime_set' AND lifetime_minutes > 0),
+                COALESCE(SUM(lifetime_minutes)
+                    FILTER (WHERE action = 'lifetime_set' AND lifetime_minutes > 0), 0)
+            FROM new_rows
+            WHERE manager_tg_id IS NOT NULL
+              AND action IN ('issued', 'status_good', 'status_bad', 'lifetime_set')
+            GROUP BY 1, 2
+            ON CONFLICT (manager_tg_id, day) DO UPDATE SET
+                issued = manager_daily.issued + EXCLUDED.issued,
+                good = manager_daily.good + EXCLUDED.good,
+                bad = manager_daily.bad + EXCLUDED.bad,
+                lifetime_count = manager_daily.lifetime_count + EXCLUDED.lifetime_count,
+                lifetime_sum = manager_daily.lifetime_sum + EXCLUDED.lifetime_sum;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;""",
+    ]),
+    (7, [
+        # Результат последней проверки прокси (один раз на прокси, а не на ресурс)
+        """CREATE TABLE IF NOT EXISTS proxy_health (
+            proxy TEXT PRIMARY KEY,
+            ok BOOLEAN NOT NULL,
+            latency_ms INT,
+            error TEXT,
+            checked_at TIMESTAMP NOT NULL DEFAULT NOW(),
+            fail_streak INT NOT NULL DEFAULT 0
+        );""",
+        """CREATE INDEX IF NOT EXISTS proxy_health_checked_idx
+            ON proxy_health (checked_at);""",
+        # Разные прокси свободных ресурсов — без прохода по всей таблице
+        """CREATE INDEX IF NOT EXISTS resources_free_proxy_idx
+            ON resources (proxy)
+            WHERE status = 'free' AND manager_tg_id IS NULL AND proxy IS NOT NULL;""",
+    ]),
+    (8, [
+        # Бронь до подтверждения менеджером; истёкшие снимаются одним проходом по индексу
+        """ALTER TABLE resources ADD COLUMN IF NOT EXISTS reserved_until TIMESTAMP;""",
+        """CREATE INDEX IF NOT EXISTS resources_reserved_until_idx
+            ON resources (reserved_until)
+            WHERE reserved_until IS NOT NULL;""",
+    ]),
+    (9, [
+        # Свободный остаток по типам — счётчики вместо GROUP BY по resources.
+        # Ведутся триггерами на resources, так что любая запись (выдача, возврат,
+        # загрузка, бронь) меняет их в той же транзакции.
+        """CREATE TABLE IF NOT EXISTS inventory_counts (
+            type TEXT NOT NULL,
+            shard SMALLINT NOT NULL,
+            free INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (type, shard)
+        );""",
+        # пока считаем начальные значения, остаток не должен меняться
+        """LOCK TABLE resources IN SHARE ROW EXCLUSIVE MODE;""",
+        """DELETE FROM inventory_counts;""",
+        """INSERT INTO inventory_counts (type, shard, free)
+        SELECT type, 0, COUNT(*)
+        FROM resources
+        WHERE status = 'free' AND manager_tg_id IS NULL
+        GROUP BY type;""",
+        # Счётчик разбит на 16 строк по соединению (shard), остаток типа — их сумма:
+        # параллельные выдачи одного типа не ждут друг друга на одной строке.
+        # Строки, не менявшие «свободность», счётчик не трогают (HAVING).
+        """CREATE OR REPLACE FUNCTION inventory_counts_sync() RETURNS trigger AS $$
+        DECLARE
+            v_shard SMALLINT := pg_backend_pid() % 16;
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                INSERT INTO inventory_counts (type, shard, free)
+                SELECT type, v_shard, COUNT(*)
+                FROM new_rows
+                WHERE status = 'free' AND manager_tg_id IS NULL
+                GROUP BY type
+                ORDER BY type
+                ON CONFLICT (type, shard) DO UPDATE SET free = inventory_counts.free + EXCLUDED.free;
+            ELSIF TG_OP = 'DELETE' THEN
+                INSERT INTO inventory_counts (type, shard, free)
+                SELECT type, v_shard, -COUNT(*)
+                FROM old_rows
+                WHERE status = 'free' AND manager_tg_id IS NULL
+                GROUP BY type
+                ORDER BY type
+                ON CONFLICT (type, shard) DO UPDATE SET free = inventory_counts.free + EXCLUDED.free;
+            ELSE
+                INSERT INTO inventory_counts (type, shard, free)
+                SELECT type, v_shard, SUM(delta)
+                FROM (
+                    SELECT type, 1 AS delta FROM new_rows
+                    WHERE status = 'free' AND manager_tg_id IS NULL
+                    UNION ALL
+                    SELECT type, -1 FROM old_rows
+                    WHERE status = 'free' AND manager_tg_id IS NULL
+                ) d
+                GROUP BY type
+                HAVING SUM(delta) <> 0
+                ORDER BY type
+                ON CONFLICT (type, shard) DO UPDATE SET free = inventory_counts.free + EXCLUDED.free;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;""",
+        """DROP TRIGGER IF EXISTS inventory_counts_ins ON resources;""",
+        """CREATE TRIGGER inventory_counts_ins
+            AFTER INSERT ON resources
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION inventory_counts_sync();""",
+        """DROP TRIGGER IF EXISTS inventory_counts_upd ON resources;""",
+        """CREATE TRIGGER inventory_counts_upd
+            AFTER UPDATE ON resources
+            REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION inventory_counts_sync();""",
+        """DROP TRIGGER IF EXISTS inventory_counts_del ON resources;""",
+        """CREATE TRIGGER inventory_counts_del
+            AFTER DELETE ON resources
+            REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION inventory_counts_sync();""",
+        # Действия менеджера — по одной функции на действие: бот делает один вызов,
+        # проверка, изменение, история и счётчики — в одной транзакции на сервере.
+        #
+        # Забрать до p_count свободных ресурсов (по порядку id, самые свежие или
+        # от одного поставщика) и записать 'issued' / 'reserved' в историю.
+        # SKIP LOCKED — параллельные выдачи не ждут друг друга и не делят строки.
+        """CREATE OR REPLACE FUNCTION claim_free_resources(
+            p_manager BIGINT,
+            p_type TEXT,
+            p_count INT,
+            p_order TEXT,
+            p_supplier INT,
+            p_skip_dead BOOLEAN,
+            p_reserve_minutes INT
+        ) RETURNS SETOF INT AS $$
+        DECLARE
+            v_ids INT[];
+        BEGIN
+            IF p_count <= 0 THEN
+                RETURN;
+            END IF;
+
+            IF p_supplier IS NOT NULL THEN
+                SELECT array_agg(s.id) INTO v_ids FROM (
+                    SELECT id FROM resources
+                    WHERE status = 'free' AND manager_tg_id IS NULL AND type = p_type
+                      AND COALESCE(supplier_id, 0) = p_supplier
+                      AND (NOT p_skip_dead OR NOT EXISTS (
+                          SELECT 1 FROM proxy_health ph
+                          WHERE ph.proxy = resources.proxy AND NOT ph.ok
+                      ))
+                    ORDER BY id
+                    LIMIT p_count
+                    FOR UPDATE SKIP LOCKED
+                ) s;
+            ELSIF p_order = 'freshest' THEN
+                SELECT array_agg(s.id) INTO v_ids FROM (
+                    SELECT id FROM resources
+                    WHERE status = 'free' AND manager_tg_id IS NULL AND type = p_type
+                      AND (NOT p_skip_dead OR NOT EXISTS (
+                          SELECT 1 FROM proxy_health ph
+                          WHERE ph.proxy = resources.proxy AND NOT ph.ok
+                      ))
+                    ORDER BY id DESC
+                    LIMIT p_count
+                    FOR UPDATE SKIP LOCKED
+                ) s;
+            ELSE
+                SELECT array_agg(s.id) INTO v_ids FROM (
+                    SELECT id FROM resources
+                    WHERE status = 'free' AND manager_tg_id IS NULL AND type = p_type
+                      AND (NOT p_skip_dead OR NOT EXISTS (
+                          SELECT 1 FROM proxy_health ph
+                          WHERE ph.proxy = resources.proxy AND NOT ph.ok
+                      ))
+                    ORDER BY id
+                    LIMIT p_count
+                    FOR UPDATE SKIP LOCKED
+                ) s;
+            END IF;
+
+            IF v_ids IS NULL THEN
+                RETURN;
+            END IF;
+
+            RETURN QUERY
+            WITH claimed AS (
+                UPDATE resources r
+                SET manager_tg_id = p_manager,
+                    issue_datetime = NOW(),
+                    receipt_state = CASE WHEN p_reserve_minutes > 0 THEN 'reserved' ELSE 'new' END,
+                    reserved_until = CASE WHEN p_reserve_minutes > 0
+                        THEN NOW() + make_interval(mins => p_reserve_minutes) END
+                WHERE r.id = ANY (v_ids)
+                RETURNING r.id, r.type, r.supplier_id, r.buy_price
+            ),
+            logged AS (
+                INSERT INTO history (
+                    datetime, resource_id, manager_tg_id, type, supplier_id, action, price
+                )
+                SELECT NOW(), c.id, p_manager, c.type, c.supplier_id,
+                       CASE WHEN p_reserve_minutes > 0 THEN 'reserved' ELSE 'issued' END,
+                       c.buy_price
+                FROM claimed c
+            )
+            SELECT c.id FROM claimed c ORDER BY c.id;
+        END;
+        $$ LANGUAGE plpgsql;""",
+        # Выдача целиком: идемпотентность по (p_chat_id, p_request_key), стратегия
+        # (p_order или порядок поставщиков p_suppliers с p_per_supplier на первом
+        # проходе), политика прокси (off / skip / prefer) и бронь.
+        # replayed = TRUE — это повтор, строки прежнего результата.
+        """CREATE OR REPLACE FUNCTION issue_resources(
+            p_manager BIGINT,
+            p_type TEXT,
+            p_count INT,
+            p_order TEXT DEFAULT 'fifo',
+            p_suppliers INT[] DEFAULT NULL,
+            p_per_supplier INT DEFAULT NULL,
+            p_proxy_policy TEXT DEFAULT 'off',
+            p_reserve_minutes INT DEFAULT 0,
+            p_chat_id BIGINT DEFAULT NULL,
+            p_request_key TEXT DEFAULT NULL
+        ) RETURNS TABLE (
+            id INT, login TEXT, password TEXT, proxy TEXT, supplier_id INT, replayed BOOLEAN
+        ) AS $$
+        #variable_conflict use_column
+        DECLARE
+            v_ids INT[] := '{}';
+            v_skip BOOLEAN;
+            v_cap INT;
+            v_supplier INT;
+        BEGIN
+            IF p_request_key IS NOT NULL THEN
+                -- параллельный повтор ждёт здесь на ключе, пока первая попытка не закоммитит
+                INSERT INTO issue_requests (chat_id, request_key)
+                VALUES (p_chat_id, p_request_key)
+                ON CONFLICT DO NOTHING;
+                IF NOT FOUND THEN
+                    RETURN QUERY
+                    SELECT r.id, r.login, r.password, r.proxy, r.supplier_id, TRUE
+                    FROM issue_requests q
+                    CROSS JOIN LATERAL unnest(q.resource_ids) WITH ORDINALITY AS u(rid, pos)
+                    JOIN resources r ON r.id = u.rid
+                    WHERE q.chat_id = p_chat_id AND q.request_key = p_request_key
+                    ORDER BY u.pos;
+                    RETURN;
+                END IF;
+            END IF;
+
+            -- prefer: сначала ресурсы с живыми (или непроверенными) прокси, потом остальные
+            FOREACH v_skip IN ARRAY CASE p_proxy_policy
+                WHEN 'skip' THEN ARRAY[TRUE]
+                WHEN 'prefer' THEN ARRAY[TRUE, FALSE]
+                ELSE ARRAY[FALSE]
+            END LOOP
+                EXIT WHEN cardinality(v_ids) >= p_count;
+
+                IF p_suppliers IS NULL THEN
+                    v_ids := v_ids || ARRAY(SELECT claim_free_resources(
+                        p_manager, p_type, p_count - cardinality(v_ids),
+                        p_order, NULL, v_skip, p_reserve_minutes
+                    ));
+                    CONTINUE;
+                END IF;
+
+                -- первый проход — не больше p_per_supplier с каждого,
+                -- второй — добираем остаток у тех, у кого ещё есть
+                FOREACH v_cap IN ARRAY ARRAY[COALESCE(p_per_supplier, p_count), p_count] LOOP
+                    FOREACH v_supplier IN ARRAY p_suppliers LOOP
+                        EXIT WHEN cardinality(v_ids) >= p_count;
+                        v_ids := v_ids || ARRAY(SELECT claim_free_resources(
+                            p_manager, p_type, LEAST(v_cap, p_count - cardinality(v_ids)),
+                            'fifo', v_supplier, v_skip, p_reserve_minutes
+                        ));
+                    END LOOP;
+                    EXIT WHEN cardinality(v_ids) >= p_count OR v_cap >= p_count;
+                END LOOP;
+            END LOOP;
+
+            IF p_request_key IS NOT NULL THEN
+                UPDATE issue_requests
+                SET resource_ids = v_ids
+                WHERE chat_id = p_chat_id AND request_key = p_request_key;
+            END IF;
+
+            RETURN QUERY
+            SELECT r.id, r.login, r.password, r.proxy, r.supplier_id, FALSE
+            FROM unnest(v_ids) WITH ORDINALITY AS u(rid, pos)
+            JOIN resources r ON r.id = u.rid
+            ORDER BY u.pos;
+        END;
+        $$ LANGUAGE plpgsql;""",
+        # Отметка при получении: good / bad. Другое состояние — ошибка (check_violation),
+        # а не молчаливый UPDATE. Бронь и отработавшие не трогаем, повторная
+        # такая же отметка не пишет историю второй раз. Возвращает отмеченные id.
+        """CREATE OR REPLACE FUNCTION mark_status(
+            p_ids INT[],
+            p_manager BIGINT,
+            p_state TEXT
+        ) RETURNS SETOF INT AS $$
+        BEGIN
+            IF p_state IS NULL OR p_state NOT IN ('good', 'bad') THEN
+                RAISE EXCEPTION 'mark_status: недопустимое состояние %', p_state
+                    USING ERRCODE = 'check_violation';
+            END IF;
+
+            RETURN QUERY
+            WITH upd AS (
+                UPDATE resources r
+                SET receipt_state = p_state
+                WHERE r.id = ANY (p_ids)
+                  AND r.manager_tg_id = p_manager
+                  AND (r.receipt_state IS NULL OR r.receipt_state IN ('new', 'good', 'bad'))
+                  AND r.receipt_state IS DISTINCT FROM p_state
+                RETURNING r.id, r.type, r.supplier_id
+            ),
+            logged AS (
+                INSERT INTO history (
+                    datetime, resource_id, manager_tg_id, type, supplier_id, action
+                )
+                SELECT NOW(), u.id, p_manager, u.type, u.supplier_id, 'status_' || p_state
+                FROM upd u
+            )
+            SELECT u.id FROM upd u ORDER BY u.id;
+        END;
+        $$ LANGUAGE plpgsql;""",
+        # Срок жизни: p_minutes < 0 — «до блокировки», считаем от выдачи.
+        # Уже отмеченный или забронированный ресурс не трогаем (пустой результат).
+        """CREATE OR REPLACE FUNCTION set_lifetime(
+            p_id INT,
+            p_manager BIGINT,
+            p_minutes INT
+        ) RETURNS TABLE (id INT, type TEXT, lifetime_minutes INT) AS $$
+        #variable_conflict use_column
+        BEGIN
+            RETURN QUERY
+            WITH upd AS (
+                UPDATE resources r
+                SET lifetime_minutes = CASE
+                        -- GREATEST пропускает NULL: без даты выдачи вышел бы 0, а не «неизвестно»
+                        WHEN p_minutes < 0 AND r.issue_datetime IS NULL THEN NULL
+                        WHEN p_minutes < 0
+                            THEN GREATEST(0, EXTRACT(EPOCH FROM NOW() - r.issue_datetime) / 60)::int
+                        ELSE p_minutes
+                    END,
+                    receipt_state = 'used',
+                    end_datetime = NOW()
+                WHERE r.id = p_id
+                  AND r.manager_tg_id = p_manager
+                  AND r.receipt_state IS DISTINCT FROM 'used'
+                  AND r.receipt_state IS DISTINCT FROM 'reserved'
+                RETURNING r.id, r.type, r.supplier_id, r.buy_price, r.lifetime_minutes
+            ),
+            logged AS (
+                INSERT INTO history (
+                    datetime, resource_id, manager_tg_id, type, supplier_id, price,
+                    action, lifetime_minutes
+                )
+                SELECT NOW(), u.id, p_manager, u.type, u.supplier_id, u.buy_price,
+                       'lifetime_set', u.lifetime_minutes
+                FROM upd u
+            )
+            SELECT u.id, u.type, u.lifetime_minutes FROM upd u;
+        END;
+        $$ LANGUAGE plpgsql;""",
+    ]),
+    (10, [
+        # Очередь ожидания: менеджер, которому не хватило ресурсов типа,
+        # получает их сам при следующей загрузке. Одна запись на (менеджер, тип),
+        # очередь — по id.
+        """CREATE TABLE IF NOT EXISTS backorders (
+            id SERIAL PRIMARY KEY,
+            manager_tg_id BIGINT NOT NULL,
+            type TEXT NOT NULL,
+            count INT NOT NULL CHECK (count > 0),
+            created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+            UNIQUE (manager_tg_id, type)
+        );""",
+        """CREATE INDEX IF NOT EXISTS backorders_type_idx ON backorders (type, id);""",
+        # Раздать свободные ресурсы типа по очереди: каждому — через issue_resources,
+        # как обычная выдача. Заявки старше p_ttl_hours пропускаются — их снимает
+        # фоновая задача (и возвращает квоту). Кого сейчас
+        # раздаёт параллельный вызов — пропускаем (SKIP LOCKED); как только
+        # свободных не хватило — стоп. waiting — сколько менеджер ещё ждёт.
+        """CREATE OR REPLACE FUNCTION fill_backorders(
+            p_type TEXT,
+            p_order TEXT DEFAULT 'fifo',
+            p_suppliers INT[] DEFAULT NULL,
+            p_spread BOOLEAN DEFAULT FALSE,
+            p_proxy_policy TEXT DEFAULT 'off',
+            p_ttl_hours INT DEFAULT 24
+        ) RETURNS TABLE (
+            manager_tg_id BIGINT, id INT, login TEXT, password TEXT, proxy TEXT, waiting INT
+        ) AS $$
+        #variable_conflict use_column
+        DECLARE
+            b RECORD;
+            v_got INT;
+        BEGIN
+            FOR b IN
+                SELECT bo.id, bo.manager_tg_id, bo.count
+                FROM backorders bo
+                WHERE bo.type = p_type
+                  AND bo.created_at >= NOW() - make_interval(hours => p_ttl_hours)
+                ORDER BY bo.id
+                FOR UPDATE SKIP LOCKED
+            LOOP
+                RETURN QUERY
+                SELECT b.manager_tg_id, i.id, i.login, i.password, i.proxy,
+                       b.count - (COUNT(*) OVER ())::int
+                FROM issue_resources(
+                    b.manager_tg_id, p_type, b.count, p_order, p_suppliers,
+                    -- round_robin: поровну между поставщиками на первом проходе
+                    CASE WHEN p_spread AND cardinality(p_suppliers) > 0
+                        THEN CEIL(b.count::numeric / cardinality(p_suppliers))::int
+                    END,
+                    p_proxy_policy
+                ) AS i;
+                GET DIAGNOSTICS v_got = ROW_COUNT;
+
+                IF v_got >= b.count THEN
+                    DELETE FROM backorders bo WHERE bo.id = b.id;
+                ELSIF v_got > 0 THEN
+                    UPDATE backorders bo SET count = bo.count - v_got WHERE bo.id = b.id;
+                END IF;
+                EXIT WHEN v_got < b.count;
+            END LOOP;
+        END;
+        $$ LANGUAGE plpgsql;""",
+    ]),
+    (11, [
+        # Замена нерабочего при получении: сколько раз ресурсы поставщика
+        # пришлось заменять — рядом с остальными оценками поставщика.
+        """ALTER TABLE supplier_scores ADD COLUMN IF NOT EXISTS replaced INT NOT NULL DEFAULT 0;""",
+        # history_rollup заново — теперь считает и замены ('replaced')
+        """CREATE OR REPLACE FUNCTION history_rollup() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO issue_rollups (type, hour, issued)
+            SELECT type, date_trunc('hour', datetime), COUNT(*)
+            FROM new_rows
+            WHERE action = 'issued' AND type IS NOT NULL
+            GROUP BY 1, 2
+            ON CONFLICT (type, hour)
+            DO UPDATE SET issued = issue_rollups.issued + EXCLUDED.issued;
+
+            INSERT INTO supplier_scores (
+                supplier_id, type, received, good, bad,
+                lifetime_count, lifetime_sum, lifetime_cost, replaced
+            )
+            SELECT
+                COALESCE(n.supplier_id, r.supplier_id, 0),
+                COALESCE(n.type, r.type),
+                COUNT(*) FILTER (WHERE n.action = 'issued'),
+                COUNT(*) FILTER (WHERE n.action = 'status_good'),
+                COUNT(*) FILTER (WHERE n.action = 'status_bad'),
+                COUNT(*) FILTER (WHERE n.action = 'lifetime_set' AND n.lifetime_minutes > 0),
+                COALESCE(SUM(n.lifetime_minutes)
+                    FILTER (WHERE n.action = 'lifetime_set' AND n.lifetime_minutes > 0), 0),
+                COALESCE(SUM(COALESCE(n.price, r.buy_price))
+                    FILTER (WHERE n.action = 'lifetime_set' AND n.lifetime_minutes > 0), 0),
+                COUNT(*) FILTER (WHERE n.action = 'replaced')
+            FROM new_rows n
+            LEFT JOIN resources r ON r.id = n.resource_id
+            WHERE n.action IN ('issued', 'status_good', 'status_bad', 'lifetime_set', 'replaced')
+              AND COALESCE(n.type, r.type) IS NOT NULL
+            GROUP BY 1, 2
+            ON CONFLICT (supplier_id, type) DO UPDATE SET
+                received = supplier_scores.received + EXCLUDED.received,
+                good = supplier_scores.good + EXCLUDED.good,
+                bad = supplier_scores.bad + EXCLUDED.bad,
+                lifetime_count = supplier_scores.lifetime_count + EXCLUDED.lifetime_count,
+                lifetime_sum = supplier_scores.lifetime_sum + EXCLUDED.lifetime_sum,
+                lifetime_cost = supplier_scores.lifetime_cost + EXCLUDED.lifetime_cost,
+                replaced = supplier_scores.replaced + EXCLUDED.replaced;
+
+            INSERT INTO supplier_lifetimes (supplier_id, type, lifetime_minutes, cnt)
+            SELECT
+                COALESCE(n.supplier_id, r.supplier_id, 0),
+                COALESCE(n.type, r.type),
+                n.lifetime_minutes,
+                COUNT(*)
+            FROM new_rows n
+            LEFT JOIN resources r ON r.id = n.resource_id
+            WHERE n.action = 'lifetime_set'
+              AND n.lifetime_minutes > 0
+              AND COALESCE(n.type, r.type) IS NOT NULL
+            GROUP BY 1, 2, 3
+            ON CONFLICT (supplier_id, type, lifetime_minutes)
+            DO UPDATE SET cnt = supplier_lifetimes.cnt + EXCLUDED.cnt;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;""",
+        # Отметить нерабочим и сразу выдать замену того же типа — в одной транзакции.
+        # История: status_bad (mark_status), issued (issue_resources) и replaced
+        # на заменённый ресурс — по нему считается supplier_scores.replaced.
+        # Не отмечено (чужой, бронь, уже bad) — пусто; отмечено — одна строка,
+        # id замены NULL, если свободных нет.
+        """CREATE OR REPLACE FUNCTION replace_bad(
+            p_id INT,
+            p_manager BIGINT,
+            p_order TEXT DEFAULT 'fifo',
+            p_suppliers INT[] DEFAULT NULL,
+            p_per_supplier INT DEFAULT NULL,
+            p_proxy_policy TEXT DEFAULT 'off'
+        ) RETURNS TABLE (
+            id INT, type TEXT, login TEXT, password TEXT, proxy TEXT, supplier_id INT
+        ) AS $$
+        #variable_conflict use_column
+        DECLARE
+            v_type TEXT;
+            v_supplier INT;
+            v_id INT;
+            v_login TEXT;
+            v_password TEXT;
+            v_proxy TEXT;
+            v_new_supplier INT;
+        BEGIN
+            IF NOT EXISTS (SELECT 1 FROM mark_status(ARRAY[p_id], p_manager, 'bad')) THEN
+                RETURN;
+            END IF;
+
+            SELECT r.type, r.supplier_id INTO v_type, v_supplier
+            FROM resources r
+            WHERE r.id = p_id;
+
+            SELECT i.id, i.login, i.password, i.proxy, i.supplier_id
+            INTO v_id, v_login, v_password, v_proxy, v_new_supplier
+            FROM issue_resources(
+                p_manager, v_type, 1, p_order, p_suppliers, p_per_supplier, p_proxy_policy
+            ) AS i;
+
+            IF v_id IS NOT NULL THEN
+                INSERT INTO history (
+                    datetime, resource_id, manager_tg_id, type, supplier_id, action
+                )
+                VALUES (NOW(), p_id, p_manager, v_type, v_supplier, 'replaced');
+            END IF;
+
+            RETURN QUERY SELECT v_id, v_type, v_login, v_password, v_proxy, v_new_supplier;
+        END;
+        $$ LANGUAGE plpgsql;""",
+    ]),
 ]
 
-async def ensure_schema(conn):
-    for ddl in DDL_STATEMENTS:
-        await conn.execute(ddl)
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+# Ключ advisory-блокировки, чтобы две реплики не мигрировали одновременно
+_MIGRATION_LOCK_KEY = 7_305_001
+
+
+async def _current_version(conn) -> int:
+    try:
+        return await conn.fetchval("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+    except asyncpg.UndefinedTableError:
+        return 0
+
+
+async def ensure_schema(conn) -> bool:
+    """
+    Применяет недостающие миграции. Если схема уже актуальна —
+    это один короткий запрос. Возвращает True, если что-то применялось.
+    """
+    if await _current_version(conn) >= SCHEMA_VERSION:
+        return False
+
+    async with conn.transaction():
+        await conn.execute("SELECT pg_advisory_xact_lock($1)", _MIGRATION_LOCK_KEY)
+        await conn.execute("CREATE TABLE IF NOT EXISTS schema_version (version INT PRIMARY KEY)")
+        current = await _current_version(conn)
+
+        for version, statements in MIGRATIONS:
+            if version <= current:
+                continue
+            for ddl in statements:
+                await conn.execute(ddl)
+            await conn.execute("INSERT INTO schema_version (version) VALUES ($1)", version)
+
+    return True
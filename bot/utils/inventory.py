@@ -0,0 +1,37 @@
+# bot/utils/inventory.py
+# Свободный остаток по типам для сетки выдачи. Сами числа ведут триггеры
+# в inventory_counts, здесь — копия в памяти: читается не чаще раза в
+# INVENTORY_CACHE_TTL секунд, а свои выдачи вычитаются сразу, без похода в БД.
+import time
+
+from bot.utils.queries import DBQueries
+from db.database import pool_for
+
+INVENTORY_CACHE_TTL = 10
+
+_cache: dict = {"at": 0.0, "free": {}}
+
+
+async def free_by_type() -> dict[str, int]:
+    """
+    type -> сколько свободных (типов без свободных в словаре нет).
+    """
+    now = time.monotonic()
+    if now - _cache["at"] < INVENTORY_CACHE_TTL:
+        return _cache["free"]
+
+    pool = await pool_for(DBQueries.STOCK_FREE_BY_TYPE)
+    async with pool.acquire() as conn:
+        rows = await conn.fetch(DBQueries.STOCK_FREE_BY_TYPE)
+    _cache["free"] = {r["type"]: r["free"] for r in rows}
+    _cache["at"] = now
+    return _cache["free"]
+
+
+def taken(r_type: str, count: int) -> None:
+    """
+    Вычесть из копии то, что только что выдали.
+    """
+    free = _cache["free"]
+    if r_type in free:
+        free[r_type] = max(0, free[r_type] - count)
@@ -0,0 +1,112 @@
+# bot/utils/leaderboard.py
+# Рейтинг менеджеров за любой период по дневным агрегатам manager_daily
+# (их ведёт триггер на history) — без прохода по всей истории.
+import html
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+from bot.utils.queries import DBQueries
+
+PAGE_SIZE = 10
+DEFAULT_DAYS = 7
+
+# ключ сортировки -> (колонка в LEADERBOARD, подпись)
+SORTS = {
+    "issued": ("SUM(d.issued)", "выдано"),
+    "bad": ("SUM(d.bad)", "нерабочих"),
+    "life": ("SUM(d.lifetime_sum)::float / NULLIF(SUM(d.lifetime_count), 0)", "средний срок жизни"),
+}
+
+
+@dataclass
+class Window:
+    sort: str = "issued"
+    date_to: date = field(default_factory=date.today)
+    date_from: date | None = None
+
+    def __post_init__(self):
+        if self.date_from is None:
+            self.date_from = self.date_to - timedelta(days=DEFAULT_DAYS - 1)
+
+    def pack(self, page: int) -> str:
+        """
+        callback_data для кнопок страниц: top:<sort>:<from>:<to>:<page>.
+        """
+        return f"top:{self.sort}:{self.date_from.toordinal()}:{self.date_to.toordinal()}:{page}"
+
+    @classmethod
+    def unpack(cls, data: str) -> tuple["Window", int]:
+        _, sort, date_from, date_to, page = data.split(":")
+        if sort not in SORTS:
+            raise ValueError(sort)
+        window = cls(sort, date.fromordinal(int(date_to)), date.fromordinal(int(date_from)))
+        return window, int(page)
+
+
+def parse_top_args(args: str) -> Window:
+    """
+    /top [дней] [issued|bad|life] [from:2024-01-01] [to:2024-01-31]
+    """
+    window = Window()
+    days = None
+    date_from = None
+    for token in args.split():
+        key, sep, value = token.partition(":")
+        key = key.lower()
+        if not sep:
+            if key.isdigit() and int(key) > 0:
+                days = int(key)
+            elif key in SORTS:
+                window.sort = key
+            else:
+                raise ValueError(f"Непонятный аргумент: {token}")
+            continue
+
+        if key not in ("from", "to"):
+            raise ValueError(f"Непонятный фильтр: {token}")
+        try:
+            day = date.fromisoformat(value)
+        except ValueError:
+            raise ValueError(f"Дата в формате ГГГГ-ММ-ДД: {token}")
+        if key == "from":
+            date_from = day
+        else:
+            window.date_to = day
+
+    if date_from is not None:
+        window.date_from = date_from
+    else:
+        window.date_from = window.date_to - timedelta(days=(days or DEFAULT_DAYS) - 1)
+
+    if window.date_from > window.date_to:
+        raise ValueError("Начало периода позже конца")
+    return window
+
+
+def _fmt_avg(minutes: float | None) -> str:
+    if minutes is None:
+        return "—"
+    if minutes < 60:
+        return f"{minutes:.0f} мин"
+    return f"{minutes / 60:.1f} ч"
+
+
+async def leaderboard_page(conn, window: Window, page: int) -> tuple[list[str], int]:
+    """
+    Строки одной страницы рейтинга и общее число менеджеров.
+    """
+    query = DBQueries.LEADERBOARD.format(order=SORTS[window.sort][0])
+    rows = await conn.fetch(query, window.date_from, window.date_to, PAGE_SIZE, page * PAGE_SIZE)
+    total = rows[0]["managers"] if rows else 0
+
+    lines = []
+    for place, r in enumerate(rows, start=page * PAGE_SIZE + 1):
+        name = html.escape(r["name"] or str(r["manager_tg_id"]))
+        marked = r["good"] + r["bad"]
+        bad_pct = f"{r['bad'] * 100 / marked:.0f}%" if marked else "—"
+        lines.append(
+            f"{place}. <b>{name}</b> — выдано {r['issued']}, "
+            f"рабочих {r['good']}, нерабочих {r['bad']} ({bad_pct}), "
+            f"срок жизни ~{_fmt_avg(r['avg_lifetime'])} (отмечено {r['lifetime_count']})"
+        )
+    return lines, total
@@ -0,0 +1,259 @@
+# bot/utils/profiling.py
+# Профилирование живого бота по команде из чата.
+#
+# profile(seconds) — сэмплирующий профилировщик: отдельный поток раз в
+# SAMPLE_INTERVAL_SEC снимает стек потока с event loop (sys._current_frames),
+# сам loop при этом ничего не делает. Параллельно на время окна каждый шаг
+# loop (Handle._run — шаг задачи или колбэк) засекается, и шаги дольше
+# SLOW_STEP_SEC записываются: это обработчики, которые блокируют loop.
+# После окна всё снимается, оверхед вне окна — ноль.
+#
+# Снимки памяти — tracemalloc: start -> снимок-база, каждый следующий снимок
+# сравнивается с предыдущим. tracemalloc сам по себе замедляет аллокации,
+# поэтому включается только по команде и выключается через MEMSNAP_MAX_MINUTES.
+import asyncio
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from dataclasses import dataclass, field
+
+# Жёсткие пределы профилирования
+MAX_PROFILE_SEC = 60
+SAMPLE_INTERVAL_SEC = 0.01
+MAX_STACK_DEPTH = 40
+SLOW_STEP_SEC = 0.1
+MAX_SLOW_STEPS = 200
+
+# Снимки памяти
+MEMSNAP_FRAMES = 5
+MEMSNAP_MAX_MINUTES = 30
+MEMSNAP_TOP = 15
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_state: dict = {"profiling": False, "mem_base": None, "mem_stop": None}
+
+
+@dataclass
+class Profile:
+    seconds: float
+    samples: int = 0
+    idle: int = 0
+    # свёрнутый стек "a;b;c" -> сколько раз встретился
+    stacks: Counter = field(default_factory=Counter)
+    # (длительность, что выполнялось)
+    slow_steps: list[tuple[float, str]] = field(default_factory=list)
+    steps: int = 0
+
+
+def _short(filename: str) -> str:
+    if filename.startswith(_ROOT):
+        return os.path.relpath(filename, _ROOT)
+    if "site-packages/" in filename:
+        return filename.rsplit("site-packages/", 1)[1]
+    return os.path.basename(filename)
+
+
+def _where(code, lineno: int) -> str:
+    return f"{code.co_name} ({_short(code.co_filename)}:{lineno})"
+
+
+def _is_idle(frame) -> bool:
+    # loop ждёт событий в селекторе — это не работа
+    code = frame.f_code
+    return code.co_name in ("select", "poll", "_poll") and "selectors" in code.co_filename
+
+
+def _sample(prof: Profile, thread_id: int, stop: threading.Event) -> None:
+    while not stop.wait(SAMPLE_INTERVAL_SEC):
+        frame = sys._current_frames().get(thread_id)
+        if frame is None:
+            continue
+        prof.samples += 1
+        if _is_idle(frame):
+            prof.idle += 1
+            continue
+        stack = []
+        while frame is not None and len(stack) < MAX_STACK_DEPTH:
+            stack.append(_where(frame.f_code, frame.f_lineno))
+            frame = frame.f_back
+        prof.stacks[";".join(reversed(stack))] += 1
+
+
+def _describe(handle) -> str:
+    callback = handle._callback
+    owner = getattr(callback, "__self__", None)
+    if isinstance(owner, asyncio.Task):
+        coro = owner.get_coro()
+        return f"задача {owner.get_name()}: {getattr(coro, '__qualname__', coro)}"
+    return getattr(callback, "__qualname__", None) or repr(callback)
+
+
+def _patch_steps(prof: Profile):
+    """
+    Засекает каждый шаг loop. Возвращает функцию, снимающую патч.
+    """
+    original = asyncio.Handle._run
+
+    def _run(handle):
+        started = time.perf_counter()
+        try:
+            return original(handle)
+        finally:
+            elapsed = time.perf_counter() - started
+            prof.steps += 1
+            if elapsed >= SLOW_STEP_SEC and len(prof.slow_steps) < MAX_SLOW_STEPS:
+                prof.slow_steps.append((elapsed, _describe(handle)))
+
+    asyncio.Handle._run = _run
+
+    def restore() -> None:
+        asyncio.Handle._run = original
+
+    return restore
+
+
+def is_profiling() -> bool:
+    return _state["profiling"]
+
+
+async def profile(seconds: float) -> Profile:
+    """
+    Профилирует loop seconds секунд (не больше MAX_PROFILE_SEC).
+    Вызывать из самого loop; одновременно — только один профиль.
+    """
+    if _state["profiling"]:
+        raise RuntimeError("профиль уже снимается")
+    seconds = min(max(seconds, 1), MAX_PROFILE_SEC)
+    prof = Profile(seconds=seconds)
+
+    stop = threading.Event()
+    sampler = threading.Thread(
+        target=_sample, args=(prof, threading.get_ident(), stop), name="profiler", daemon=True
+    )
+    _state["profiling"] = True
+    restore = _patch_steps(prof)
+    try:
+        sampler.start()
+        await asyncio.sleep(seconds)
+    finally:
+        restore()
+        stop.set()
+        sampler.join(1)
+        _state["profiling"] = False
+    return prof
+
+
+def profile_report(prof: Profile, top: int = 15) -> list[str]:
+    """
+    Короткий текстовый отчёт: загрузка loop, самые частые функции
+    (на вершине стека и в стеке вообще) и медленные шаги.
+    """
+    busy = prof.samples - prof.idle
+    lines = [
+        f"⏱ Профиль за {prof.seconds:.0f} с: {prof.samples} сэмплов, "
+        f"loop занят {busy * 100 / max(prof.samples, 1):.0f}%, шагов loop {prof.steps}",
+    ]
+
+    own: Counter = Counter()
+    total: Counter = Counter()
+    for stack, n in prof.stacks.items():
+        frames = stack.split(";")
+        own[frames[-1]] += n
+        for frame in set(frames):
+            total[frame] += n
+
+    if busy:
+        lines.extend(["", "Сама функция (на вершине стека):"])
+        lines.extend(f"{n * 100 / busy:5.1f}%  {frame}" for frame, n in own.most_common(top))
+        lines.extend(["", "С вызываемыми (где-то в стеке):"])
+        lines.extend(f"{n * 100 / busy:5.1f}%  {frame}" for frame, n in total.most_common(top))
+
+    if prof.slow_steps:
+        lines.extend(["", f"Шаги loop дольше {SLOW_STEP_SEC * 1000:.0f} мс:"])
+        for elapsed, what in sorted(prof.slow_steps, reverse=True)[:top]:
+            lines.append(f"{elapsed * 1000:6.0f} мс  {what}")
+    else:
+        lines.extend(["", f"Шагов loop дольше {SLOW_STEP_SEC * 1000:.0f} мс не было."])
+
+    return lines
+
+
+def collapsed_stacks(prof: Profile) -> str:
+    """
+    Стеки в формате flamegraph.pl / speedscope: "a;b;c N" по строке.
+    """
+    return "".join(f"{stack} {n}\n" for stack, n in prof.stacks.most_common())
+
+
+def memsnap_start() -> bool:
+    """
+    Включает tracemalloc и снимает базу. False — уже включён.
+    Сам выключится через MEMSNAP_MAX_MINUTES.
+    """
+    if tracemalloc.is_tracing():
+        return False
+    tracemalloc.start(MEMSNAP_FRAMES)
+    _state["mem_base"] = tracemalloc.take_snapshot()
+    _state["mem_stop"] = asyncio.get_running_loop().call_later(
+        MEMSNAP_MAX_MINUTES * 60, memsnap_stop
+    )
+    return True
+
+
+def memsnap_stop() -> bool:
+    """
+    Выключает tracemalloc. False — и так не был включён.
+    """
+    if _state["mem_stop"] is not None:
+        _state["mem_stop"].cancel()
+        _state["mem_stop"] = None
+    _state["mem_base"] = None
+    if not tracemalloc.is_tracing():
+        return False
+    tracemalloc.stop()
+    return True
+
+
+def _filtered(snapshot: tracemalloc.Snapshot) -> tracemalloc.Snapshot:
+    return snapshot.filter_traces(
+        (
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        )
+    )
+
+
+def memsnap_diff() -> list[str] | None:
+    """
+    Снимок и разница с предыдущим: где память выросла сильнее всего.
+    Новый снимок становится базой для следующего. None — tracemalloc не включён.
+    """
+    if not tracemalloc.is_tracing() or _state["mem_base"] is None:
+        return None
+
+    current = _filtered(tracemalloc.take_snapshot())
+    stats = current.compare_to(_filtered(_state["mem_base"]), "traceback")
+    _state["mem_base"] = current
+
+    traced, peak = tracemalloc.get_traced_memory()
+    grown = sum(s.size_diff for s in stats)
+    lines = [
+        f"🧠 Память под наблюдением: {traced / 2**20:.1f} МБ (пик {peak / 2**20:.1f} МБ), "
+        f"с прошлого снимка {grown / 2**10:+.0f} КБ",
+    ]
+    for stat in stats[:MEMSNAP_TOP]:
+        if stat.size_diff <= 0:
+            break
+        lines.append("")
+        lines.append(
+            f"{stat.size_diff / 2**10:+.0f} КБ ({stat.count_diff:+d} объектов), "
+            f"всего {stat.size / 2**10:.0f} КБ"
+        )
+        # кадры идут от старого к свежему — место аллокации показываем первым
+        lines.extend(f"  {_short(f.filename)}:{f.lineno}" for f in reversed(stat.traceback))
+    return lines
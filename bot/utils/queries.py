@@ -1,3 +1,19 @@
+# Запросы только на чтение, которые можно выполнять на реплике
+# (см. db.database.pool_for). Без пометки запрос идёт на основную БД.
+# Пометка хранится отдельно, а не в подклассе str: asyncpg принимает
+# текст запроса только точным str.
+_replica_queries: set[str] = set()
+
+
+def replica(sql: str) -> str:
+    _replica_queries.add(sql)
+    return sql
+
+
+def is_replica(sql: str) -> bool:
+    return sql in _replica_queries
+
+
 class DBQueries:
 
     # ===========================
@@ -12,6 +28,10 @@ class DBQueries:
     SELECT * FROM managers WHERE tg_id = $1;
     """
 
+    GET_ADMIN_IDS = """
+    SELECT tg_id FROM managers WHERE role IN ('admin', 'owner');
+    """
+
     # ===========================
     #        РЕСУРСЫ
     # ===========================
@@ -42,7 +62,7 @@ class DBQueries:
     SELECT *
     FROM resources
     WHERE manager_tg_id = $1
-      AND (receipt_state IS NULL OR receipt_state != 'bad');
+      AND (receipt_state IS NULL OR receipt_state NOT IN ('bad', 'reserved'));
     """
 
     GET_RESOURCE_BY_ID = """
@@ -52,57 +72,332 @@ class DBQueries:
     """
 
     # ===========================
-    #   ОТМЕТКА СТАТУСА РЕСУРСА
+    #            ВЫДАЧА
     # ===========================
 
-    MARK_RESOURCE_GOOD = """
-    UPDATE resources
-    SET receipt_state = 'good'
-    WHERE id = $1 AND manager_tg_id = $2;
+    # Выдача целиком — один вызов функции issue_resources (см. миграцию 9):
+    # $1 менеджер, $2 тип, $3 сколько, $4 порядок ('fifo' / 'freshest'),
+    # $5 порядок поставщиков (NULL — без разбивки по поставщикам),
+    # $6 сколько брать с поставщика на первом проходе, $7 политика прокси,
+    # $8 минуты брони, $9 / $10 — chat_id и ключ запроса для идемпотентности.
+    # replayed = TRUE — повтор уже выполненного запроса.
+    ISSUE_RESOURCES = """
+    SELECT id, login, password, proxy, supplier_id, replayed
+    FROM issue_resources($1, $2, $3, $4, $5::int[], $6::int, $7, $8, $9::bigint, $10::text);
     """
 
-    MARK_RESOURCE_BAD = """
-    UPDATE resources
-    SET receipt_state = 'bad'
-    WHERE id = $1 AND manager_tg_id = $2;
+    # Данные для ранжирования поставщиков при выдаче
+    ALLOC_SUPPLIERS = """
+    SELECT s.id AS supplier_id, COALESCE(sc.good, 0) AS good, COALESCE(sc.bad, 0) AS bad
+    FROM (SELECT id FROM suppliers UNION ALL SELECT 0) s
+    LEFT JOIN supplier_scores sc ON sc.supplier_id = s.id AND sc.type = $1;
+    """
+
+    # Поиск для /find: условия подставляются только для заданных фильтров
+    # (все значения — через параметры), постранично по id.
+    FIND_RESOURCES = """
+    SELECT id, type, login, manager_tg_id, status, receipt_state
+    FROM resources
+    WHERE {where}
+    ORDER BY id
+    LIMIT {limit};
     """
 
     # ===========================
-    #          LIFETIME
-    # (в БД оставляем, в боте не используем)
+    #   ИДЕМПОТЕНТНОСТЬ ВЫДАЧИ
     # ===========================
 
-    SET_LIFETIME = """
-    UPDATE resources
-    SET lifetime_minutes = $1,
-        receipt_state = 'used',
-        end_datetime = NOW()
-    WHERE id = $2 AND manager_tg_id = $3;
+    ISSUE_REQUESTS_PURGE = """
+    DELETE FROM issue_requests
+    WHERE created_at < NOW() - make_interval(mins => $1);
     """
 
-    HISTORY_LIFETIME = """
-    INSERT INTO history (
-        datetime, resource_id, manager_tg_id, type, action, lifetime_minutes
+    # ===========================
+    #   КВОТЫ ВЫДАЧИ
+    # ===========================
+
+    QUOTAS_LIST = """
+    SELECT manager_tg_id, type, per_hour, per_day, burst
+    FROM manager_quotas
+    ORDER BY manager_tg_id, type;
+    """
+
+    QUOTA_SET = """
+    INSERT INTO manager_quotas (manager_tg_id, type, per_hour, per_day, burst)
+    VALUES ($1, $2, $3, $4, $5)
+    ON CONFLICT (manager_tg_id, type) DO UPDATE SET
+        per_hour = EXCLUDED.per_hour,
+        per_day = EXCLUDED.per_day,
+        burst = EXCLUDED.burst;
+    """
+
+    QUOTA_DELETE = """
+    DELETE FROM manager_quotas
+    WHERE manager_tg_id = $1 AND type = $2;
+    """
+
+    # Выдано менеджеру по типу: за текущий и прошлый час (с запасом)
+    # и за последние 24 часовых корзины
+    # Бронь и заявка в очереди ожидания списывают квоту сразу, поэтому
+    # считаются вместе с выданным: при подтверждении брони или раздаче из
+    # очереди они уходят отсюда ровно тогда, когда растёт issued, а снятые
+    # по сроку просто перестают считаться.
+    QUOTA_USAGE = """
+    WITH pending AS (
+        SELECT (
+            SELECT COUNT(*)
+            FROM resources
+            WHERE manager_tg_id = $1 AND type = $2 AND receipt_state = 'reserved'
+        ) + (
+            SELECT COALESCE(SUM(count), 0)
+            FROM backorders
+            WHERE manager_tg_id = $1 AND type = $2
+        ) AS n
     )
-    VALUES (NOW(), $1, $2, $3, 'lifetime_set', $4);
+    SELECT
+        COALESCE(SUM(h.issued) FILTER (
+            WHERE h.hour >= date_trunc('hour', NOW() - INTERVAL '1 hour')
+        ), 0) + (SELECT n FROM pending) AS hour_used,
+        COALESCE(SUM(h.issued), 0) + (SELECT n FROM pending) AS day_used
+    FROM manager_issue_hourly h
+    WHERE h.manager_tg_id = $1
+      AND h.type = $2
+      AND h.hour >= date_trunc('hour', NOW()) - INTERVAL '23 hours';
+    """
+
+    MANAGER_HOURLY_PURGE = """
+    DELETE FROM manager_issue_hourly
+    WHERE hour < NOW() - make_interval(days => $1);
     """
 
     # ===========================
-    #           ИСТОРИЯ
+    #       ПРОВЕРКА ПРОКСИ
     # ===========================
 
-    HISTORY_LOG = """
-    INSERT INTO history (
-        datetime, resource_id, manager_tg_id, type, action, price
+    # Разные прокси свободных ресурсов, давно не проверявшиеся — сначала никогда
+    PROXIES_TO_CHECK = """
+    SELECT p.proxy
+    FROM (
+        SELECT DISTINCT proxy
+        FROM resources
+        WHERE status = 'free'
+          AND manager_tg_id IS NULL
+          AND proxy IS NOT NULL
+    ) p
+    LEFT JOIN proxy_health ph ON ph.proxy = p.proxy
+    WHERE ph.checked_at IS NULL
+       OR ph.checked_at < NOW() - make_interval(mins => $1)
+    ORDER BY ph.checked_at NULLS FIRST
+    LIMIT $2;
+    """
+
+    PROXY_HEALTH_SAVE = """
+    INSERT INTO proxy_health (proxy, ok, latency_ms, error, checked_at, fail_streak)
+    SELECT t.proxy, t.ok, t.latency_ms, t.error, NOW(), CASE WHEN t.ok THEN 0 ELSE 1 END
+    FROM unnest($1::text[], $2::bool[], $3::int[], $4::text[]) AS t(proxy, ok, latency_ms, error)
+    ON CONFLICT (proxy) DO UPDATE SET
+        ok = EXCLUDED.ok,
+        latency_ms = EXCLUDED.latency_ms,
+        error = EXCLUDED.error,
+        checked_at = EXCLUDED.checked_at,
+        fail_streak = CASE WHEN EXCLUDED.ok THEN 0 ELSE proxy_health.fail_streak + 1 END;
+    """
+
+    # Прокси, которые давно никто не перепроверял, — их ресурсов уже нет среди свободных
+    PROXY_HEALTH_PURGE = """
+    DELETE FROM proxy_health
+    WHERE checked_at < NOW() - make_interval(days => $1);
+    """
+
+    # ===========================
+    #           БРОНИ
+    # ===========================
+
+    # Подтверждение всех живых броней менеджера $1 одним нажатием.
+    # Часы выдачи запускаются заново — с момента подтверждения.
+    # Возвращает подтверждённые ресурсы (теперь им можно показать пароли).
+    CONFIRM_RESERVATIONS = """
+    WITH confirmed AS (
+        UPDATE resources
+        SET receipt_state = 'new',
+            reserved_until = NULL,
+            issue_datetime = NOW()
+        WHERE manager_tg_id = $1
+          AND receipt_state = 'reserved'
+          AND reserved_until > NOW()
+        RETURNING id, type, login, password, proxy, supplier_id, buy_price
+    ),
+    logged AS (
+        INSERT INTO history (
+            datetime, resource_id, manager_tg_id, type, supplier_id, action, price
+        )
+        SELECT NOW(), id, $1, type, supplier_id, 'issued', buy_price
+        FROM confirmed
     )
-    VALUES (NOW(), $1, $2, $3, 'issued', NULL);
+    SELECT id, type, login, password, proxy
+    FROM confirmed
+    ORDER BY type, id;
+    """
+
+    # Истёкшие брони — обратно в свободные пачкой до $1 штук
+    # по частичному индексу на reserved_until. Возвращает сводку по менеджерам.
+    RELEASE_EXPIRED_RESERVATIONS = """
+    WITH expired AS (
+        SELECT id, manager_tg_id
+        FROM resources
+        WHERE reserved_until < NOW()
+        ORDER BY reserved_until
+        LIMIT $1
+        FOR UPDATE SKIP LOCKED
+    ),
+    released AS (
+        UPDATE resources r
+        SET manager_tg_id = NULL,
+            issue_datetime = NULL,
+            receipt_state = NULL,
+            reserved_until = NULL
+        FROM expired
+        WHERE r.id = expired.id
+        RETURNING r.id, r.type, r.supplier_id, expired.manager_tg_id
+    ),
+    logged AS (
+        INSERT INTO history (
+            datetime, resource_id, manager_tg_id, type, supplier_id, action
+        )
+        SELECT NOW(), id, manager_tg_id, type, supplier_id, 'reservation_expired'
+        FROM released
+    )
+    SELECT manager_tg_id, type, COUNT(*) AS cnt
+    FROM released
+    GROUP BY manager_tg_id, type;
+    """
+
+    # ===========================
+    #   ВОЗВРАТ ЗАВИСШИХ РЕСУРСОВ
+    # ===========================
+
+    # Выданные дольше заданного возраста ($1/$2 — переопределения по типам,
+    # $3 — возраст по умолчанию, $4 — минимальный из всех для индекса),
+    # не отмеченные и без событий после выдачи, возвращаются в свободные
+    # пачкой до $5 штук. Возвращает сводку по менеджерам и типам.
+    RECLAIM_STALE = """
+    WITH ages AS (
+        SELECT * FROM unnest($1::text[], $2::int[]) AS a(type, minutes)
+    ),
+    stale AS (
+        SELECT r.id, r.manager_tg_id
+        FROM resources r
+        LEFT JOIN ages a ON a.type = r.type
+        WHERE r.manager_tg_id IS NOT NULL
+          AND (r.receipt_state IS NULL OR r.receipt_state = 'new')
+          AND r.issue_datetime < NOW() - make_interval(mins => $4)
+          AND COALESCE(a.minutes, $3) > 0
+          AND r.issue_datetime < NOW() - make_interval(mins => COALESCE(a.minutes, $3))
+          AND NOT EXISTS (
+              SELECT 1
+              FROM history h
+              WHERE h.resource_id = r.id
+                AND h.action <> 'issued'
+                AND h.datetime >= r.issue_datetime
+          )
+        ORDER BY r.issue_datetime
+        LIMIT $5
+        FOR UPDATE OF r SKIP LOCKED
+    ),
+    released AS (
+        UPDATE resources r
+        SET manager_tg_id = NULL,
+            issue_datetime = NULL,
+            receipt_state = NULL
+        FROM stale
+        WHERE r.id = stale.id
+        RETURNING r.id, r.type, r.supplier_id, stale.manager_tg_id
+    ),
+    logged AS (
+        INSERT INTO history (
+            datetime, resource_id, manager_tg_id, type, supplier_id, action
+        )
+        SELECT NOW(), id, manager_tg_id, type, supplier_id, 'reclaimed'
+        FROM released
+    )
+    SELECT manager_tg_id, type, COUNT(*) AS cnt
+    FROM released
+    GROUP BY manager_tg_id, type;
+    """
+
+    # ===========================
+    #   ОТМЕТКА СТАТУСА РЕСУРСА
+    # ===========================
+
+    # Ресурсы менеджера, которые ещё не отмечены при получении
+    GET_RESOURCES_FOR_STATUS = """
+    SELECT id, type, login, password
+    FROM resources
+    WHERE manager_tg_id = $1
+      AND (receipt_state IS NULL OR receipt_state = 'new')
+    ORDER BY id;
+    """
+
+    # Отметка + событие в историю одним вызовом функции mark_status:
+    # $1 id ресурсов, $2 менеджер, $3 'good' / 'bad'. Возвращает отмеченные id.
+    MARK_STATUS = """
+    SELECT m.id FROM mark_status($1::int[], $2, $3) AS m(id);
+    """
+
+    # «🔴 Нерабочий» с заменой: отметка, выдача другого ресурса того же типа
+    # и история — одним вызовом replace_bad. $1 id, $2 менеджер, дальше —
+    # стратегия как у ISSUE_RESOURCES. Пусто — не отмечено; id NULL — замены нет.
+    REPLACE_BAD = """
+    SELECT id, type, login, password, proxy, supplier_id
+    FROM replace_bad($1, $2, $3, $4::int[], $5::int, $6);
+    """
+
+    # ===========================
+    #          LIFETIME
+    # ===========================
+
+    # Срок жизни + событие в историю одним вызовом функции set_lifetime
+    # (инлайн-кнопки lifetime_kb): $1 id ресурса, $2 менеджер, $3 минуты.
+    # $3 < 0 — «до блокировки»: считаем, сколько прошло с момента выдачи.
+    # Уже отмеченный ресурс повторно не трогаем (marked_id NULL).
+    # В той же строке — следующая неотмеченная карточка после $1 (по кругу),
+    # её номер и сколько всего осталось; id NULL — отмечать больше нечего.
+    # Отметку из set_lifetime соседние CTE не видят (тот же снимок),
+    # поэтому сам $1 из оставшихся исключён явно.
+    MARK_LIFETIME = """
+    WITH marked AS (
+        SELECT s.id, s.lifetime_minutes, r.login
+        FROM set_lifetime($1, $2, $3) s
+        JOIN resources r ON r.id = s.id
+    ),
+    active AS (
+        SELECT id, type, login, password, proxy,
+               ROW_NUMBER() OVER (ORDER BY id) AS pos,
+               COUNT(*) OVER () AS total
+        FROM resources
+        WHERE manager_tg_id = $2
+          AND id <> $1
+          AND (receipt_state IS NULL OR receipt_state NOT IN ('bad', 'reserved', 'used'))
+    ),
+    nxt AS (
+        SELECT * FROM active ORDER BY (id < $1), id LIMIT 1
+    )
+    SELECT m.id AS marked_id, m.login AS marked_login, m.lifetime_minutes,
+           n.id, n.type, n.login, n.password, n.proxy, n.pos, n.total
+    FROM (SELECT 1) one
+    LEFT JOIN marked m ON TRUE
+    LEFT JOIN nxt n ON TRUE;
     """
 
-    HISTORY_STATUS_CHANGE = """
+    # ===========================
+    #           ИСТОРИЯ
+    # ===========================
+
+    HISTORY_LOG = """
     INSERT INTO history (
         datetime, resource_id, manager_tg_id, type, action, price
     )
-    VALUES (NOW(), $1, $2, $3, $4, NULL);
+    VALUES (NOW(), $1, $2, $3, 'issued', NULL);
     """
 
     INSERT_PURCHASE_LOG = """
@@ -115,8 +410,10 @@ class DBQueries:
     # ===========================
     #            ОТЧЁТЫ
     # ===========================
+    # Отчёты, прогноз, оценки поставщиков и выгрузки помечены replica():
+    # при настроенной реплике они не нагружают основную БД.
 
-    REPORT_RESOURCES = """
+    REPORT_RESOURCES = replica("""
     SELECT
         (SELECT COUNT(*) FROM resources) AS total,
         (SELECT COUNT(*) FROM resources WHERE manager_tg_id IS NULL) AS free,
@@ -131,16 +428,189 @@ class DBQueries:
             WHERE action = 'issued'
               AND datetime::date = NOW()::date
         ) AS issued_today;
-    """
+    """)
 
-    REPORT_FINANCE = """
+    # Итоги за 7 дней по истории
+    REPORT_WEEK = replica("""
+    SELECT
+        COALESCE(SUM(CASE WHEN action = 'purchase' THEN price ELSE 0 END), 0) AS purchases_sum,
+        COALESCE(COUNT(*) FILTER (WHERE action = 'purchase'), 0) AS purchases_count,
+        COALESCE(COUNT(*) FILTER (WHERE action = 'issued'), 0) AS issued_count,
+        COALESCE(COUNT(*) FILTER (WHERE action = 'status_good'), 0) AS good_count,
+        COALESCE(COUNT(*) FILTER (WHERE action = 'status_bad'), 0) AS bad_count
+    FROM history
+    WHERE datetime >= NOW() - INTERVAL '7 days';
+    """)
+
+    REPORT_FINANCE = replica("""
     SELECT
         COALESCE(SUM(price), 0) AS total_purchase_cost
     FROM history
     WHERE action = 'purchase'
       AND datetime::date = NOW()::date;
+    """)
+
+    # Рейтинг менеджеров за период [$1, $2] по дневным агрегатам manager_daily.
+    # {order} — колонка сортировки из белого списка (bot/utils/leaderboard.py).
+    # managers — сколько всего менеджеров в рейтинге (для страниц).
+    LEADERBOARD = replica("""
+    SELECT
+        d.manager_tg_id,
+        m.name,
+        SUM(d.issued) AS issued,
+        SUM(d.good) AS good,
+        SUM(d.bad) AS bad,
+        SUM(d.lifetime_count) AS lifetime_count,
+        SUM(d.lifetime_sum)::float / NULLIF(SUM(d.lifetime_count), 0) AS avg_lifetime,
+        COUNT(*) OVER () AS managers
+    FROM manager_daily d
+    LEFT JOIN managers m ON m.tg_id = d.manager_tg_id
+    WHERE d.day BETWEEN $1 AND $2
+    GROUP BY d.manager_tg_id, m.name
+    ORDER BY {order} DESC NULLS LAST, d.manager_tg_id
+    LIMIT $3 OFFSET $4;
+    """)
+
+    # ===========================
+    #       ПРОГНОЗ ОСТАТКА
+    # ===========================
+
+    # Выдачи по часам за окно; age = сколько часов назад (0 — текущий час)
+    STOCK_ISSUE_ROLLUPS = replica("""
+    SELECT
+        type,
+        (EXTRACT(EPOCH FROM date_trunc('hour', NOW()) - hour) / 3600)::int AS age,
+        issued
+    FROM issue_rollups
+    WHERE hour >= date_trunc('hour', NOW()) - make_interval(hours => $1);
+    """)
+
+    # Счётчики ведут триггеры на resources (inventory_counts_sync), по 16 строк на тип
+    STOCK_FREE_BY_TYPE = replica("""
+    SELECT type, SUM(free)::int AS free
+    FROM inventory_counts
+    GROUP BY type
+    HAVING SUM(free) > 0;
+    """)
+
+    # Какая доля текущего часа уже прошла
+    STOCK_HOUR_FRACTION = replica("""
+    SELECT EXTRACT(EPOCH FROM NOW() - date_trunc('hour', NOW())) / 3600 AS fraction;
+    """)
+
+    # ===========================
+    #          ПОСТАВЩИКИ
+    # ===========================
+
+    LIST_SUPPLIERS = """
+    SELECT id, name FROM suppliers ORDER BY name;
+    """
+
+    # Найти поставщика по имени или завести нового
+    GET_OR_CREATE_SUPPLIER = """
+    WITH ins AS (
+        INSERT INTO suppliers (name)
+        VALUES ($1)
+        ON CONFLICT (lower(name)) DO NOTHING
+        RETURNING id
+    )
+    SELECT id FROM ins
+    UNION ALL
+    SELECT id FROM suppliers WHERE lower(name) = lower($1)
+    LIMIT 1;
     """
 
+    # Готовые оценки поставщиков; медиана и p90 — по накопленному распределению
+    REPORT_SUPPLIERS = replica("""
+    WITH pct AS (
+        SELECT
+            supplier_id,
+            type,
+            MIN(lifetime_minutes) FILTER (WHERE cum >= 0.5 * total) AS median,
+            MIN(lifetime_minutes) FILTER (WHERE cum >= 0.9 * total) AS p90
+        FROM (
+            SELECT
+                supplier_id,
+                type,
+                lifetime_minutes,
+                SUM(cnt) OVER (PARTITION BY supplier_id, type ORDER BY lifetime_minutes) AS cum,
+                SUM(cnt) OVER (PARTITION BY supplier_id, type) AS total
+            FROM supplier_lifetimes
+            WHERE $1::text IS NULL OR type = $1
+        ) t
+        GROUP BY supplier_id, type
+    )
+    SELECT
+        s.supplier_id,
+        COALESCE(sp.name, 'без поставщика') AS name,
+        s.type,
+        s.received,
+        s.good,
+        s.bad,
+        s.lifetime_count,
+        s.lifetime_sum,
+        s.lifetime_cost,
+        s.replaced,
+        pct.median,
+        pct.p90
+    FROM supplier_scores s
+    LEFT JOIN suppliers sp ON sp.id = s.supplier_id
+    LEFT JOIN pct ON pct.supplier_id = s.supplier_id AND pct.type = s.type
+    WHERE $1::text IS NULL OR s.type = $1
+    ORDER BY s.type, s.received DESC;
+    """)
+
+    # ===========================
+    #      ВЫЖИВАЕМОСТЬ РЕСУРСОВ
+    # ===========================
+
+    # Компактная выжимка для кривых выживаемости: уже сгруппированные
+    # (тип, поставщик, неделя закупки, длительность, событие) -> количество.
+    # Отмеченный срок жизни — событие; неотмеченные — цензурированы
+    # временем с момента выдачи (округлено до $3 минут, не больше $2).
+    # Забракованные при получении не учитываем — это отдельная метрика.
+    SURVIVAL_EXTRACT = replica("""
+    SELECT
+        type,
+        COALESCE(supplier_id, 0) AS supplier_id,
+        date_trunc('week', COALESCE(created_at, issue_datetime))::date AS week,
+        CASE
+            WHEN receipt_state = 'used' AND lifetime_minutes IS NOT NULL
+                THEN lifetime_minutes
+            ELSE (LEAST(EXTRACT(EPOCH FROM NOW() - issue_datetime) / 60, $2)::int / $3) * $3
+        END AS duration,
+        (receipt_state = 'used' AND lifetime_minutes IS NOT NULL) AS event,
+        COUNT(*) AS n
+    FROM resources
+    WHERE issue_datetime >= NOW() - make_interval(days => $1)
+      AND receipt_state IS DISTINCT FROM 'bad'
+    GROUP BY 1, 2, 3, 4, 5;
+    """)
+
+    # ===========================
+    #           ВЫГРУЗКИ
+    # ===========================
+    # Условия подставляются только для заданных фильтров, значения — через параметры.
+    # Пароли в выгрузку не попадают.
+
+    EXPORT_RESOURCES = replica("""
+    SELECT
+        id, type, login, proxy, supplier_id, buy_price, status,
+        manager_tg_id, issue_datetime, receipt_state, lifetime_minutes, end_datetime
+    FROM resources
+    WHERE {where}
+    ORDER BY id
+    """)
+
+    EXPORT_HISTORY = replica("""
+    SELECT
+        id, datetime, resource_id, manager_tg_id, type, supplier_id,
+        price, action, receipt_state, lifetime_minutes
+    FROM history
+    WHERE {where}
+    ORDER BY id
+    """)
+
     # ===========================
     #      ЗАГРУЗКА РЕСУРСОВ
     # ===========================
@@ -149,3 +619,53 @@ class DBQueries:
     INSERT INTO resources (type, login, password, proxy, buy_price, status)
     VALUES ($1, $2, $3, $4, $5, 'free');
     """
+
+    # Пачка целиком за один запрос.
+    # Уже известные логины (уникальный индекс по type + lower(login))
+    # пропускаются, RETURNING отдаёт только реально добавленные.
+    INSERT_RESOURCES_DEDUP = """
+    INSERT INTO resources (type, login, password, proxy, buy_price, supplier_id, status)
+    SELECT $1, t.login, t.password, t.proxy, $5, $6, 'free'
+    FROM unnest($2::text[], $3::text[], $4::text[]) AS t(login, password, proxy)
+    ON CONFLICT (type, lower(login)) DO NOTHING
+    RETURNING id, login;
+    """
+
+    # ===========================
+    #      ОЧЕРЕДЬ ОЖИДАНИЯ
+    # ===========================
+
+    # Повторная заявка на тот же тип заменяет прежнюю: replaced — сколько
+    # ждали до неё (0, если заявки не было), чтобы вернуть это в квоту.
+    # position — какой по счёту в очереди типа.
+    BACKORDER_ADD = """
+    WITH prev AS (
+        SELECT count FROM backorders WHERE manager_tg_id = $1 AND type = $2
+    )
+    INSERT INTO backorders (manager_tg_id, type, count)
+    VALUES ($1, $2, $3)
+    ON CONFLICT (manager_tg_id, type)
+    DO UPDATE SET count = EXCLUDED.count, created_at = NOW()
+    RETURNING (
+        SELECT COUNT(*) FROM backorders b WHERE b.type = $2 AND b.id < backorders.id
+    )::int + 1 AS position,
+    COALESCE((SELECT count FROM prev), 0) AS replaced;
+    """
+
+    BACKORDER_CANCEL = """
+    DELETE FROM backorders
+    WHERE manager_tg_id = $1 AND type = $2
+    RETURNING count;
+    """
+
+    # Заявки, прождавшие дольше $1 часов: fill_backorders их уже не раздаёт
+    BACKORDERS_EXPIRE = """
+    DELETE FROM backorders
+    WHERE created_at < NOW() - make_interval(hours => $1)
+    RETURNING manager_tg_id, type, count;
+    """
+
+    FILL_BACKORDERS = """
+    SELECT manager_tg_id, id, login, password, proxy, waiting
+    FROM fill_backorders($1, $2, $3::int[], $4, $5, $6);
+    """
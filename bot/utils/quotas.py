@@ -0,0 +1,186 @@
+# bot/utils/quotas.py
+# Квоты выдачи на менеджера и тип: лимит в час, в сутки и размер «пачки» (burst).
+#
+# Проверка идёт по ведру токенов в памяти: ёмкость — burst (или лимит в час),
+# пополняется со скоростью лимита в час. Раз в SYNC_SECONDS ведро сверяется
+# со счётчиками manager_issue_hourly (их ведёт триггер на history) плюс
+# живыми бронями и заявками в очереди — всё, что уже списано из квоты, — так
+# что лимиты переживают рестарт и учитывают выдачи на других репликах.
+# В обычном случае проверка не ходит в БД.
+import math
+import time
+from dataclasses import dataclass
+
+from bot.utils.queries import DBQueries
+from bot.utils.render import esc
+from db.database import get_pool
+
+SYNC_SECONDS = 60
+QUOTAS_CACHE_TTL = 60
+# Сколько дней держим почасовые счётчики
+HOURLY_KEEP_DAYS = 7
+
+ALL = 0
+ANY_TYPE = "*"
+
+
+@dataclass
+class Quota:
+    per_hour: int | None
+    per_day: int | None
+    burst: int | None
+
+    @property
+    def capacity(self) -> int | None:
+        return self.burst or self.per_hour
+
+    @property
+    def rate_per_sec(self) -> float:
+        if self.per_hour:
+            return self.per_hour / 3600
+        if self.per_day:
+            return self.per_day / 86400
+        return (self.capacity or 0) / 3600
+
+
+@dataclass
+class _Bucket:
+    tokens: float
+    updated: float
+    day_used: int
+    synced: float
+
+
+# (manager_tg_id, type) -> Quota
+_quotas: dict = {"at": 0.0, "rows": {}}
+# (manager_tg_id, type) -> _Bucket
+_buckets: dict[tuple[int, str], _Bucket] = {}
+
+
+def invalidate() -> None:
+    """
+    Сбросить кэш квот и вёдра — после изменения квот админом.
+    """
+    _quotas["at"] = 0.0
+    _buckets.clear()
+
+
+async def _load_quotas(conn) -> dict[tuple[int, str], Quota]:
+    rows = await conn.fetch(DBQueries.QUOTAS_LIST)
+    return {
+        (r["manager_tg_id"], r["type"]): Quota(r["per_hour"], r["per_day"], r["burst"])
+        for r in rows
+    }
+
+
+async def _quota_for(manager_id: int, r_type: str) -> Quota | None:
+    if time.monotonic() - _quotas["at"] > QUOTAS_CACHE_TTL:
+        pool = await get_pool()
+        async with pool.acquire() as conn:
+            _quotas["rows"] = await _load_quotas(conn)
+        _quotas["at"] = time.monotonic()
+
+    rows = _quotas["rows"]
+    # от частного к общему
+    for key in ((manager_id, r_type), (manager_id, ANY_TYPE), (ALL, r_type), (ALL, ANY_TYPE)):
+        if key in rows:
+            return rows[key]
+    return None
+
+
+async def _usage(manager_id: int, r_type: str) -> tuple[int, int]:
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        row = await conn.fetchrow(DBQueries.QUOTA_USAGE, manager_id, r_type)
+    return row["hour_used"], row["day_used"]
+
+
+async def _bucket(manager_id: int, r_type: str, quota: Quota) -> _Bucket:
+    key = (manager_id, r_type)
+    now = time.monotonic()
+    bucket = _buckets.get(key)
+    capacity = quota.capacity or 0
+
+    if bucket is None:
+        # после рестарта: сколько уже взято за последний час — того в ведре нет
+        hour_used, day_used = await _usage(manager_id, r_type)
+        # пока ждали БД, ведро мог завести параллельный запрос
+        bucket = _buckets.setdefault(key, _Bucket(max(0, capacity - hour_used), now, day_used, now))
+    elif now - bucket.synced > SYNC_SECONDS:
+        # выданное мимо этого процесса (другая реплика) вычитаем из ведра
+        _, day_used = await _usage(manager_id, r_type)
+        bucket.tokens = max(0.0, bucket.tokens - max(0, day_used - bucket.day_used))
+        bucket.day_used = day_used
+        bucket.synced = now
+
+    bucket.tokens = min(capacity, bucket.tokens + (now - bucket.updated) * quota.rate_per_sec)
+    bucket.updated = now
+    return bucket
+
+
+async def acquire(manager_id: int, r_type: str, count: int) -> str | None:
+    """
+    Списывает count из квоты. Возвращает None, если можно выдавать,
+    иначе — текст для менеджера, сколько можно и когда.
+    """
+    quota = await _quota_for(manager_id, r_type)
+    if quota is None:
+        return None
+
+    bucket = await _bucket(manager_id, r_type, quota)
+
+    left = math.inf
+    if quota.capacity:
+        left = math.floor(bucket.tokens)
+    if quota.per_day:
+        left = min(left, quota.per_day - bucket.day_used)
+
+    if count <= left:
+        if quota.capacity:
+            bucket.tokens -= count
+        bucket.day_used += count
+        return None
+
+    left = max(0, int(left))
+    if quota.per_day and bucket.day_used >= quota.per_day:
+        return f"⛔ Лимит на сутки по типу {r_type} исчерпан ({quota.per_day} шт.)."
+    if left:
+        return f"⛔ Сейчас по типу {r_type} можно взять не больше {left} шт."
+    wait = math.ceil((1 - bucket.tokens) / quota.rate_per_sec / 60) if quota.rate_per_sec else None
+    return f"⛔ Лимит по типу {r_type} на сейчас исчерпан" + (
+        f", следующий — примерно через {wait} мин." if wait else "."
+    )
+
+
+def refund(manager_id: int, r_type: str, count: int) -> None:
+    """
+    Вернуть в квоту то, что списали, но не выдали (свободных оказалось меньше,
+    или это был повтор запроса).
+    """
+    bucket = _buckets.get((manager_id, r_type))
+    if bucket is None or count <= 0:
+        return
+    bucket.tokens += count
+    bucket.day_used = max(0, bucket.day_used - count)
+
+
+def format_quota(manager_id: int, r_type: str, quota: Quota) -> str:
+    who = "все" if manager_id == ALL else str(manager_id)
+    what = "любой тип" if r_type == ANY_TYPE else esc(r_type)
+
+    def _v(value: int | None) -> str:
+        return "—" if value is None else str(value)
+
+    return (
+        f"• <b>{who}</b> / {what}: в час {_v(quota.per_hour)}, "
+        f"в сутки {_v(quota.per_day)}, пачка {_v(quota.burst)}"
+    )
+
+
+async def purge_counters(bot) -> None:
+    """
+    Фоновая задача: удаляет старые почасовые счётчики выдачи.
+    """
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        await conn.execute(DBQueries.MANAGER_HOURLY_PURGE, HOURLY_KEEP_DAYS)
@@ -0,0 +1,61 @@
+# bot/utils/reclaim.py
+# Возврат в свободные ресурсов, которые менеджер взял и так и не отметил.
+import logging
+
+from bot.config import RECLAIM_AFTER_MINUTES, RECLAIM_AFTER_MINUTES_BY_TYPE, RECLAIM_BATCH
+from bot.utils.queries import DBQueries
+from bot.utils.render import esc
+from db.database import get_pool
+
+logger = logging.getLogger(__name__)
+
+# Больше пачек за один прогон не берём — остальное вернётся в следующий раз
+MAX_BATCHES_PER_RUN = 50
+
+
+async def reclaim_stale_resources(bot) -> None:
+    """
+    Фоновая задача: пачками возвращает зависшие выдачи в свободные,
+    пишет 'reclaimed' в историю и присылает каждому менеджеру одну сводку.
+    """
+    ages = [m for m in (RECLAIM_AFTER_MINUTES, *RECLAIM_AFTER_MINUTES_BY_TYPE.values()) if m > 0]
+    if not ages:
+        return
+
+    types = list(RECLAIM_AFTER_MINUTES_BY_TYPE)
+    minutes = [RECLAIM_AFTER_MINUTES_BY_TYPE[t] for t in types]
+
+    # manager_tg_id -> {type: сколько вернули}
+    per_manager: dict[int, dict[str, int]] = {}
+
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        for _ in range(MAX_BATCHES_PER_RUN):
+            rows = await conn.fetch(
+                DBQueries.RECLAIM_STALE,
+                types,
+                minutes,
+                RECLAIM_AFTER_MINUTES,
+                min(ages),
+                RECLAIM_BATCH,
+            )
+            for r in rows:
+                by_type = per_manager.setdefault(r["manager_tg_id"], {})
+                by_type[r["type"]] = by_type.get(r["type"], 0) + r["cnt"]
+
+            if sum(r["cnt"] for r in rows) < RECLAIM_BATCH:
+                break
+
+    if not per_manager:
+        return
+
+    total = sum(sum(t.values()) for t in per_manager.values())
+    logger.info("Reclaimed %s stale resources from %s managers", total, len(per_manager))
+
+    for manager_id, by_type in per_manager.items():
+        lines = ["♻️ Часть выданных тебе ресурсов так и не была отмечена, они вернулись в общий пул:\n"]
+        lines.extend(f"• {esc(r_type)} — {cnt} шт." for r_type, cnt in sorted(by_type.items()))
+        try:
+            await bot.send_message(manager_id, "\n".join(lines))
+        except Exception:
+            logger.warning("Не удалось уведомить менеджера %s о возврате ресурсов", manager_id)
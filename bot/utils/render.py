@@ -0,0 +1,89 @@
+# bot/utils/render.py
+# Общая отрисовка длинных ответов: экранирование и нарезка на сообщения.
+#
+# Ответ собирается из итератора уже экранированных строк, которые жадно
+# укладываются в сообщения до MAX_MESSAGE_LEN символов за один проход —
+# без повторного копирования «хвоста» текста на каждом куске.
+import html
+from typing import Iterable, Iterator
+
+from aiogram.types import Message
+
+# Лимит Telegram на длину текста сообщения
+MAX_MESSAGE_LEN = 4096
+
+
+def esc(value) -> str:
+    """
+    Экранирует значение для parse_mode=HTML (None — пустая строка).
+    """
+    if value is None:
+        return ""
+    return html.escape(str(value), quote=False)
+
+
+def chunk_lines(lines: Iterable[str], limit: int = MAX_MESSAGE_LEN) -> Iterator[str]:
+    """
+    Жадно собирает строки в куски не длиннее limit (строки склеиваются через \\n).
+    Строка длиннее limit режется на части по limit символов.
+    """
+    buf: list[str] = []
+    size = 0
+
+    for line in lines:
+        if len(line) > limit:
+            if buf:
+                yield "\n".join(buf)
+                buf, size = [], 0
+            tail = len(line) % limit or limit
+            for start in range(0, len(line) - tail, limit):
+                yield line[start:start + limit]
+            line = line[len(line) - tail:]
+
+        extra = len(line) + 1 if buf else len(line)
+        if size + extra > limit:
+            yield "\n".join(buf)
+            buf, size = [line], len(line)
+        else:
+            buf.append(line)
+            size += extra
+
+    if buf:
+        yield "\n".join(buf)
+
+
+def resource_lines(rows, with_secrets: bool = True):
+    """
+    Строки списка выданных ресурсов (уже экранированные).
+    """
+    for idx, row in enumerate(rows, start=1):
+        login = esc(row["login"])
+        password = esc(row["password"])
+        proxy = esc(row.get("proxy"))
+
+        if password and with_secrets:
+            line = f"{idx}) {login} | {password}"
+        else:
+            # Для mamba [dolphin] пароль пустой – показываем просто имя профиля
+            line = f"{idx}) {login}"
+
+        if proxy and with_secrets:
+            line += f" | proxy: {proxy}"
+
+        yield line
+
+
+async def send_lines(message: Message, lines: Iterable[str], reply_markup=None) -> None:
+    """
+    Отправляет строки столькими сообщениями, сколько нужно.
+    Клавиатура — только у первого сообщения.
+    """
+    for i, chunk in enumerate(chunk_lines(lines)):
+        await message.answer(chunk, reply_markup=reply_markup if i == 0 else None)
+
+
+async def send_long_text(message: Message, text: str, reply_markup=None) -> None:
+    """
+    То же для готового текста: режется по строкам.
+    """
+    await send_lines(message, text.split("\n"), reply_markup=reply_markup)
@@ -0,0 +1,53 @@
+# bot/utils/reservations.py
+# Снятие неподтверждённых броней: ресурсы, которые менеджер забронировал
+# и не подтвердил за RESERVE_TTL_MINUTES, возвращаются в свободные.
+import logging
+
+from bot.config import RESERVE_RELEASE_BATCH
+from bot.utils import quotas
+from bot.utils.queries import DBQueries
+from bot.utils.render import esc
+from db.database import get_pool
+
+logger = logging.getLogger(__name__)
+
+# Больше пачек за один прогон не берём — остальное снимется в следующий раз
+MAX_BATCHES_PER_RUN = 50
+
+
+async def release_expired_reservations(bot) -> None:
+    """
+    Фоновая задача: пачками снимает истёкшие брони (один запрос на пачку,
+    по индексу на reserved_until), пишет 'reservation_expired' в историю,
+    возвращает снятое в квоту и присылает каждому менеджеру одну сводку.
+    """
+    # manager_tg_id -> {type: сколько вернули}
+    per_manager: dict[int, dict[str, int]] = {}
+
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        for _ in range(MAX_BATCHES_PER_RUN):
+            rows = await conn.fetch(DBQueries.RELEASE_EXPIRED_RESERVATIONS, RESERVE_RELEASE_BATCH)
+            for r in rows:
+                by_type = per_manager.setdefault(r["manager_tg_id"], {})
+                by_type[r["type"]] = by_type.get(r["type"], 0) + r["cnt"]
+
+            if sum(r["cnt"] for r in rows) < RESERVE_RELEASE_BATCH:
+                break
+
+    if not per_manager:
+        return
+
+    total = sum(sum(t.values()) for t in per_manager.values())
+    logger.info("Released %s expired reservations from %s managers", total, len(per_manager))
+
+    for manager_id, by_type in per_manager.items():
+        for r_type, cnt in by_type.items():
+            quotas.refund(manager_id, r_type, cnt)
+
+        lines = ["⌛ Бронь не подтвердили вовремя, ресурсы вернулись в общий пул:\n"]
+        lines.extend(f"• {esc(r_type)} — {cnt} шт." for r_type, cnt in sorted(by_type.items()))
+        try:
+            await bot.send_message(manager_id, "\n".join(lines))
+        except Exception:
+            logger.warning("Не удалось уведомить менеджера %s о снятии брони", manager_id)
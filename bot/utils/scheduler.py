@@ -1,10 +1,83 @@
-# Заглушка планировщика.
-# Нужна только для того, чтобы импорт setup_scheduler не ломал запуск бота.
+# bot/utils/scheduler.py
+# Простой планировщик фоновых задач на asyncio.
+# Каждая задача — корутина job(bot), которая крутится с заданным интервалом.
+import asyncio
+import logging
 
-def setup_scheduler(dp):
+from bot.utils.backorders import expire_backorders
+from bot.utils.idempotency import purge_issue_requests
+from bot.utils.proxy_check import check_proxy_health
+from bot.utils.quotas import purge_counters
+from bot.utils.reclaim import reclaim_stale_resources
+from bot.utils.reservations import release_expired_reservations
+from bot.utils.stock_forecast import check_low_stock
+
+logger = logging.getLogger(__name__)
+
+# (имя, интервал в секундах, корутина job(bot))
+JOBS = [
+    ("low_stock", 60, check_low_stock),
+    ("reclaim", 300, reclaim_stale_resources),
+    ("reservations", 30, release_expired_reservations),
+    ("issue_requests", 600, purge_issue_requests),
+    ("quota_counters", 3600, purge_counters),
+    ("proxy_health", 60, check_proxy_health),
+    ("backorders", 600, expire_backorders),
+]
+
+_tasks: list[asyncio.Task] = []
+
+# при остановке задачи доделывают текущий прогон и выходят, а не рвутся посередине
+_stopping = asyncio.Event()
+
+
+async def _run_periodic(name: str, interval: float, job, bot) -> None:
+    while not _stopping.is_set():
+        try:
+            await job(bot)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Фоновая задача %s упала", name)
+        try:
+            await asyncio.wait_for(_stopping.wait(), interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def _on_startup(bot) -> None:
+    _stopping.clear()
+    for name, interval, job in JOBS:
+        _tasks.append(
+            asyncio.create_task(_run_periodic(name, interval, job, bot), name=f"job:{name}")
+        )
+    logger.info("Scheduler started: %s", ", ".join(name for name, _, _ in JOBS))
+
+
+async def _on_shutdown(timeout: float) -> None:
+    _stopping.set()
+    if _tasks:
+        _, abandoned = await asyncio.wait(_tasks, timeout=timeout)
+        for task in abandoned:
+            task.cancel()
+        await asyncio.gather(*_tasks, return_exceptions=True)
+        if abandoned:
+            logger.warning(
+                "Shutdown: фоновые задачи не успели доработать: %s",
+                ", ".join(t.get_name() for t in abandoned),
+            )
+    _tasks.clear()
+
+
+def setup_scheduler(dp, shutdown):
     """
-    Сейчас планировщик ничего не делает.
-    Если захочешь добавлять фоновые задачи (отчёты, проверки и т.п.),
-    можно реализовать их здесь.
+    Регистрирует запуск фоновых задач на старте поллинга
+    и их остановку при завершении — в пределах того, что осталось
+    от общего срока остановки (shutdown — ShutdownCoordinator).
     """
-    return
+
+    async def on_shutdown() -> None:
+        await _on_shutdown(shutdown.remaining())
+
+    dp.startup.register(_on_startup)
+    dp.shutdown.register(on_shutdown)
@@ -0,0 +1,77 @@
+# bot/utils/search.py
+# Поиск ресурсов для админской команды /find.
+from bot.utils.queries import DBQueries
+
+# Значения state:, которые проверяются не по receipt_state
+STATE_FREE = "free"
+STATE_ISSUED = "issued"
+
+
+def _like_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def parse_find_args(args: str) -> dict:
+    """
+    Разбирает аргументы /find:
+        /find abc              — логин содержит "abc"
+        /find abc*             — логин начинается с "abc"
+        /find abc type:mamba manager:123 state:bad
+    Фильтры без текста тоже допустимы: /find manager:123 state:bad
+    """
+    filters: dict = {"login": None, "prefix": False, "type": None, "manager": None, "state": None}
+    words = []
+
+    for token in args.split():
+        key, sep, value = token.partition(":")
+        key = key.lower()
+        if sep and value and key in ("type", "manager", "state"):
+            if key == "manager":
+                if not value.lstrip("-").isdigit():
+                    raise ValueError("manager: — это Telegram ID (число)")
+                filters["manager"] = int(value)
+            else:
+                filters[key] = value.lower() if key == "state" else value
+            continue
+        words.append(token)
+
+    login = " ".join(words).strip()
+    if login.endswith("*"):
+        filters["prefix"] = True
+        login = login[:-1]
+    filters["login"] = login.lower() or None
+    return filters
+
+
+async def find_resources(conn, filters: dict, after_id: int = 0, limit: int = 20):
+    """
+    Одна страница результатов (keyset по id).
+    В WHERE попадают только заданные фильтры, чтобы планировщик
+    всегда видел конкретное условие и брал trigram-индекс по логину.
+    """
+    where = ["id > $1"]
+    args: list = [after_id]
+
+    def arg(value) -> str:
+        args.append(value)
+        return f"${len(args)}"
+
+    if filters.get("login"):
+        pattern = _like_escape(filters["login"])
+        pattern = f"{pattern}%" if filters.get("prefix") else f"%{pattern}%"
+        where.append(f"lower(login) LIKE {arg(pattern)}")
+    if filters.get("type"):
+        where.append(f"type = {arg(filters['type'])}")
+    if filters.get("manager") is not None:
+        where.append(f"manager_tg_id = {arg(filters['manager'])}")
+
+    state = filters.get("state")
+    if state == STATE_FREE:
+        where.append("manager_tg_id IS NULL")
+    elif state == STATE_ISSUED:
+        where.append("manager_tg_id IS NOT NULL")
+    elif state:
+        where.append(f"receipt_state = {arg(state)}")
+
+    query = DBQueries.FIND_RESOURCES.format(where="\n      AND ".join(where), limit=int(limit))
+    return await conn.fetch(query, *args)
@@ -0,0 +1,179 @@
+# bot/utils/slowlog.py
+# Журнал медленных запросов.
+#
+# На каждое соединение пула вешается query logger asyncpg. Быстрый путь —
+# одно сравнение elapsed с порогом. Медленный запрос попадает в кольцевой
+# буфер: нормализованный SQL, имя в DBQueries (если нашлось), типы параметров
+# (сами значения не храним — там пароли). Для части запросов план снимается
+# отдельно: EXPLAIN (ANALYZE, BUFFERS) на другом соединении пула, не чаще
+# раза в SLOWLOG_EXPLAIN_EVERY_SEC на один запрос и не больше одного за раз.
+# ANALYZE выполняет запрос, поэтому так — только для чистых чтений, в
+# read-only транзакции; для изменяющих запросов — план без выполнения.
+import asyncio
+import logging
+import re
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+
+from bot.config import (
+    SLOWLOG_EXPLAIN_EVERY_SEC,
+    SLOWLOG_EXPLAIN_TIMEOUT_SEC,
+    SLOWLOG_SIZE,
+    SLOWLOG_THRESHOLD_MS,
+)
+from bot.utils.queries import DBQueries
+from db.database import add_query_logger, pool_for
+
+logger = logging.getLogger(__name__)
+
+# Сколько символов плана храним на запись
+MAX_PLAN_LEN = 3000
+
+_COMMENT_RE = re.compile(r"--[^\n]*")
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"(?<![\w$])\d+(?:\.\d+)?\b")
+_SPACE_RE = re.compile(r"\s+")
+_WRITE_RE = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE|FOR\s+UPDATE|FOR\s+SHARE)\b", re.IGNORECASE)
+# Функции из миграций, которые меняют данные: SELECT ... FROM issue_resources(...)
+# выглядит как чтение, но EXPLAIN ANALYZE выполнил бы выдачу
+_WRITE_FUNC_RE = re.compile(
+    r"\b(issue_resources|claim_free_resources|mark_status|set_lifetime"
+    r"|replace_bad|fill_backorders)\s*\(",
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class SlowQuery:
+    id: int
+    at: datetime
+    elapsed_ms: float
+    sql: str
+    name: str | None
+    param_types: tuple[str, ...]
+    failed: bool
+    plan: str | None = None
+
+
+_entries: deque[SlowQuery] = deque(maxlen=SLOWLOG_SIZE)
+_state: dict = {"next_id": 1, "explaining": False}
+# нормализованный SQL -> когда последний раз снимали план (time.monotonic)
+_explained_at: dict[str, float] = {}
+# нормализованный SQL -> имя атрибута DBQueries (строится при первом медленном)
+_names: dict[str, str] = {}
+# задачи EXPLAIN держим ссылками, чтобы их не собрал GC
+_tasks: set[asyncio.Task] = set()
+
+
+def normalize(sql: str) -> str:
+    """
+    SQL без комментариев, с литералами вместо значений и в одну строку —
+    одинаковые запросы с разными константами дают одну и ту же строку.
+    """
+    sql = _COMMENT_RE.sub(" ", sql)
+    sql = _STRING_RE.sub("?", sql)
+    sql = _NUMBER_RE.sub("?", sql)
+    return _SPACE_RE.sub(" ", sql).strip()
+
+
+def _query_name(sql: str) -> str | None:
+    if not _names:
+        for attr, value in vars(DBQueries).items():
+            if attr.isupper() and isinstance(value, str):
+                _names[normalize(value)] = attr
+    return _names.get(sql)
+
+
+def _read_only(sql: str) -> bool:
+    head = sql.split(" ", 1)[0].upper()
+    return (
+        head in ("SELECT", "WITH", "VALUES", "TABLE")
+        and not _WRITE_RE.search(sql)
+        and not _WRITE_FUNC_RE.search(sql)
+    )
+
+
+async def _explain(entry: SlowQuery, query: str, args: tuple) -> None:
+    analyze = _read_only(entry.sql)
+    prefix = "EXPLAIN (ANALYZE, BUFFERS) " if analyze else "EXPLAIN "
+    timeout_ms = int(SLOWLOG_EXPLAIN_TIMEOUT_SEC * 1000)
+    try:
+        pool = await pool_for(query)
+        async with pool.acquire() as conn:
+            async with conn.transaction(readonly=analyze):
+                await conn.execute(f"SET LOCAL statement_timeout = {timeout_ms}")
+                rows = await conn.fetch(prefix + query, *args)
+        plan = "\n".join(r[0] for r in rows)
+        if not analyze:
+            plan = "(без ANALYZE: запрос меняет данные)\n" + plan
+        entry.plan = plan[:MAX_PLAN_LEN]
+    except Exception as e:
+        entry.plan = f"EXPLAIN не удался: {e.__class__.__name__}: {e}"[:MAX_PLAN_LEN]
+    finally:
+        _state["explaining"] = False
+
+
+def _on_query(record) -> None:
+    """
+    Колбэк asyncpg add_query_logger — вызывается после каждого запроса.
+    """
+    if record.elapsed * 1000 < SLOWLOG_THRESHOLD_MS:
+        return
+    query = record.query
+    if query.lstrip()[:7].upper() in ("EXPLAIN", "SET LOC"):
+        # наши же EXPLAIN не логируем
+        return
+
+    sql = normalize(query)
+    args = record.args or ()
+    entry = SlowQuery(
+        id=_state["next_id"],
+        at=datetime.now(),
+        elapsed_ms=record.elapsed * 1000,
+        sql=sql,
+        name=_query_name(sql),
+        param_types=tuple(type(a).__name__ for a in args),
+        failed=record.exception is not None,
+    )
+    _state["next_id"] += 1
+    _entries.append(entry)
+    logger.warning(
+        "Медленный запрос %.0f мс: %s",
+        entry.elapsed_ms,
+        entry.name or sql[:200],
+    )
+
+    now = time.monotonic()
+    last = _explained_at.get(sql)
+    if _state["explaining"] or (last is not None and now - last < SLOWLOG_EXPLAIN_EVERY_SEC):
+        return
+    _state["explaining"] = True
+    _explained_at[sql] = now
+    task = asyncio.get_running_loop().create_task(_explain(entry, query, tuple(args)))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+def setup_slowlog() -> None:
+    """
+    Включает журнал — до создания пула. SLOWLOG_THRESHOLD_MS=0 — выключен
+    (логгер не вешается вовсе, запросы идут без лишней работы).
+    """
+    if SLOWLOG_THRESHOLD_MS > 0:
+        add_query_logger(_on_query)
+
+
+def entries() -> list[SlowQuery]:
+    """
+    Записи журнала, новые первыми.
+    """
+    return list(reversed(_entries))
+
+
+def get(entry_id: int) -> SlowQuery | None:
+    for entry in _entries:
+        if entry.id == entry_id:
+            return entry
+    return None
@@ -0,0 +1,88 @@
+# bot/utils/startup.py
+# Холодный старт: пул -> схема -> прогрев соединений -> прогрев кэшей.
+# Каждая фаза пишет в лог своё время, чтобы было видно, где теряются секунды.
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+
+from bot.config import STARTUP_BUDGET_SEC
+from bot.middlewares.role import prewarm_roles
+from bot.utils import allocator, init_db
+from bot.utils.queries import DBQueries
+from db.database import get_pool
+
+logger = logging.getLogger(__name__)
+
+# Горячие запросы и безобидные аргументы: ничего не находят и не меняют,
+# но asyncpg готовит их на соединении и кладёт в кэш стейтментов.
+WARMUP_STATEMENTS = [
+    (DBQueries.CHECK_MANAGER_ROLE, (0,)),
+    (DBQueries.GET_ISSUED_RESOURCES, (0,)),
+    (DBQueries.ISSUE_RESOURCES, (0, "", 0, "fifo", None, None, "off", 0, None, None)),
+    (DBQueries.ALLOC_SUPPLIERS, ("",)),
+    (DBQueries.MARK_STATUS, ([], 0, "good")),
+    (DBQueries.REPLACE_BAD, (0, 0, "fifo", None, None, "off")),
+    (DBQueries.MARK_LIFETIME, (0, 0, -1)),
+]
+
+
+@asynccontextmanager
+async def _phase(name: str):
+    started = time.monotonic()
+    yield
+    logger.info("Startup: %s — %.0f мс", name, (time.monotonic() - started) * 1000)
+
+
+async def _warm_connection(pool) -> None:
+    async with pool.acquire() as conn:
+        for query, args in WARMUP_STATEMENTS:
+            await conn.fetch(query, *args)
+
+
+async def _warm_connections(pool) -> None:
+    """
+    Берём сразу все min_size соединений, чтобы каждое получило
+    подготовленные запросы, а не только первое свободное.
+    """
+    await asyncio.gather(*(_warm_connection(pool) for _ in range(pool.get_min_size())))
+
+
+async def _warm_caches(pool) -> None:
+    async with pool.acquire() as conn:
+        managers = await prewarm_roles(conn)
+        types = [r["type"] for r in await conn.fetch(DBQueries.STOCK_FREE_BY_TYPE)]
+        await allocator.prewarm(conn, types)
+    logger.info("Startup: в кэше %d менеджеров, %d типов", managers, len(types))
+
+
+async def start(started_at: float):
+    """
+    Готовит всё, что нужно до первого апдейта, и возвращает пул.
+    started_at — time.monotonic() на момент запуска процесса.
+    """
+    async with _phase("пул БД"):
+        pool = await get_pool()
+
+    async with _phase("схема"):
+        async with pool.acquire() as conn:
+            migrated = await init_db.ensure_schema(conn)
+    if migrated:
+        logger.info("Startup: применены миграции до версии %d", init_db.SCHEMA_VERSION)
+
+    async with _phase("прогрев соединений"):
+        await _warm_connections(pool)
+
+    async with _phase("прогрев кэшей"):
+        await _warm_caches(pool)
+
+    total = time.monotonic() - started_at
+    if total > STARTUP_BUDGET_SEC:
+        logger.warning(
+            "Старт занял %.1f с — дольше бюджета %.1f с (STARTUP_BUDGET_SEC)",
+            total,
+            STARTUP_BUDGET_SEC,
+        )
+    else:
+        logger.info("Startup: готов за %.1f с", total)
+    return pool
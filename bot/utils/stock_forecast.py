@@ -0,0 +1,147 @@
+# bot/utils/stock_forecast.py
+import logging
+import math
+import time
+from dataclasses import dataclass
+
+from bot.config import (
+    STOCK_ALERT_HOURS,
+    STOCK_HALF_LIFE_HOURS,
+    STOCK_WINDOW_HOURS,
+    STOCK_ALERT_COOLDOWN_HOURS,
+)
+from bot.utils.queries import DBQueries
+from bot.utils.render import esc
+from db.database import get_pool
+
+logger = logging.getLogger(__name__)
+
+# Ниже этой скорости (шт/час) считаем, что спроса нет
+MIN_RATE_PER_HOUR = 0.01
+
+# type -> время последнего алерта (time.monotonic)
+_alerted: dict[str, float] = {}
+
+
+@dataclass
+class TypeRunway:
+    type: str
+    free: int
+    rate_per_hour: float
+
+    @property
+    def hours_left(self) -> float:
+        """
+        Сколько часов хватит свободного остатка при текущей скорости выдачи.
+        """
+        if self.free <= 0:
+            return 0.0
+        if self.rate_per_hour < MIN_RATE_PER_HOUR:
+            return math.inf
+        return self.free / self.rate_per_hour
+
+
+def ewma_rate(hourly: dict[int, int], fraction: float, half_life: float, window: int) -> float:
+    """
+    Экспоненциально взвешенная скорость выдачи (шт/час).
+    hourly — {сколько часов назад: выдано за этот час}, 0 — текущий час.
+    Текущий неполный час входит с весом, пропорциональным прошедшей доле.
+    """
+    decay = 0.5 ** (1 / half_life)
+    fraction = max(fraction, 1 / 12)  # первые минуты часа почти ничего не говорят
+
+    # текущий час: скорость x0 / fraction с весом fraction
+    weighted = float(hourly.get(0, 0))
+    weights = fraction
+    w = 1.0
+    for age in range(1, window + 1):
+        w *= decay
+        weighted += hourly.get(age, 0) * w
+        weights += w
+
+    return weighted / weights
+
+
+async def compute_runway(conn) -> list[TypeRunway]:
+    """
+    Остаток и скорость расхода по каждому типу.
+    Читает только почасовые роллапы и частичный индекс свободных ресурсов —
+    дёшево даже при запуске раз в минуту.
+    """
+    rollups = await conn.fetch(DBQueries.STOCK_ISSUE_ROLLUPS, STOCK_WINDOW_HOURS)
+    free_rows = await conn.fetch(DBQueries.STOCK_FREE_BY_TYPE)
+    fraction = float(await conn.fetchval(DBQueries.STOCK_HOUR_FRACTION))
+
+    hourly: dict[str, dict[int, int]] = {}
+    for r in rollups:
+        hourly.setdefault(r["type"], {})[r["age"]] = r["issued"]
+
+    free = {r["type"]: r["free"] for r in free_rows}
+
+    result = []
+    for r_type in sorted(set(hourly) | set(free)):
+        rate = ewma_rate(hourly.get(r_type, {}), fraction, STOCK_HALF_LIFE_HOURS, STOCK_WINDOW_HOURS)
+        result.append(TypeRunway(type=r_type, free=free.get(r_type, 0), rate_per_hour=rate))
+
+    return result
+
+
+def format_hours(hours: float) -> str:
+    if math.isinf(hours):
+        return "∞"
+    if hours < 1:
+        return f"{int(hours * 60)} мин"
+    if hours < 48:
+        return f"{hours:.1f} ч"
+    return f"{hours / 24:.1f} дн"
+
+
+def runway_lines(runways: list[TypeRunway]) -> list[str]:
+    lines = []
+    for rw in runways:
+        mark = "🔴" if rw.hours_left < STOCK_ALERT_HOURS else "🟢"
+        lines.append(
+            f"{mark} <b>{esc(rw.type)}</b> — свободно {rw.free} шт., "
+            f"расход {rw.rate_per_hour:.1f} шт/ч, "
+            f"хватит на {format_hours(rw.hours_left)}"
+        )
+    return lines
+
+
+async def check_low_stock(bot) -> None:
+    """
+    Фоновая задача: шлёт админам предупреждение, если какого-то типа
+    осталось меньше чем на STOCK_ALERT_HOURS часов.
+    По одному типу — не чаще раза в STOCK_ALERT_COOLDOWN_HOURS.
+    """
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        runways = await compute_runway(conn)
+
+        now = time.monotonic()
+        low = []
+        for rw in runways:
+            if rw.hours_left >= STOCK_ALERT_HOURS:
+                # остаток восстановился — следующий провал снова алертим
+                _alerted.pop(rw.type, None)
+                continue
+            if rw.rate_per_hour < MIN_RATE_PER_HOUR:
+                # тип закончился, но его никто не берёт — не шумим
+                continue
+            last = _alerted.get(rw.type)
+            if last is not None and now - last < STOCK_ALERT_COOLDOWN_HOURS * 3600:
+                continue
+            _alerted[rw.type] = now
+            low.append(rw)
+
+        if not low:
+            return
+
+        admins = await conn.fetch(DBQueries.GET_ADMIN_IDS)
+
+    text = "\n".join(["⚠️ Заканчиваются ресурсы:\n", *runway_lines(low)])
+    for a in admins:
+        try:
+            await bot.send_message(a["tg_id"], text)
+        except Exception:
+            logger.warning("Не удалось отправить алерт об остатке админу %s", a["tg_id"])
@@ -0,0 +1,46 @@
+# bot/utils/supplier_scores.py
+# Оценка поставщиков. Сами цифры копит триггер history_rollup
+# в supplier_scores / supplier_lifetimes, здесь только чтение и форматирование.
+from bot.utils.queries import DBQueries
+from bot.utils.render import esc
+
+
+def _fmt_minutes(minutes) -> str:
+    if minutes is None:
+        return "—"
+    if minutes < 60:
+        return f"{minutes} мин"
+    return f"{minutes / 60:.1f} ч"
+
+
+async def supplier_report_lines(conn, r_type: str | None = None) -> list[str]:
+    """
+    Строки отчёта по поставщикам: доля рабочих при получении,
+    медиана и p90 срока жизни, стоимость часа работы, сколько заменили.
+    """
+    rows = await conn.fetch(DBQueries.REPORT_SUPPLIERS, r_type)
+    if not rows:
+        return []
+
+    lines: list[str] = []
+    current_type = None
+    for r in rows:
+        if r["type"] != current_type:
+            current_type = r["type"]
+            lines.append(f"\n<b>{esc(current_type)}</b>")
+
+        marked = r["good"] + r["bad"]
+        good_share = f"{r['good'] * 100 / marked:.0f}%" if marked else "—"
+
+        hours = r["lifetime_sum"] / 60
+        cost_per_hour = f"{r['lifetime_cost'] / hours:.2f}" if hours else "—"
+
+        lines.append(
+            f"• {esc(r['name'])}: выдано {r['received']}, "
+            f"рабочих {good_share} ({r['good']}/{marked}), "
+            f"жизнь: медиана {_fmt_minutes(r['median'])}, p90 {_fmt_minutes(r['p90'])}, "
+            f"цена часа {cost_per_hour}"
+            + (f", замен {r['replaced']}" if r["replaced"] else "")
+        )
+
+    return lines
@@ -0,0 +1,157 @@
+# bot/utils/survival.py
+# Кривые выживаемости ресурсов (оценка Каплана — Мейера) по типам,
+# поставщикам и неделям закупки.
+#
+# Группировка делается в БД (SURVIVAL_EXTRACT): в Python приходит
+# несколько сотен строк «длительность -> события / цензурированные»,
+# по ним кривая считается за один проход по отсортированным временам.
+# Результат кэшируется и сбрасывается при новых отметках срока жизни.
+import html
+import time
+from dataclasses import dataclass
+
+from bot.utils.queries import DBQueries
+
+WINDOW_DAYS = 90
+# До скольких минут следим за неотмеченными и с каким шагом их округляем
+MAX_DURATION = 7 * 24 * 60
+CENSOR_STEP = 10
+
+CHECKPOINTS = (60, 360, 1440)
+CACHE_TTL = 15 * 60
+RECENT_WEEKS = 4
+
+# generation растёт при каждой инвалидации: отчёт, начатый до неё, не сохраняем
+_cache: dict = {"at": 0.0, "report": None, "generation": 0}
+
+
+def invalidate() -> None:
+    """
+    Сбросить кэш — вызывается после каждой новой отметки срока жизни.
+    """
+    _cache["report"] = None
+    _cache["generation"] += 1
+
+
+@dataclass
+class Curve:
+    total: int
+    events: int
+    # [(t, S(t))] — только точки, где кривая падает
+    steps: list[tuple[int, float]]
+
+    def at(self, t: int) -> float:
+        s = 1.0
+        for time_, value in self.steps:
+            if time_ > t:
+                break
+            s = value
+        return s
+
+    @property
+    def median(self) -> int | None:
+        for time_, value in self.steps:
+            if value <= 0.5:
+                return time_
+        return None
+
+
+def kaplan_meier(counts: dict[int, list[int]]) -> Curve:
+    """
+    counts: длительность -> [события, цензурированные].
+    Цензурированные в момент t считаются под риском в t (стандартное соглашение).
+    """
+    at_risk = sum(d + c for d, c in counts.values())
+    total = at_risk
+    events = 0
+    s = 1.0
+    steps: list[tuple[int, float]] = []
+
+    for t in sorted(counts):
+        d, c = counts[t]
+        if d and at_risk:
+            s *= 1 - d / at_risk
+            steps.append((t, s))
+            events += d
+        at_risk -= d + c
+
+    return Curve(total=total, events=events, steps=steps)
+
+
+def _merge(target: dict[int, list[int]], duration: int, event: bool, n: int) -> None:
+    slot = target.setdefault(duration, [0, 0])
+    slot[0 if event else 1] += n
+
+
+def _fmt_minutes(minutes: int | None) -> str:
+    if minutes is None:
+        return "> периода"
+    if minutes < 60:
+        return f"{minutes} мин"
+    return f"{minutes / 60:.1f} ч"
+
+
+def _curve_line(label: str, curve: Curve) -> str:
+    rates = ", ".join(
+        f"{_fmt_minutes(t)}: {curve.at(t) * 100:.0f}%" for t in CHECKPOINTS
+    )
+    return (
+        f"{label} — n={curve.total} (отмечено {curve.events}), "
+        f"медиана {_fmt_minutes(curve.median)}; живы через {rates}"
+    )
+
+
+async def build_report(conn) -> dict[str, list[str]]:
+    """
+    Строки отчёта по каждому типу.
+    """
+    rows = await conn.fetch(DBQueries.SURVIVAL_EXTRACT, WINDOW_DAYS, MAX_DURATION, CENSOR_STEP)
+    supplier_names = {
+        s["id"]: s["name"] or f"#{s['id']}" for s in await conn.fetch(DBQueries.LIST_SUPPLIERS)
+    }
+
+    by_type: dict[str, dict[int, list[int]]] = {}
+    by_supplier: dict[tuple[str, int], dict[int, list[int]]] = {}
+    by_week: dict[tuple[str, object], dict[int, list[int]]] = {}
+
+    for r in rows:
+        if r["duration"] is None:
+            continue
+        duration, event, n = r["duration"], r["event"], r["n"]
+        _merge(by_type.setdefault(r["type"], {}), duration, event, n)
+        _merge(by_supplier.setdefault((r["type"], r["supplier_id"]), {}), duration, event, n)
+        _merge(by_week.setdefault((r["type"], r["week"]), {}), duration, event, n)
+
+    report: dict[str, list[str]] = {}
+    for r_type in sorted(by_type):
+        lines = [_curve_line(f"<b>{html.escape(r_type)}</b>", kaplan_meier(by_type[r_type]))]
+
+        suppliers = [
+            (supplier_names.get(supplier_id, "без поставщика"), counts)
+            for (t, supplier_id), counts in by_supplier.items()
+            if t == r_type
+        ]
+        suppliers.sort(key=lambda item: item[0])
+        for name, counts in suppliers:
+            lines.append("  • " + _curve_line(html.escape(name), kaplan_meier(counts)))
+
+        weeks = sorted((w for t, w in by_week if t == r_type), reverse=True)[:RECENT_WEEKS]
+        for week in weeks:
+            lines.append("  📅 " + _curve_line(f"неделя {week}", kaplan_meier(by_week[(r_type, week)])))
+
+        report[r_type] = lines
+
+    return report
+
+
+async def get_report(conn) -> dict[str, list[str]]:
+    now = time.monotonic()
+    if _cache["report"] is not None and now - _cache["at"] <= CACHE_TTL:
+        return _cache["report"]
+
+    generation = _cache["generation"]
+    report = await build_report(conn)
+    if generation == _cache["generation"]:
+        _cache["report"] = report
+        _cache["at"] = now
+    return report
@@ -1,14 +1,60 @@
 # db/database.py
+import asyncio
+import logging
 import os
+import time
+
 import asyncpg
 
+from bot.utils.queries import is_replica
+
+logger = logging.getLogger(__name__)
+
 _pool: asyncpg.Pool | None = None
 
+# Необязательная реплика для тяжёлых чтений (отчёты, выгрузки).
+# Включается, если задан DB_REPLICA_HOST; остальные параметры — как у основной БД.
+REPLICA_HOST = os.getenv("DB_REPLICA_HOST")
+REPLICA_MAX_LAG_SEC = float(os.getenv("DB_REPLICA_MAX_LAG_SEC", "5"))
+# Как часто перепроверяем отставание (и пробуем переподключиться после ошибки)
+REPLICA_CHECK_SEC = 2.0
+# Дольше подключения и запроса отставания не ждём — реплика считается недоступной
+REPLICA_TIMEOUT_SEC = 1.5
+
+# Отставание в секундах. Если всё полученное уже применено — 0,
+# иначе возраст последней применённой транзакции. Не реплика — тоже 0.
+_REPLICA_LAG_SQL = """
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() THEN 0
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE COALESCE(EXTRACT(EPOCH FROM NOW() - pg_last_xact_replay_timestamp()), 0)
+END;
+"""
+
+_replica: dict = {"pool": None, "checked": 0.0, "usable": False, "task": None}
+
+# Колбэки asyncpg add_query_logger — вешаются на каждое новое соединение пулов
+_query_loggers: list = []
+
+
+def add_query_logger(callback) -> None:
+    """
+    Регистрирует логгер запросов; вызывать до создания пулов.
+    """
+    _query_loggers.append(callback)
+
+
+async def _init_connection(conn: asyncpg.Connection) -> None:
+    for callback in _query_loggers:
+        conn.add_query_logger(callback)
+
 
 async def get_pool() -> asyncpg.Pool:
     """
     Возвращает общий пул соединений с БД.
     При первом вызове создаёт пул, дальше переиспользует.
+    Сразу открывается DB_POOL_MIN_SIZE соединений (asyncpg подключает их параллельно),
+    чтобы первый пользователь после рестарта не ждал подключения.
     """
     global _pool
     if _pool is None:
@@ -18,5 +64,87 @@ async def get_pool() -> asyncpg.Pool:
             database=os.getenv("DB_NAME"),
             host=os.getenv("DB_HOST"),
             port=os.getenv("DB_PORT"),
+            min_size=int(os.getenv("DB_POOL_MIN_SIZE", "4")),
+            max_size=int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+            init=_init_connection,
         )
     return _pool
+
+
+async def _check_replica() -> None:
+    if _replica["pool"] is None:
+        _replica["pool"] = await asyncpg.create_pool(
+            user=os.getenv("DB_USER"),
+            password=os.getenv("DB_PASS"),
+            database=os.getenv("DB_NAME"),
+            host=REPLICA_HOST,
+            port=os.getenv("DB_REPLICA_PORT") or os.getenv("DB_PORT"),
+            min_size=1,
+            max_size=int(os.getenv("DB_REPLICA_POOL_MAX_SIZE", "5")),
+            init=_init_connection,
+            timeout=REPLICA_TIMEOUT_SEC,
+        )
+
+    lag = float(await _replica["pool"].fetchval(_REPLICA_LAG_SQL, timeout=REPLICA_TIMEOUT_SEC))
+    usable = lag <= REPLICA_MAX_LAG_SEC
+    if usable != _replica["usable"]:
+        logger.warning(
+            "Реплика %s (отставание %.1f с, порог %.1f с)",
+            "снова используется" if usable else "отключена",
+            lag,
+            REPLICA_MAX_LAG_SEC,
+        )
+    _replica["usable"] = usable
+
+
+async def _refresh_replica() -> None:
+    try:
+        await _check_replica()
+    except (OSError, asyncpg.PostgresError, asyncio.TimeoutError):
+        if _replica["usable"]:
+            logger.exception("Реплика недоступна, читаем с основной БД")
+        _replica["usable"] = False
+    finally:
+        _replica["task"] = None
+
+
+async def pool_for(query) -> asyncpg.Pool:
+    """
+    Пул для запроса. Запросы, помеченные в DBQueries как replica(), идут на реплику,
+    если она задана, доступна и отстаёт не больше DB_REPLICA_MAX_LAG_SEC;
+    всё остальное — на основную БД. Отставание проверяется в фоне не чаще
+    раза в REPLICA_CHECK_SEC, так что выбор пула не ждёт ни запроса, ни
+    зависшей реплики — решение берётся по последней проверке.
+    """
+    if not REPLICA_HOST or not is_replica(query):
+        return await get_pool()
+
+    now = time.monotonic()
+    if now - _replica["checked"] >= REPLICA_CHECK_SEC and _replica["task"] is None:
+        _replica["checked"] = now
+        _replica["task"] = asyncio.create_task(_refresh_replica())
+
+    if _replica["usable"]:
+        return _replica["pool"]
+    return await get_pool()
+
+
+async def _close(pool: asyncpg.Pool, timeout: float | None) -> None:
+    try:
+        await asyncio.wait_for(pool.close(), timeout)
+    except asyncio.TimeoutError:
+        pool.terminate()
+
+
+async def close_pool(timeout: float | None = None) -> None:
+    """
+    Аккуратно закрывает пулы (дожидается возврата соединений).
+    Если за timeout секунд соединения не вернулись — рвёт их.
+    Реплика и основная БД закрываются параллельно, так что timeout общий.
+    """
+    global _pool
+    if _replica["task"] is not None:
+        _replica["task"].cancel()
+    pools = [p for p in (_replica["pool"], _pool) if p is not None]
+    _replica["pool"], _replica["usable"], _pool = None, False, None
+    await asyncio.gather(*(_close(p, timeout) for p in pools))